@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_asgi_application()
+
+# Sin PostgreSQL, el índice de búsqueda en memoria se arma al arrancar el worker
+from products.services.search import precalentar_indice  # noqa: E402
+
+precalentar_indice()
@@ -0,0 +1,523 @@
+import copy
+import http.client
+import importlib.util
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.db.utils import load_backend
+from django.test import Client, override_settings
+from django.urls import reverse
+from . import compression, encoders
+
+# Benchmarks de los endpoints de catálogo, autenticación y usuarios.
+#
+# Se ejecutan con `manage.py benchmark` sobre una base sqlite propia (nunca la
+# de desarrollo), sembrada con el volumen pedido. Cada escenario recorre las
+# rutas reales de products.urls y users.urls:
+# - driver "client": Django test client, en el mismo proceso (sin red)
+# - driver "server": gunicorn local, con varios hilos haciendo requests HTTP
+# - driver "asgi": igual que "server" pero con workers de uvicorn sobre app.asgi,
+#   para comparar las vistas async contra el mismo código servido por WSGI
+# Aparte, medir_respuestas compara json/orjson y gzip/brotli sobre el listado
+# completo de productos (tiempo de serialización y bytes enviados), y
+# medir_conexiones el costo de conexión por request (sin reuso, persistente,
+# pool) contra la base configurada, que es lo que importa con PostgreSQL.
+# Los resultados se pueden guardar como baseline (JSON) y comparar contra uno
+# anterior; la comparación falla si un escenario empeora más que el umbral.
+
+ESCALAS = {"1k": 1000, "10k": 10000, "100k": 100000}
+
+BENCH_PASSWORD = "benchmark-password"
+
+_PALABRAS = (
+    "televisor", "celular", "laptop", "monitor", "teclado", "mouse", "parlante",
+    "audifonos", "camara", "impresora", "tablet", "router", "consola", "reloj",
+    "refrigerador", "lavadora", "microondas", "licuadora", "ventilador", "cargador",
+)
+_ADJETIVOS = ("pro", "max", "mini", "ultra", "plus", "lite", "smart", "gamer", "hd", "4k")
+
+
+# ============= DATOS =============
+
+def sembrar(productos, usuarios, ventas, semilla=0, batch_size=2000):
+    """
+    Inserta categorías, marcas, productos, usuarios/clientes y ventas con bulk_create.
+    Retorna los ids y valores que usan los escenarios.
+    """
+    from products.models import Categoria, Marca, Producto
+    from products.services import catalogo
+    from sales.models import Detalle_Venta, MetodoPago, NotaVenta
+    from users.models import Cliente, Usuario
+
+    rnd = random.Random(semilla)
+
+    categorias = Categoria.objects.bulk_create(
+        [Categoria(nombre=f"Categoría {i}", descripcion="Benchmark") for i in range(20)]
+    )
+    marcas = Marca.objects.bulk_create([Marca(nombre=f"Marca {i}") for i in range(20)])
+
+    precios = {}
+    for inicio in range(0, productos, batch_size):
+        lote = []
+        for i in range(inicio, min(inicio + batch_size, productos)):
+            precio = Decimal(rnd.randint(100, 500000)) / 100
+            lote.append(Producto(
+                nombre=f"{rnd.choice(_PALABRAS)} {rnd.choice(_ADJETIVOS)} {i}",
+                descripcion=f"{rnd.choice(_PALABRAS)} {rnd.choice(_PALABRAS)} de prueba",
+                precio=precio,
+                stock=rnd.randint(0, 100),
+                categoria=rnd.choice(categorias),
+                marca=rnd.choice(marcas),
+            ))
+        for producto in Producto.objects.bulk_create(lote):
+            precios[producto.id] = producto.precio
+    producto_ids = list(precios)
+    # bulk_create no dispara señales: se arma el modelo de lectura del catálogo
+    catalogo.sincronizar(producto_ids)
+
+    # Hashear una sola vez: todos los usuarios comparten contraseña
+    password = make_password(BENCH_PASSWORD)
+    correos = []
+    usuario_ids = []
+    for inicio in range(0, usuarios, batch_size):
+        lote = [
+            Usuario(correo=f"bench{i}@example.com", password=password)
+            for i in range(inicio, min(inicio + batch_size, usuarios))
+        ]
+        creados = Usuario.objects.bulk_create(lote)
+        Cliente.objects.bulk_create([
+            Cliente(
+                usuario=usuario,
+                nombres=f"Cliente {usuario.id}",
+                apellidoPaterno="Bench",
+                apellidoMaterno="Mark",
+                ci=str(1000000 + usuario.id),
+            )
+            for usuario in creados
+        ])
+        correos += [u.correo for u in creados]
+        usuario_ids += [u.id for u in creados]
+
+    metodo = MetodoPago.objects.create(nombre="Efectivo")
+    if usuario_ids and producto_ids:
+        for inicio in range(0, ventas, batch_size):
+            cantidad = min(batch_size, ventas - inicio)
+            items_por_nota = [
+                [(rnd.choice(producto_ids), rnd.randint(1, 3)) for _ in range(rnd.randint(1, 3))]
+                for _ in range(cantidad)
+            ]
+            notas = NotaVenta.objects.bulk_create([
+                NotaVenta(
+                    usuario_id=rnd.choice(usuario_ids),
+                    metodo_pago=metodo,
+                    total=sum(precios[pid] * c for pid, c in items),
+                )
+                for items in items_por_nota
+            ])
+            Detalle_Venta.objects.bulk_create([
+                Detalle_Venta(nota_venta=nota, producto_id=pid, cantidad=c, precio_unitario=precios[pid])
+                for nota, items in zip(notas, items_por_nota)
+                for pid, c in items
+            ], batch_size=batch_size)
+
+    return {
+        "categoria_ids": [c.id for c in categorias],
+        "producto_ids": producto_ids,
+        "usuario_ids": usuario_ids,
+        "correos": correos,
+    }
+
+
+def crear_token(usuario_id):
+    from users.models import Usuario
+    from users.services.services import create_jwt_token
+    return create_jwt_token(Usuario.objects.get(pk=usuario_id))
+
+
+# ============= ESCENARIOS =============
+
+class Escenario:
+    """
+    Un request repetible. `ruta(rnd)` retorna la URL y `cuerpo(rnd)` el JSON
+    (solo POST). `factor` reduce la cantidad de requests de escenarios lentos.
+    """
+
+    def __init__(self, nombre, ruta, metodo="GET", cuerpo=None, autenticado=True, factor=1.0):
+        self.nombre = nombre
+        self.ruta = ruta
+        self.metodo = metodo
+        self.cuerpo = cuerpo
+        self.autenticado = autenticado
+        self.factor = factor
+
+    def cantidad(self, requests):
+        return max(1, int(requests * self.factor))
+
+
+def escenarios(datos):
+    productos = datos["producto_ids"] or [0]
+    usuarios = datos["usuario_ids"] or [0]
+    categorias = datos["categoria_ids"]
+    correos = datos["correos"]
+    return [
+        Escenario("productos_lista", lambda rnd: reverse("get_productos") + "?limit=50"),
+        Escenario(
+            "productos_por_categoria",
+            lambda rnd: reverse("get_productos") + f"?limit=50&categoria_id={rnd.choice(categorias)}",
+        ),
+        Escenario("producto_detalle", lambda rnd: reverse("get_producto", args=[rnd.choice(productos)])),
+        Escenario(
+            "productos_busqueda",
+            lambda rnd: reverse("search_productos") + f"?q={rnd.choice(_PALABRAS)}+{rnd.choice(_ADJETIVOS)}",
+        ),
+        Escenario("categorias_lista", lambda rnd: reverse("get_categorias")),
+        Escenario("usuario_detalle", lambda rnd: reverse("get_user", args=[rnd.choice(usuarios)])),
+        Escenario("cliente_detalle", lambda rnd: reverse("get_cliente", args=[rnd.choice(usuarios)])),
+        Escenario("usuarios_lista", lambda rnd: reverse("get_users") + "?stream=ndjson", factor=0.05),
+        # El hash de la contraseña domina este escenario; se corren menos requests
+        Escenario(
+            "login",
+            lambda rnd: reverse("auth"),
+            metodo="POST",
+            cuerpo=lambda rnd: {"correo": rnd.choice(correos), "password": BENCH_PASSWORD},
+            autenticado=False,
+            factor=0.1,
+        ),
+    ]
+
+
+# ============= MEDICIÓN =============
+
+def _percentil(ordenadas, p):
+    if not ordenadas:
+        return 0.0
+    k = (len(ordenadas) - 1) * p / 100
+    inferior = int(k)
+    superior = min(inferior + 1, len(ordenadas) - 1)
+    return ordenadas[inferior] + (ordenadas[superior] - ordenadas[inferior]) * (k - inferior)
+
+
+def resumir(driver, escenario, latencias, errores, duracion):
+    ordenadas = sorted(latencias)
+    return {
+        "driver": driver,
+        "escenario": escenario,
+        "requests": len(latencias),
+        "errores": errores,
+        "throughput_rps": round(len(latencias) / duracion, 2) if duracion else 0.0,
+        "media_ms": round(statistics.fmean(ordenadas) * 1000, 3) if ordenadas else 0.0,
+        "p50_ms": round(_percentil(ordenadas, 50) * 1000, 3),
+        "p95_ms": round(_percentil(ordenadas, 95) * 1000, 3),
+        "p99_ms": round(_percentil(ordenadas, 99) * 1000, 3),
+    }
+
+
+def correr_client(lista, token, requests, warmup=10, semilla=0):
+    """
+    Ejecuta los escenarios con el test client de Django (un hilo, sin red).
+    El límite de requests se desactiva: se mide el costo de cada endpoint.
+    """
+    with override_settings(THROTTLE_ENABLED=False):
+        return _correr_client(lista, token, requests, warmup, semilla)
+
+
+def _correr_client(lista, token, requests, warmup, semilla):
+    client = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+    anonimo = Client()
+    resultados = []
+    for escenario in lista:
+        rnd = random.Random(semilla)
+        c = client if escenario.autenticado else anonimo
+
+        def hacer():
+            ruta = escenario.ruta(rnd)
+            if escenario.metodo == "POST":
+                response = c.post(ruta, json.dumps(escenario.cuerpo(rnd)), content_type="application/json")
+            else:
+                response = c.get(ruta)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            return response.status_code
+
+        for _ in range(min(warmup, escenario.cantidad(requests))):
+            hacer()
+
+        latencias = []
+        errores = 0
+        inicio = time.perf_counter()
+        for _ in range(escenario.cantidad(requests)):
+            t = time.perf_counter()
+            if hacer() >= 400:
+                errores += 1
+            latencias.append(time.perf_counter() - t)
+        resultados.append(resumir("client", escenario.nombre, latencias, errores, time.perf_counter() - inicio))
+    return resultados
+
+
+# ============= SERVIDOR LOCAL =============
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ServidorLocal:
+    """
+    gunicorn apuntando a la base sqlite del benchmark.
+    Con asgi=True sirve app.asgi con workers de uvicorn (requiere uvicorn).
+    """
+
+    def __init__(self, db_path, workers=2, threads=1, asgi=False):
+        self.db_path = db_path
+        self.workers = workers
+        self.threads = threads
+        self.asgi = asgi
+        self.puerto = _puerto_libre()
+        self.proceso = None
+
+    def __enter__(self):
+        if self.asgi and importlib.util.find_spec("uvicorn") is None:
+            raise RuntimeError("El driver asgi requiere uvicorn instalado")
+        if self.asgi:
+            servidor = ["app.asgi:application", "--worker-class", "uvicorn.workers.UvicornWorker"]
+        else:
+            servidor = ["app.wsgi:application", "--threads", str(self.threads)]
+        env = dict(
+            os.environ,
+            DB_ENGINE="",
+            SQLITE_NAME=str(self.db_path),
+            LOG_LEVEL="WARNING",
+            THROTTLE_ENABLED="False",
+            DJANGO_SETTINGS_MODULE="app.settings",
+        )
+        self.proceso = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn", *servidor,
+                "--bind", f"127.0.0.1:{self.puerto}",
+                "--workers", str(self.workers),
+                "--log-level", "warning",
+            ],
+            cwd=str(settings.BASE_DIR),
+            env=env,
+        )
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            if self.proceso.poll() is not None:
+                raise RuntimeError("gunicorn terminó al iniciar")
+            try:
+                with socket.create_connection(("127.0.0.1", self.puerto), timeout=0.5):
+                    return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError("gunicorn no respondió a tiempo")
+
+    def __exit__(self, *exc):
+        if self.proceso is not None:
+            self.proceso.terminate()
+            try:
+                self.proceso.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proceso.kill()
+            self.proceso = None
+
+
+def correr_servidor(lista, token, requests, puerto, concurrencia=4, warmup=10, semilla=0, driver="server"):
+    """
+    Ejecuta los escenarios contra un servidor HTTP local con `concurrencia` hilos.
+    """
+    resultados = []
+    for escenario in lista:
+        total = escenario.cantidad(requests)
+        latencias = []
+        errores = [0]
+        lock = threading.Lock()
+
+        def hacer(rnd):
+            headers = {"Content-Type": "application/json"}
+            if escenario.autenticado:
+                headers["Authorization"] = f"Bearer {token}"
+            body = json.dumps(escenario.cuerpo(rnd)) if escenario.metodo == "POST" else None
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=60)
+            try:
+                conexion.request(escenario.metodo, escenario.ruta(rnd), body=body, headers=headers)
+                response = conexion.getresponse()
+                response.read()
+                return response.status
+            finally:
+                conexion.close()
+
+        def trabajador(n, indice):
+            rnd = random.Random(semilla + indice)
+            for _ in range(n):
+                t = time.perf_counter()
+                try:
+                    fallo = hacer(rnd) >= 400
+                except OSError:
+                    fallo = True
+                duracion = time.perf_counter() - t
+                with lock:
+                    latencias.append(duracion)
+                    errores[0] += fallo
+
+        calentamiento = random.Random(semilla)
+        for _ in range(min(warmup, total)):
+            hacer(calentamiento)
+
+        hilos = [
+            threading.Thread(target=trabajador, args=(total // concurrencia + (i < total % concurrencia), i))
+            for i in range(concurrencia)
+        ]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        resultados.append(resumir(driver, escenario.nombre, latencias, errores[0], time.perf_counter() - inicio))
+    return resultados
+
+
+# ============= SERIALIZACIÓN Y COMPRESIÓN =============
+
+def _mediana_ms(func, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = func()
+        tiempos.append(time.perf_counter() - inicio)
+    return resultado, round(statistics.median(tiempos) * 1000, 3)
+
+
+def medir_respuestas(repeticiones=10):
+    """
+    Serializa el listado completo de productos con cada encoder disponible y lo
+    comprime con cada encoding disponible. Retorna una fila por encoder con la
+    mediana de tiempo (ms) y el tamaño (bytes) de cada paso.
+    """
+    from products.services import producto as producto_service
+
+    payload = {"ok": True, "productos": list(producto_service.iter_productos())}
+    encoders_disponibles = ["json"] + (["orjson"] if encoders.orjson is not None else [])
+    encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+
+    filas = []
+    for nombre in encoders_disponibles:
+        dumps = encoders.get_dumps(nombre)
+        body, encode_ms = _mediana_ms(lambda: dumps(payload), repeticiones)
+        fila = {"encoder": nombre, "filas": len(payload["productos"]), "encode_ms": encode_ms, "bytes": len(body)}
+        for encoding in encodings:
+            comprimido, comprimir_ms = _mediana_ms(lambda: compression.comprimir(body, encoding), repeticiones)
+            fila[f"{encoding}_ms"] = comprimir_ms
+            fila[f"{encoding}_bytes"] = len(comprimido)
+        filas.append(fila)
+    return filas
+
+
+# ============= CONEXIONES =============
+
+def _modos_conexion(settings_dict):
+    modos = {
+        "sin_reuso": {"CONN_MAX_AGE": 0},
+        "persistente": {"CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": True},
+    }
+    if "postgresql" in settings_dict["ENGINE"] and importlib.util.find_spec("psycopg_pool") is not None:
+        modos["pool"] = {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": True, "pool": {"min_size": 1, "max_size": 1}}
+    return modos
+
+
+def _request_db(wrapper):
+    # Lo mismo que hace Django por request: request_started, una consulta, request_finished
+    wrapper.close_if_unusable_or_obsolete()
+    with wrapper.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    wrapper.close_if_unusable_or_obsolete()
+
+
+def medir_conexiones(alias="default", repeticiones=100):
+    """
+    Mide el costo por request de la conexión a la base `alias` con cada modo:
+    sin_reuso (CONN_MAX_AGE=0), persistente (CONN_MAX_AGE con health checks) y
+    pool (psycopg_pool, solo PostgreSQL con psycopg[pool] instalado).
+    Retorna una fila por modo con la mediana y el p95 en ms.
+    """
+    base = connections[alias].settings_dict
+    filas = []
+    for modo, cambios in _modos_conexion(base).items():
+        settings_dict = copy.deepcopy(base)
+        settings_dict["OPTIONS"].pop("pool", None)
+        pool = cambios.pop("pool", None)
+        settings_dict.update(cambios)
+        if pool:
+            settings_dict["OPTIONS"]["pool"] = pool
+        # Alias propio: el pool de Django se guarda por alias y no debe pisar al real
+        wrapper = load_backend(settings_dict["ENGINE"]).DatabaseWrapper(settings_dict, f"benchmark_{modo}")
+        try:
+            _request_db(wrapper)
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                _request_db(wrapper)
+                tiempos.append(time.perf_counter() - inicio)
+        finally:
+            wrapper.close()
+            if pool:
+                wrapper.close_pool()
+        tiempos.sort()
+        filas.append({
+            "modo": modo,
+            "requests": repeticiones,
+            "p50_ms": round(statistics.median(tiempos) * 1000, 3),
+            "p95_ms": round(_percentil(tiempos, 95) * 1000, 3),
+        })
+    return filas
+
+
+# ============= BASELINE =============
+
+def _clave(resultado):
+    return f"{resultado['driver']}:{resultado['escenario']}"
+
+
+def guardar_baseline(path, resultados, meta):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "resultados": {_clave(r): r for r in resultados}}, f, indent=2)
+
+
+def comparar(resultados, path, max_regresion=0.2, min_delta_ms=2.0):
+    """
+    Compara contra un baseline guardado. Retorna la lista de regresiones:
+    p95 que sube o throughput que baja más que `max_regresion` (fracción).
+    Diferencias de latencia menores a `min_delta_ms` se consideran ruido.
+    """
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)["resultados"]
+
+    regresiones = []
+    for resultado in resultados:
+        anterior = baseline.get(_clave(resultado))
+        if anterior is None:
+            continue
+        delta_p95 = resultado["p95_ms"] - anterior["p95_ms"]
+        if anterior["p95_ms"] and delta_p95 > min_delta_ms and delta_p95 / anterior["p95_ms"] > max_regresion:
+            regresiones.append(
+                f"{_clave(resultado)}: p95 {anterior['p95_ms']}ms -> {resultado['p95_ms']}ms"
+            )
+        delta_media = resultado["media_ms"] - anterior["media_ms"]
+        if anterior["throughput_rps"] and delta_media > min_delta_ms and (
+            (anterior["throughput_rps"] - resultado["throughput_rps"]) / anterior["throughput_rps"] > max_regresion
+        ):
+            regresiones.append(
+                f"{_clave(resultado)}: throughput {anterior['throughput_rps']} -> {resultado['throughput_rps']} req/s"
+            )
+    return regresiones
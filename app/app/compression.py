@@ -0,0 +1,151 @@
+import zlib
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se ofrece gzip
+    brotli = None
+
+# Compresión de respuestas negociada con Accept-Encoding.
+#
+# - Se prefiere brotli (br) si está instalado y el cliente lo acepta; si no, gzip.
+# - Solo se comprimen JSON/NDJSON y texto, y solo si el cuerpo tiene al menos
+#   COMPRESSION_MIN_SIZE bytes (las respuestas chicas y los 304 quedan igual).
+# - En streaming cada bloque se comprime y se entrega al momento (flush), así la
+#   exportación sigue llegando por partes.
+# - Un ETag fuerte pasa a débil (W/"..."): el cuerpo comprimido no es idéntico
+#   byte a byte, pero If-None-Match sigue funcionando (comparación débil).
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def _preferencias(accept_encoding):
+    """
+    Convierte "br;q=1.0, gzip;q=0.8, *;q=0" en {"br": 1.0, "gzip": 0.8, "*": 0.0}.
+    """
+    preferencias = {}
+    for parte in accept_encoding.split(","):
+        token, _, parametros = parte.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        preferencias[token] = q
+    return preferencias
+
+
+def elegir_encoding(accept_encoding):
+    """
+    Retorna "br", "gzip" o None según lo que acepta el cliente.
+    """
+    if not accept_encoding:
+        return None
+    preferencias = _preferencias(accept_encoding)
+    disponibles = ("br", "gzip") if brotli is not None else ("gzip",)
+    candidatos = [
+        (preferencias.get(encoding, preferencias.get("*", 0.0)), -orden, encoding)
+        for orden, encoding in enumerate(disponibles)
+    ]
+    q, _, encoding = max(candidatos)
+    return encoding if q > 0 else None
+
+
+class _Compresor:
+    """
+    Compresor incremental con la misma interfaz para gzip y brotli.
+    """
+
+    def __init__(self, encoding):
+        if encoding == "br":
+            self._compresor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self._bloque = self._compresor.process
+            self._flush = self._compresor.flush
+            self._fin = self._compresor.finish
+        else:
+            # wbits=31: formato gzip (cabecera y CRC), no zlib crudo
+            self._compresor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._bloque = self._compresor.compress
+            self._flush = lambda: self._compresor.flush(zlib.Z_SYNC_FLUSH)
+            self._fin = self._compresor.flush
+
+    def bloque(self, data):
+        # Comprime y vacía el buffer interno para que el bloque se pueda enviar ya
+        return self._bloque(data) + self._flush()
+
+    def todo(self, data):
+        return self._bloque(data) + self._fin()
+
+    def fin(self):
+        return self._fin()
+
+
+def comprimir(data, encoding):
+    return _Compresor(encoding).todo(data)
+
+
+def comprimir_stream(chunks, encoding):
+    compresor = _Compresor(encoding)
+    for chunk in chunks:
+        data = compresor.bloque(chunk)
+        if data:
+            yield data
+    yield compresor.fin()
+
+
+async def acomprimir_stream(chunks, encoding):
+    compresor = _Compresor(encoding)
+    async for chunk in chunks:
+        data = compresor.bloque(chunk)
+        if data:
+            yield data
+    yield compresor.fin()
+
+
+def _comprimible(response):
+    content_type = response.get("Content-Type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Comprime la respuesta con brotli o gzip según el header Accept-Encoding.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or not _comprimible(response):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = elegir_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acomprimir_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = comprimir_stream(response.streaming_content, encoding)
+            # El tamaño comprimido no se conoce hasta terminar de enviar
+            del response.headers["Content-Length"]
+        else:
+            comprimido = comprimir(response.content, encoding)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response.headers["Content-Length"] = str(len(comprimido))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,49 @@
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la biblioteca estándar
+    orjson = None
+
+# Serialización JSON de las respuestas de la API.
+#
+# JSON_ENCODER = 'orjson' (por defecto, si está instalado) o 'json'.
+# Ambos producen el mismo formato que DjangoJSONEncoder: fechas con milisegundos
+# y "Z", Decimal como string. orjson resuelve en C dicts, listas, strings y
+# números, que son casi todo el contenido de un listado; solo los tipos que no
+# conoce (Decimal, date/datetime, UUID...) pasan por DjangoJSONEncoder.default.
+
+_django_default = DjangoJSONEncoder().default
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def _dumps_orjson(obj):
+    return orjson.dumps(obj, default=_django_default, option=_ORJSON_OPTIONS)
+
+
+def _dumps_json(obj):
+    return json.dumps(obj, cls=DjangoJSONEncoder).encode()
+
+
+def get_dumps(nombre=None):
+    """
+    Retorna la función de serialización indicada ('orjson' o 'json').
+    Por defecto usa settings.JSON_ENCODER y cae a 'json' si orjson no está instalado.
+    """
+    nombre = nombre or settings.JSON_ENCODER
+    if nombre == "orjson" and orjson is not None:
+        return _dumps_orjson
+    if nombre not in ("orjson", "json"):
+        raise ValueError(f"JSON_ENCODER inválido: {nombre} (use orjson o json)")
+    return _dumps_json
+
+
+def dumps(obj):
+    """
+    Serializa obj a JSON (bytes UTF-8).
+    """
+    return get_dumps()(obj)
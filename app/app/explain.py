@@ -0,0 +1,104 @@
+import re
+from django.db import connections
+from django.utils import timezone
+
+# Planes de ejecución (EXPLAIN) de las consultas calientes de los servicios.
+#
+# plan(queryset) corre EXPLAIN en la base del queryset y retorna el texto del
+# plan, los índices que usa y las tablas que recorre completas (sqlite y
+# PostgreSQL; con otros motores solo el texto).
+# En PostgreSQL se desactiva el seq scan durante el EXPLAIN: con tablas chicas
+# (tests, desarrollo) el planner prefiere recorrerlas aunque haya un índice, y lo
+# que interesa es que exista uno que la consulta pueda usar.
+#
+# consultas() arma esas consultas con las mismas funciones que usan las vistas y
+# el índice que cada una debería usar; los tests verifican que ninguna recorra
+# su tabla completa.
+
+# sqlite: "SEARCH t USING INDEX i (...)", "SCAN t USING COVERING INDEX i", "SCAN t"
+_SQLITE_INDICE = re.compile(r'USING (?:COVERING )?INDEX (\w+)')
+_SQLITE_PK = re.compile(r'USING INTEGER PRIMARY KEY')
+_SQLITE_SCAN = re.compile(r'\bSCAN (\w+)')
+# PostgreSQL: "Index Scan using i on t", "Index Only Scan using i on t",
+# "Bitmap Index Scan on i", "Seq Scan on t"
+_PG_INDICE = re.compile(r'(?:Index Scan using|Index Only Scan using|Bitmap Index Scan on) (\w+)')
+_PG_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+PK = 'pk'
+
+
+def _analizar_sqlite(texto):
+    indices, escaneos = set(), set()
+    for linea in texto.splitlines():
+        indices.update(_SQLITE_INDICE.findall(linea))
+        if _SQLITE_PK.search(linea):
+            indices.add(PK)
+        escaneo = _SQLITE_SCAN.search(linea)
+        if escaneo and 'INDEX' not in linea and 'PRIMARY KEY' not in linea:
+            escaneos.add(escaneo.group(1))
+    return indices, escaneos
+
+
+def _analizar_postgresql(texto):
+    indices = {PK if i.endswith('_pkey') else i for i in _PG_INDICE.findall(texto)}
+    return indices, set(_PG_SCAN.findall(texto))
+
+
+def plan(queryset):
+    """
+    EXPLAIN del queryset: {"texto", "indices", "escaneos"}. Los índices de clave
+    primaria se reportan como 'pk'.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+            try:
+                texto = queryset.explain()
+            finally:
+                cursor.execute('RESET enable_seqscan')
+        indices, escaneos = _analizar_postgresql(texto)
+    elif connection.vendor == 'sqlite':
+        texto = queryset.explain()
+        indices, escaneos = _analizar_sqlite(texto)
+    else:
+        texto = queryset.explain()
+        indices, escaneos = set(), set()
+    return {"texto": texto, "indices": indices, "escaneos": escaneos}
+
+
+def consultas():
+    """
+    Consultas calientes de products, sales y users: {nombre: (queryset, índice)}.
+    índice es el que se espera que use, o None si alcanza con cualquiera
+    (los únicos y los de FK tienen nombres generados).
+    """
+    from products.models import ProductoCatalogo
+    from products.services import producto as producto_service
+    from sales.models import NotaVenta
+    from sales.services import reportes
+    from users.models import Cliente, RefreshToken, TokenRevocado, Usuario
+
+    hoy = timezone.localdate()
+    return {
+        # Listado del catálogo (paginación por cursor) con sus filtros
+        "productos": (producto_service.consulta_pagina(), "catalogo_created_idx"),
+        "productos_categoria": (producto_service.consulta_pagina(categoria_id=1), "catalogo_cat_created_idx"),
+        "productos_categoria_en_stock": (producto_service.consulta_pagina(categoria_id=1, en_stock=True), "catalogo_cat_stock_idx"),
+        "productos_marca": (producto_service.consulta_pagina(marca_id=1), "catalogo_marca_created_idx"),
+        "productos_en_stock": (producto_service.consulta_pagina(en_stock=True), "catalogo_en_stock_idx"),
+        "productos_precio": (producto_service.consulta_pagina(precio_min=10, precio_max=100), None),
+        # La pk del catálogo es la FK al producto: en sqlite no es INTEGER PRIMARY
+        # KEY y usa un índice automático (sqlite_autoindex_...)
+        "producto_detalle": (ProductoCatalogo.objects.filter(pk=1), None),
+        # Ventas
+        "notas_pendientes": (reportes.notas_pendientes()[:500], "notaventa_pendiente_idx"),
+        "notas_rango": (reportes.notas_del_rango(hoy, hoy), "notaventa_created_idx"),
+        "notas_usuario": (NotaVenta.objects.filter(usuario_id=1).order_by('-created_at'), "notaventa_usuario_created_idx"),
+        # Usuarios y tokens
+        "usuario_correo": (Usuario.objects.filter(correo="ana@example.com"), None),
+        "cliente_ci": (Cliente.objects.filter(ci="1234567"), "cliente_ci_idx"),
+        "refresh_token": (RefreshToken.objects.filter(token_hash="0" * 64), None),
+        "refresh_familia": (RefreshToken.objects.filter(familia="0" * 32, revocado_at__isnull=True), None),
+        "tokens_revocados": (TokenRevocado.objects.filter(expires_at__gt=timezone.now()), None),
+    }
@@ -0,0 +1,178 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import uuid
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+# Logging estructurado de la aplicación.
+#
+# - Cada módulo usa logging.getLogger(__name__) y pasa los datos como argumentos
+#   o en extra={...}; el mensaje se formatea solo si el registro se emite.
+# - RequestIdMiddleware asigna un id a cada request (o usa X-Request-ID) y
+#   RequestIdFilter lo agrega a cada registro.
+# - SamplingFilter deja pasar una fracción de los registros DEBUG/INFO, decidida
+#   por request: se conservan o descartan todos los registros de un mismo request.
+# - AsyncStreamHandler encola los registros y un hilo aparte los escribe como
+#   JSON, así un request nunca espera por stdout. Si la cola se llena, se descartan.
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+
+# Atributos propios de LogRecord; el resto viene de extra={...}
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+class RequestIdMiddleware:
+    """
+    Asigna un id a cada request para correlacionar sus registros de log.
+    Respeta el X-Request-ID recibido (ej. del proxy) y lo devuelve en la respuesta.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        request.request_id = request_id
+        token = _request_id.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_id.reset(token)
+        response['X-Request-ID'] = request_id
+        return response
+
+    async def __acall__(self, request):
+        request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        request.request_id = request_id
+        token = _request_id.set(request_id)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_id.reset(token)
+        response['X-Request-ID'] = request_id
+        return response
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar una fracción `rate` (0 a 1) de los registros bajo `level`.
+    WARNING y superiores se emiten siempre.
+    """
+
+    def __init__(self, rate=1.0, level=logging.WARNING):
+        super().__init__()
+        self.rate = float(rate)
+        self.level = logging._checkLevel(level)
+
+    def filter(self, record):
+        if self.rate >= 1 or record.levelno >= self.level:
+            return True
+        request_id = _request_id.get()
+        if request_id is None:
+            return random.random() < self.rate
+        return zlib.crc32(request_id.encode()) % 10000 < self.rate * 10000
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Una línea JSON por registro, con los campos pasados en extra={...}.
+    """
+
+    def format(self, record):
+        data = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            data['request_id'] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class AsyncStreamHandler(QueueHandler):
+    """
+    QueueHandler con su propio hilo escritor. El hilo arranca con el primer
+    registro de cada proceso (compatible con workers de gunicorn creados por fork)
+    y logging.shutdown() lo detiene al salir, vaciando la cola.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self._target = logging.StreamHandler(stream or sys.stdout)
+        self._listener = None
+        self._pid = None
+        self.dropped = 0
+
+    def setFormatter(self, fmt):
+        # El formato (JSON) se aplica en el hilo escritor, no en el del request
+        self._target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Resolver mensaje y excepción ahora: los argumentos pueden cambiar después
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        super().emit(record)
+
+    def _start(self):
+        self.acquire()
+        try:
+            if self._pid != os.getpid():
+                self._listener = QueueListener(self.queue, self._target)
+                self._listener.start()
+                self._pid = os.getpid()
+        finally:
+            self.release()
+
+    def close(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+        super().close()
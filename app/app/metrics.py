@@ -0,0 +1,227 @@
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+# Instrumentación por request: tiempo total, cantidad y tiempo de consultas a la
+# base de datos y tamaño de la respuesta, agrupados por vista.
+#
+# - Cada respuesta lleva un header Server-Timing (visible en las devtools).
+# - GET /metrics expone los histogramas de este proceso en formato de texto de
+#   Prometheus. Con varios workers, cada uno tiene sus propios contadores.
+# - QUERY_N_PLUS_ONE ('warn' o 'raise') detecta la misma consulta repetida
+#   QUERY_N_PLUS_ONE_THRESHOLD veces en un request (pensado para tests y desarrollo).
+#
+# Bajo ASGI el ORM corre en un hilo aparte (sync_to_async), por eso el contador
+# se instala y se retira desde ese mismo hilo.
+#
+# En respuestas con streaming solo se miden las consultas hechas antes de
+# empezar a enviar el cuerpo.
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Literales que se reemplazan para agrupar consultas que solo difieren en parámetros
+_SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SQL_IN_LISTS = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+
+
+class NPlusOneError(AssertionError):
+    """Una misma consulta se repitió demasiadas veces en un request."""
+
+
+def normalize_sql(sql):
+    sql = _SQL_LITERALS.sub("?", sql)
+    return _SQL_IN_LISTS.sub("(...)", sql)
+
+
+class QueryCounter:
+    """
+    execute_wrapper que cuenta las consultas y su duración.
+    """
+
+    def __init__(self, track_repeats=False):
+        self.count = 0
+        self.duration = 0.0
+        self.repeats = {} if track_repeats else None
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - inicio
+            self.count += 1
+            if self.repeats is not None:
+                key = normalize_sql(sql)
+                self.repeats[key] = self.repeats.get(key, 0) + 1
+
+    def most_repeated(self):
+        if not self.repeats:
+            return None, 0
+        return max(self.repeats.items(), key=lambda item: item[1])
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, limite in enumerate(self.buckets):
+            if value <= limite:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    Histogramas por (vista, método) y contador de respuestas por código de estado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._latency = {}
+            self._db_time = {}
+            self._queries = {}
+            self._size = {}
+            self._responses = {}
+
+    def observe(self, view, method, status, duration, queries, db_time, size):
+        labels = (view, method)
+        with self._lock:
+            self._histogram(self._latency, labels, LATENCY_BUCKETS).observe(duration)
+            self._histogram(self._db_time, labels, LATENCY_BUCKETS).observe(db_time)
+            self._histogram(self._queries, labels, QUERY_BUCKETS).observe(queries)
+            if size is not None:
+                self._histogram(self._size, labels, SIZE_BUCKETS).observe(size)
+            key = labels + (status,)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    @staticmethod
+    def _histogram(series, labels, buckets):
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram(buckets)
+        return histogram
+
+    def render(self):
+        """
+        Texto en formato de exposición de Prometheus.
+        """
+        lines = []
+        with self._lock:
+            for name, descripcion, series in (
+                ("http_request_duration_seconds", "Duración total del request", self._latency),
+                ("http_request_db_duration_seconds", "Tiempo en consultas a la base de datos", self._db_time),
+                ("http_request_db_queries", "Consultas a la base de datos por request", self._queries),
+                ("http_response_size_bytes", "Tamaño del cuerpo de la respuesta", self._size),
+            ):
+                lines.append(f"# HELP {name} {descripcion}")
+                lines.append(f"# TYPE {name} histogram")
+                for (view, method), histogram in sorted(series.items()):
+                    labels = f'view="{view}",method="{method}"'
+                    for limite, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{{labels},le="{limite}"}} {count}')
+                    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.total}')
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                    lines.append(f"{name}_count{{{labels}}} {histogram.total}")
+
+            lines.append("# HELP http_responses_total Respuestas por código de estado")
+            lines.append("# TYPE http_responses_total counter")
+            for (view, method, status), count in sorted(self._responses.items()):
+                lines.append(f'http_responses_total{{view="{view}",method="{method}",status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "sin_ruta"
+    return match.view_name or match.route or "sin_nombre"
+
+
+class MetricsMiddleware:
+    """
+    Mide cada request y agrega el header Server-Timing a la respuesta.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = self._counter()
+        inicio = time.perf_counter()
+        with self._instalar(counter):
+            response = self.get_response(request)
+        return self._registrar(request, response, counter, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        counter = self._counter()
+        inicio = time.perf_counter()
+        stack = await sync_to_async(self._instalar)(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._registrar(request, response, counter, time.perf_counter() - inicio)
+
+    @staticmethod
+    def _counter():
+        return QueryCounter(track_repeats=bool(settings.QUERY_N_PLUS_ONE))
+
+    @staticmethod
+    def _instalar(counter):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        return stack
+
+    def _registrar(self, request, response, counter, duracion):
+        view = _view_name(request)
+        size = None if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, duracion, counter.count, counter.duration, size)
+
+        response["Server-Timing"] = (
+            f'app;dur={duracion * 1000:.1f}, '
+            f'db;dur={counter.duration * 1000:.1f};desc="{counter.count} queries"'
+        )
+
+        modo = settings.QUERY_N_PLUS_ONE
+        if modo:
+            self._check_n_plus_one(modo, view, counter)
+        return response
+
+    @staticmethod
+    def _check_n_plus_one(modo, view, counter):
+        sql, repeticiones = counter.most_repeated()
+        if repeticiones < settings.QUERY_N_PLUS_ONE_THRESHOLD:
+            return
+        mensaje = f"Posible N+1 en {view}: consulta repetida {repeticiones} veces: {sql}"
+        if modo == "raise":
+            raise NPlusOneError(mensaje)
+        logger.warning(mensaje, extra={"view": view, "repeticiones": repeticiones})
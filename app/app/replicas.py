@@ -0,0 +1,135 @@
+import contextvars
+import random
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Lecturas en réplicas de PostgreSQL.
+#
+# - DATABASE_REPLICAS lista los alias de las réplicas (ver settings, DB_REPLICA_HOSTS)
+#   y DATABASE_REPLICA_APPS las apps cuyas lecturas pueden ir a una réplica.
+# - Solo se usan réplicas dentro de un request (ReplicaMiddleware). Comandos,
+#   tareas (app.tasks descarta el estado al encolar) y shell leen siempre del primario.
+# - Cada request usa una sola réplica, elegida en su primera lectura: todas sus
+#   consultas ven el mismo punto de la replicación.
+# - Las lecturas que llenan un cache van al primario (leer_del_primario): una
+#   réplica atrasada lo dejaría con datos viejos durante todo el TTL.
+# - Read-your-writes: desde la primera escritura del request (save, update,
+#   delete, select_for_update...) todas sus lecturas van al primario, así como
+#   las que ocurren dentro de una transacción.
+# - Las escrituras y migraciones van siempre al primario ('default').
+
+_estado = contextvars.ContextVar('replica_estado', default=None)
+
+
+class _Estado:
+    __slots__ = ('primario', 'replica', 'forzado')
+
+    def __init__(self):
+        self.primario = False
+        self.replica = None
+        self.forzado = 0
+
+
+def fijar_primario():
+    """
+    Manda al primario el resto de las lecturas del request actual.
+    """
+    estado = _estado.get()
+    if estado is not None:
+        estado.primario = True
+
+
+@contextmanager
+def leer_del_primario():
+    """
+    Manda al primario las lecturas del bloque, sin fijar el resto del request.
+    """
+    estado = _estado.get()
+    if estado is None:
+        yield
+        return
+    estado.forzado += 1
+    try:
+        yield
+    finally:
+        estado.forzado -= 1
+
+
+def salir_del_request():
+    """
+    Descarta el estado del request en el contexto actual: lo que corra en él
+    (ej. un trabajo en segundo plano con el contexto copiado) lee del primario.
+    """
+    _estado.set(None)
+
+
+class ReplicaRouter:
+    """
+    Router de Django: lecturas de DATABASE_REPLICA_APPS a una réplica elegida
+    al azar para cada request.
+    """
+
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if estado is None or not settings.DATABASE_REPLICAS:
+            return None
+        if estado.primario or estado.forzado or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Explícito: si no, Django leería de la base de la instancia del hint
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label not in settings.DATABASE_REPLICA_APPS:
+            return None
+        if estado.replica is None:
+            estado.replica = random.choice(settings.DATABASE_REPLICAS)
+        return estado.replica
+
+    def db_for_write(self, model, **hints):
+        fijar_primario()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplicas tienen los mismos datos
+        bases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Las réplicas reciben el esquema por replicación
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Habilita las lecturas en réplicas durante el request y lleva el estado de
+    read-your-writes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _estado.set(_Estado())
+        try:
+            return self.get_response(request)
+        finally:
+            _estado.reset(token)
+
+    async def __acall__(self, request):
+        # El estado es un objeto mutable: las escrituras hechas en hilos de
+        # sync_to_async lo marcan igual
+        token = _estado.set(_Estado())
+        try:
+            return await self.get_response(request)
+        finally:
+            _estado.reset(token)
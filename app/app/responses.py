@@ -0,0 +1,215 @@
+import datetime
+import hashlib
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .encoders import dumps, get_dumps
+
+# Formatos aceptados en el query param ?stream=
+STREAM_FORMATS = ("json", "ndjson")
+
+# Bytes acumulados antes de entregar un bloque al servidor
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+def get_stream_format(request):
+    """
+    Retorna el formato de streaming pedido en ?stream= o None si no se pidió.
+    """
+    formato = request.GET.get("stream")
+    if not formato:
+        return None
+    formato = formato.lower()
+    if formato not in STREAM_FORMATS:
+        raise ValidationError(f"Formato de streaming inválido: {formato} (use json o ndjson)")
+    return formato
+
+
+def is_asgi(request):
+    """
+    True si el request llegó por ASGI. Bajo ASGI StreamingHttpResponse necesita
+    un iterador async; uno sync se consume entero en memoria antes de enviarse.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+class JsonResponse(HttpResponse):
+    """
+    Igual que django.http.JsonResponse, pero serializa con app.encoders.dumps
+    (orjson si está instalado).
+    """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the safe parameter to False."
+            )
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
+
+
+def _buffered(parts):
+    """
+    Agrupa fragmentos pequeños en bloques de STREAM_BUFFER_SIZE para no
+    hacer una escritura al socket por cada fila.
+    """
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= STREAM_BUFFER_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _json_array(key, rows):
+    # Mismo sobre que las respuestas normales: {"ok": true, "<key>": [...]}
+    dumps = get_dumps()
+    yield b'{"ok": true, ' + dumps(key) + b': ['
+    first = True
+    for row in rows:
+        if first:
+            first = False
+            yield dumps(row)
+        else:
+            yield b"," + dumps(row)
+    yield b"]}"
+
+
+def _ndjson(rows):
+    dumps = get_dumps()
+    for row in rows:
+        yield dumps(row) + b"\n"
+
+
+async def _abuffered(parts):
+    buffer = []
+    size = 0
+    async for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= STREAM_BUFFER_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+async def _ajson_array(key, rows):
+    dumps = get_dumps()
+    yield b'{"ok": true, ' + dumps(key) + b': ['
+    first = True
+    async for row in rows:
+        if first:
+            first = False
+            yield dumps(row)
+        else:
+            yield b"," + dumps(row)
+    yield b"]}"
+
+
+async def _andjson(rows):
+    dumps = get_dumps()
+    async for row in rows:
+        yield dumps(row) + b"\n"
+
+
+def streaming_json_response(key, rows, formato="json"):
+    """
+    Crea un StreamingHttpResponse que serializa `rows` a medida que se leen.
+    - json: {"ok": true, "<key>": [ ... ]}
+    - ndjson: un objeto JSON por línea
+    `rows` puede ser un iterable sync o async (para vistas async bajo ASGI).
+    """
+    if hasattr(rows, "__aiter__"):
+        content = _andjson(rows) if formato == "ndjson" else _ajson_array(key, rows)
+        content = _abuffered(content)
+    else:
+        content = _ndjson(rows) if formato == "ndjson" else _json_array(key, rows)
+        content = _buffered(content)
+    content_type = "application/x-ndjson" if formato == "ndjson" else "application/json"
+    return StreamingHttpResponse(content, content_type=content_type)
+
+
+def _validadores(request, version):
+    """
+    ETag fuerte y Last-Modified (timestamp) a partir de la versión del recurso.
+    El ETag incluye la URL completa porque ?fields, ?limit, etc. cambian el cuerpo.
+    """
+    digest = hashlib.md5(request.get_full_path().encode(), usedforsecurity=False)
+    for parte in version:
+        digest.update(b"\0" + str(parte).encode())
+    fechas = [parte for parte in version if isinstance(parte, datetime.datetime)]
+    last_modified = int(max(fechas).timestamp()) if fechas else None
+    return f'"{digest.hexdigest()}"', last_modified
+
+
+def _condicional_antes(request, version):
+    if version is None:
+        return None, None, None
+    etag, last_modified = _validadores(request, version)
+    return get_conditional_response(request, etag=etag, last_modified=last_modified), etag, last_modified
+
+
+def _condicional_despues(response, etag, last_modified):
+    if etag is None or response.status_code not in (200, 304):
+        return response
+    response.headers.setdefault("ETag", etag)
+    if last_modified is not None:
+        response.headers.setdefault("Last-Modified", http_date(last_modified))
+    return response
+
+
+def condicional(version_func):
+    """
+    Conditional GET con ETag y Last-Modified para vistas de lectura.
+
+    version_func(request, *args, **kwargs) recibe los mismos argumentos que la
+    vista y retorna una tupla barata de calcular que cambia cuando cambia la
+    respuesta (ej. MAX(updated_at) y COUNT), o None si el recurso no existe.
+    Si el cliente ya tiene esa versión (If-None-Match / If-Modified-Since) se
+    responde 304 sin ejecutar la vista. Si version_func falla (parámetros
+    inválidos), se deja que la vista arme la respuesta de error.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_async(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view_func(request, *args, **kwargs)
+                try:
+                    version = await sync_to_async(version_func)(request, *args, **kwargs)
+                except Exception:
+                    version = None
+                response, etag, last_modified = _condicional_antes(request, version)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return _condicional_despues(response, etag, last_modified)
+
+            return _wrapped_async
+
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view_func(request, *args, **kwargs)
+            try:
+                version = version_func(request, *args, **kwargs)
+            except Exception:
+                version = None
+            response, etag, last_modified = _condicional_antes(request, version)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            return _condicional_despues(response, etag, last_modified)
+
+        return _wrapped
+
+    return decorator
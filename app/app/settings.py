@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import copy
 import os
 from dotenv import load_dotenv
 
@@ -58,9 +59,15 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'app.logs.RequestIdMiddleware',
+    'app.replicas.ReplicaMiddleware',
+    'app.metrics.MetricsMiddleware',
+    'app.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # <-- añadir ANTES de CommonMiddleware
+    # Después de CORS: los 429 llevan los headers CORS y el navegador puede leerlos
+    'app.throttle.ThrottleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -121,16 +128,171 @@ if DB_ENGINE:
             'PASSWORD': os.getenv('DB_PASSWORD'),
             'HOST': os.getenv('DB_HOST'),
             'PORT': os.getenv('DB_PORT', ''),
+            # Reusar la conexión entre requests en vez de abrir una por request.
+            # Con health checks se valida (SELECT 1) antes de reusarla en cada request.
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() in ('1', 'true', 'yes'),
+            'OPTIONS': {},
         }
     }
+    # Pool de psycopg 3 (requiere psycopg[pool]), uno por proceso: con N workers de
+    # gunicorn se abren hasta N * DB_POOL_MAX_SIZE conexiones, que deben entrar en
+    # max_connections de PostgreSQL. El pool reemplaza a CONN_MAX_AGE (Django exige 0)
+    # y con CONN_HEALTH_CHECKS valida cada conexión al sacarla del pool.
+    if os.getenv('DB_POOL', 'False').lower() in ('1', 'true', 'yes') and 'postgresql' in DB_ENGINE:
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '4')),
+            # Segundos esperando una conexión libre antes de fallar
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            # Cierra conexiones ociosas por encima de min_size y recicla las viejas
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+        }
+    # Réplicas de lectura: misma configuración que el primario con otro host
+    # ("host" o "host:puerto"). Los tests usan el primario (MIRROR).
+    for i, host in enumerate(h.strip() for h in os.getenv('DB_REPLICA_HOSTS', '').split(',') if h.strip()):
+        replica_host, _, replica_port = host.partition(':')
+        DATABASES[f'replica_{i + 1}'] = {
+            **DATABASES['default'],
+            'HOST': replica_host,
+            'PORT': replica_port or DATABASES['default']['PORT'],
+            'OPTIONS': copy.deepcopy(DATABASES['default']['OPTIONS']),
+            'TEST': {'MIRROR': 'default'},
+        }
 else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': str(BASE_DIR / 'db.sqlite3'),
+            'NAME': os.getenv('SQLITE_NAME', str(BASE_DIR / 'db.sqlite3')),
+            # IMMEDIATE toma el lock de escritura al abrir la transacción, así las
+            # ventas concurrentes esperan su turno en vez de fallar con "database is locked"
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            # Base de tests en archivo para que los tests con hilos usen conexiones separadas
+            'TEST': {
+                'NAME': str(BASE_DIR / 'test_db.sqlite3'),
+            },
         }
     }
 
+DATABASE_ROUTERS = ['app.replicas.ReplicaRouter']
+# Alias de las réplicas y apps cuyas lecturas pueden ir a ellas (ver app/replicas.py)
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+DATABASE_REPLICA_APPS = ('products', 'users')
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Por defecto se usa memoria local (un cache por worker). Para compartirlo entre
+# workers definir CACHE_BACKEND, por ejemplo:
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   CACHE_LOCATION=redis://localhost:6379/1
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'smartsales'),
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', '300')),
+    }
+}
+
+# Segundos que se guarda el detalle serializado de cada producto
+PRODUCTO_CACHE_TTL = int(os.getenv('PRODUCTO_CACHE_TTL', '300'))
+
+# Cache del usuario autenticado en jwt_required.
+# Cada worker guarda hasta JWT_USER_CACHE_SIZE usuarios durante JWT_USER_CACHE_TTL
+# segundos; con JWT_USER_CACHE_SHARED=True también se usa el cache 'default'.
+JWT_USER_CACHE_TTL = int(os.getenv('JWT_USER_CACHE_TTL', '30'))
+JWT_USER_CACHE_SIZE = int(os.getenv('JWT_USER_CACHE_SIZE', '1024'))
+JWT_USER_CACHE_SHARED = os.getenv('JWT_USER_CACHE_SHARED', 'False').lower() in ('1', 'true', 'yes')
+
+# Tokens (ver users/services/tokens.py)
+# JWT_ACCESS_TTL / JWT_REFRESH_TTL en segundos. Cada worker cachea hasta
+# JWT_DECODE_CACHE_SIZE tokens ya verificados y relee los revocados cada
+# JWT_REVOCATION_SYNC segundos.
+JWT_ACCESS_TTL = int(os.getenv('JWT_ACCESS_TTL', '3600'))
+JWT_REFRESH_TTL = int(os.getenv('JWT_REFRESH_TTL', str(30 * 24 * 3600)))
+JWT_DECODE_CACHE_SIZE = int(os.getenv('JWT_DECODE_CACHE_SIZE', '4096'))
+JWT_REVOCATION_SYNC = int(os.getenv('JWT_REVOCATION_SYNC', '5'))
+
+# Cola de trabajos en segundo plano (ver app/tasks.py)
+# 'thread' corre los trabajos en un pool de hilos; 'inline' los corre en el momento (tests)
+TASK_QUEUE_BACKEND = os.getenv('TASK_QUEUE_BACKEND', 'thread')
+TASK_QUEUE_WORKERS = int(os.getenv('TASK_QUEUE_WORKERS', '2'))
+
+# Función que sube las imágenes de productos. Se puede reemplazar por un
+# uploader local para probar sin conexión a Cloudinary.
+PRODUCTO_IMAGEN_UPLOADER = os.getenv('PRODUCTO_IMAGEN_UPLOADER', 'cloudinary.uploader.upload_resource')
+
+# Configuración de texto de PostgreSQL usada por la búsqueda de productos
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'spanish')
+# Sin PostgreSQL: construir el índice de búsqueda en memoria al arrancar cada worker
+SEARCH_INDEX_WARMUP = os.getenv('SEARCH_INDEX_WARMUP', 'True').lower() in ('1', 'true', 'yes')
+
+# Logging estructurado (ver app/logs.py)
+# LOG_SAMPLE_RATE: fracción de requests cuyos registros DEBUG/INFO se emiten (WARNING+ siempre)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '1.0'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'app.logs.RequestIdFilter'},
+        'sampling': {'()': 'app.logs.SamplingFilter', 'rate': LOG_SAMPLE_RATE},
+    },
+    'formatters': {
+        'json': {'()': 'app.logs.JsonFormatter'},
+    },
+    'handlers': {
+        'async': {
+            'class': 'app.logs.AsyncStreamHandler',
+            'maxsize': LOG_QUEUE_SIZE,
+            'formatter': 'json',
+            'filters': ['request_id', 'sampling'],
+        },
+    },
+    'loggers': {
+        app_name: {'handlers': ['async'], 'level': LOG_LEVEL, 'propagate': False}
+        for app_name in ('app', 'users', 'products', 'sales')
+    },
+}
+
+# Instrumentación por request (ver app/metrics.py)
+# QUERY_N_PLUS_ONE: '' (desactivado), 'warn' o 'raise'
+QUERY_N_PLUS_ONE = os.getenv('QUERY_N_PLUS_ONE', '')
+QUERY_N_PLUS_ONE_THRESHOLD = int(os.getenv('QUERY_N_PLUS_ONE_THRESHOLD', '5'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Serialización y compresión de respuestas (ver app/encoders.py y app/compression.py)
+# JSON_ENCODER: 'orjson' (usa json si orjson no está instalado) o 'json'
+JSON_ENCODER = os.getenv('JSON_ENCODER', 'orjson')
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+
+# Límite de requests con token bucket (ver app/throttle.py)
+# Rates como "cantidad/periodo" (s, min, h). 'write' aplica por IP a POST/PUT/PATCH/DELETE.
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+THROTTLE_RATES = {
+    'login_ip': os.getenv('THROTTLE_LOGIN_IP', '20/min'),
+    'login_correo': os.getenv('THROTTLE_LOGIN_CORREO', '5/min'),
+    'write': os.getenv('THROTTLE_WRITE', '300/min'),
+}
+THROTTLE_SHARED = os.getenv('THROTTLE_SHARED', 'False').lower() in ('1', 'true', 'yes')
+THROTTLE_MAX_KEYS = int(os.getenv('THROTTLE_MAX_KEYS', '10000'))
+# Header con la IP del cliente detrás de un proxy de confianza, ej. HTTP_X_FORWARDED_FOR
+THROTTLE_IP_HEADER = os.getenv('THROTTLE_IP_HEADER', '')
+
+# Registro masivo de usuarios (ver users/services/registro.py)
+# PASSWORD_HASH_WORKERS: procesos que hashean contraseñas en paralelo (1 = en el mismo proceso).
+# Cada worker web tiene su propio pool, por eso el valor por defecto es bajo
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(2, os.cpu_count() or 1))))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
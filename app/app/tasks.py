@@ -0,0 +1,64 @@
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
+from app.replicas import salir_del_request
+
+# Cola de trabajos en segundo plano.
+#
+# TASK_QUEUE_BACKEND:
+# - 'thread': los trabajos corren en un pool de hilos de cada worker, fuera del request.
+# - 'inline': los trabajos corren de inmediato en el mismo hilo (tests / sin red).
+#
+# Los trabajos pendientes viven en memoria: si el worker se reinicia se pierden.
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.TASK_QUEUE_WORKERS,
+                thread_name_prefix='tasks',
+            )
+    return _executor
+
+
+def _run(func, args, kwargs, close_connection):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Error en el trabajo %s", getattr(func, '__name__', func))
+    finally:
+        # Cada hilo del pool abre su propia conexión; no dejarla colgada
+        if close_connection:
+            connection.close()
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Encola func(*args, **kwargs) según TASK_QUEUE_BACKEND.
+    """
+    # Copiar el contexto para conservar el request id en los logs del trabajo,
+    # sin el routing a réplicas del request: los trabajos leen del primario
+    contexto = contextvars.copy_context()
+    contexto.run(salir_del_request)
+    if settings.TASK_QUEUE_BACKEND == 'inline':
+        contexto.run(_run, func, args, kwargs, False)
+    else:
+        _get_executor().submit(contexto.run, _run, func, args, kwargs, True)
+
+
+def enqueue_on_commit(func, *args, **kwargs):
+    """
+    Encola el trabajo cuando se confirme la transacción actual, para que vea
+    las filas recién escritas (o de inmediato si no hay transacción abierta).
+    """
+    transaction.on_commit(lambda: enqueue(func, *args, **kwargs))
@@ -0,0 +1,194 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
+from .responses import JsonResponse
+
+# Limitador de requests con token bucket.
+#
+# Cada (scope, clave) tiene un balde de `capacidad` fichas que se rellena a
+# `capacidad / periodo` fichas por segundo; cada request consume una. Sin
+# fichas se responde 429 con Retry-After, antes de leer la base de datos o
+# calcular un hash de contraseña.
+#
+# - THROTTLE_RATES define cada scope como "cantidad/periodo" (s, min, h), ej. "10/min".
+# - Por defecto los baldes viven en memoria de cada worker (un dict acotado a
+#   THROTTLE_MAX_KEYS claves). Con THROTTLE_SHARED=True se guardan en el cache
+#   'default' para compartir el límite entre workers; la lectura y escritura
+#   no son atómicas, así que en ráfagas concurrentes puede pasar alguna request de más.
+# - THROTTLE_IP_HEADER (ej. HTTP_X_FORWARDED_FOR) se usa detrás de un proxy de
+#   confianza: se toma la última IP, que es la que agregó el proxy.
+# - THROTTLE_ENABLED=False lo desactiva (benchmarks).
+
+THROTTLE_KEY_PREFIX = "throttle"
+
+_PERIODOS = {"s": 1, "seg": 1, "min": 60, "m": 60, "h": 3600, "hora": 3600}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """
+    Convierte "10/min" en (capacidad, periodo en segundos).
+    """
+    cantidad, _, periodo = rate.partition("/")
+    try:
+        capacidad = int(cantidad)
+        segundos = _PERIODOS[periodo.strip().lower()]
+    except (ValueError, KeyError):
+        raise ValueError(f"Rate inválido: {rate} (use cantidad/periodo, ej. 10/min)")
+    if capacidad <= 0:
+        raise ValueError(f"Rate inválido: {rate} (la cantidad debe ser mayor a 0)")
+    return capacidad, segundos
+
+
+def _consumir(balde, capacidad, periodo, ahora):
+    """
+    Recarga el balde (fichas, instante) hasta `ahora` e intenta consumir una ficha.
+    Retorna (nuevo balde, segundos a esperar o 0 si se permitió).
+    """
+    fichas, instante = balde if balde else (capacidad, ahora)
+    por_segundo = capacidad / periodo
+    fichas = min(capacidad, fichas + (ahora - instante) * por_segundo)
+    if fichas >= 1:
+        return (fichas - 1, ahora), 0
+    return (fichas, ahora), (1 - fichas) / por_segundo
+
+
+class _Baldes:
+    """
+    Baldes en memoria del worker, acotados a `maxsize` claves (se descartan las
+    menos usadas; un balde descartado vuelve a empezar lleno).
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, key, capacidad, periodo):
+        with self._lock:
+            balde, espera = _consumir(self._data.get(key), capacidad, periodo, time.monotonic())
+            self._data[key] = balde
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return espera
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local = _Baldes(settings.THROTTLE_MAX_KEYS)
+
+
+def _consumir_compartido(key, capacidad, periodo):
+    # Reloj de pared: el balde se comparte entre procesos
+    balde, espera = _consumir(cache.get(key), capacidad, periodo, time.time())
+    cache.set(key, balde, periodo)
+    return espera
+
+
+def check(scope, clave):
+    """
+    Consume una ficha del balde (scope, clave).
+    Retorna 0 si la request se permite, o los segundos a esperar si no.
+    """
+    if not settings.THROTTLE_ENABLED or clave is None:
+        return 0
+    capacidad, periodo = parse_rate(settings.THROTTLE_RATES[scope])
+    key = f"{THROTTLE_KEY_PREFIX}:{scope}:{clave}"
+    if settings.THROTTLE_SHARED:
+        return _consumir_compartido(key, capacidad, periodo)
+    return _local.consumir(key, capacidad, periodo)
+
+
+def reset():
+    """
+    Vacía los baldes en memoria de este worker (tests).
+    """
+    _local.clear()
+
+
+# ============= CLAVES =============
+
+def ip_cliente(request):
+    """
+    IP del cliente: REMOTE_ADDR, o la última IP de THROTTLE_IP_HEADER si está configurado.
+    """
+    if settings.THROTTLE_IP_HEADER:
+        reenviada = request.META.get(settings.THROTTLE_IP_HEADER, "")
+        ips = [ip.strip() for ip in reenviada.split(",") if ip.strip()]
+        if ips:
+            return ips[-1]
+    return request.META.get("REMOTE_ADDR")
+
+
+def correo_login(request):
+    """
+    Correo del body JSON del login, normalizado; None si no viene.
+    """
+    try:
+        correo = json.loads(request.body.decode() or "{}").get("correo")
+    except (ValueError, AttributeError):
+        return None
+    return correo.strip().lower() if isinstance(correo, str) and correo.strip() else None
+
+
+# ============= RESPUESTA =============
+
+def _limitada(espera):
+    segundos = max(1, int(espera + 0.999))
+    response = JsonResponse(
+        {"ok": False, "error": f"Demasiadas solicitudes, intente nuevamente en {segundos} s"},
+        status=429,
+    )
+    response["Retry-After"] = str(segundos)
+    return response
+
+
+def throttle(scope, clave_func):
+    """
+    Decorador: limita la vista según THROTTLE_RATES[scope] por clave_func(request)
+    (ej. ip_cliente o correo_login). Se pueden apilar varios.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_async(request, *args, **kwargs):
+                espera = check(scope, clave_func(request))
+                if espera:
+                    return _limitada(espera)
+                return await view_func(request, *args, **kwargs)
+
+            return _wrapped_async
+
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            espera = check(scope, clave_func(request))
+            if espera:
+                return _limitada(espera)
+            return view_func(request, *args, **kwargs)
+
+        return _wrapped
+
+    return decorator
+
+
+class ThrottleMiddleware(MiddlewareMixin):
+    """
+    Limita por IP los métodos de escritura (POST, PUT, PATCH, DELETE) con el scope 'write'.
+    """
+
+    def process_request(self, request):
+        if request.method in ("GET", "HEAD", "OPTIONS"):
+            return None
+        espera = check("write", ip_cliente(request))
+        if espera:
+            return _limitada(espera)
+        return None
@@ -24,6 +24,7 @@ urlpatterns = [
     # path('users/', include('users.urls')),
     path('users/', include('users.urls')),
     path('', views.hello  ),
+    path('metrics', views.metrics, name='metrics'),
     path('products/', include('products.urls')),
     path('sales/', include('sales.urls')), 
 ]
@@ -1,7 +1,23 @@
+from django.conf import settings
 from django.http import HttpResponse
+from django.views.decorators.http import require_http_methods
+from .metrics import registry
+from .responses import JsonResponse
 
 def hello(request):
     return HttpResponse("Hello, world! This is the main app view.")
 
 def register(request):
-    return HttpResponse("This is the registration page.")
\ No newline at end of file
+    return HttpResponse("This is the registration page.")
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """
+    GET /metrics
+    Métricas de este proceso en formato de Prometheus.
+    Si METRICS_TOKEN está definido se exige "Authorization: Bearer <token>".
+    """
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return JsonResponse({"ok": False, "error": "No autorizado"}, status=401)
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
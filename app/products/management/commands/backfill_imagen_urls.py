@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from products.models import Producto
+from products.services import cache as producto_cache
+from products.services import catalogo
+from products.services.imagenes import build_imagen_urls
+
+
+class Command(BaseCommand):
+    help = "Calcula y guarda las URLs de entrega (imagen_src/imagen_srcset) de los productos con imagen."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Recalcula todas las URLs, no solo las que faltan",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        qs = Producto.objects.exclude(imagen__isnull=True).exclude(imagen='')
+        if not options['all']:
+            qs = qs.filter(imagen_src__isnull=True)
+
+        pendientes = []
+        total = 0
+        for producto in qs.only('id', 'imagen', 'imagen_src', 'imagen_srcset').iterator(chunk_size=batch_size):
+            producto.imagen_src, producto.imagen_srcset = build_imagen_urls(producto.imagen)
+            pendientes.append(producto)
+            if len(pendientes) >= batch_size:
+                total += self._guardar(pendientes)
+                pendientes = []
+        if pendientes:
+            total += self._guardar(pendientes)
+
+        self.stdout.write(self.style.SUCCESS(f"URLs actualizadas: {total} productos"))
+
+    def _guardar(self, productos):
+        # bulk_update no dispara señales: se sincroniza el catálogo y se invalida el cache explícitamente
+        ahora = timezone.now()
+        for producto in productos:
+            producto.updated_at = ahora
+        Producto.objects.bulk_update(productos, ['imagen_src', 'imagen_srcset', 'updated_at'])
+        catalogo.sincronizar([p.id for p in productos])
+        producto_cache.invalidate_productos([p.id for p in productos])
+        return len(productos)
@@ -0,0 +1,172 @@
+import json
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from app import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra una base sqlite de benchmark y mide throughput y latencia "
+        "(p50/p95/p99) de los endpoints de catálogo, autenticación y usuarios."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', choices=benchmarks.ESCALAS, default='1k',
+                            help="Cantidad de productos, usuarios y ventas a sembrar")
+        parser.add_argument('--productos', type=int, help="Sobrescribe la cantidad de productos de la escala")
+        parser.add_argument('--usuarios', type=int, help="Sobrescribe la cantidad de usuarios de la escala")
+        parser.add_argument('--ventas', type=int, help="Sobrescribe la cantidad de ventas de la escala")
+        parser.add_argument('--requests', type=int, default=200, help="Requests por escenario")
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--driver', default='client',
+                            help="client, server, asgi o una lista separada por coma (ej. server,asgi)")
+        parser.add_argument('--concurrencia', type=int, default=4, help="Hilos del driver server")
+        parser.add_argument('--workers', type=int, default=2, help="Workers de gunicorn")
+        parser.add_argument('--escenarios', help="Nombres separados por coma (por defecto todos)")
+        parser.add_argument('--respuestas', action='store_true',
+                            help="Mide también serialización (json/orjson) y compresión (gzip/br) del listado de productos")
+        parser.add_argument('--conexiones', action='store_true',
+                            help="Solo mide el costo de conexión por request (sin reuso, persistente, pool) "
+                                 "contra la base configurada (DB_ENGINE); no siembra datos")
+        parser.add_argument('--db', default=str(settings.BASE_DIR / 'benchmark.sqlite3'),
+                            help="Archivo sqlite del benchmark")
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Reutiliza la base sembrada en una corrida anterior")
+        parser.add_argument('--guardar-baseline', help="Guarda los resultados en este JSON")
+        parser.add_argument('--baseline', help="Compara contra este JSON y falla si hay regresión")
+        parser.add_argument('--max-regresion', type=float, default=0.2,
+                            help="Fracción tolerada de empeoramiento (0.2 = 20%%)")
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help="Diferencias de latencia menores se consideran ruido")
+
+    def handle(self, *args, **options):
+        if options['conexiones']:
+            self._reportar_conexiones(benchmarks.medir_conexiones(repeticiones=options['requests']))
+            return
+        if connection.vendor != 'sqlite':
+            raise CommandError("El benchmark usa sqlite: ejecutar con DB_ENGINE vacío")
+        drivers = [d.strip() for d in options['driver'].split(',') if d.strip()]
+        invalidos = [d for d in drivers if d not in ('client', 'server', 'asgi')]
+        if invalidos or not drivers:
+            raise CommandError(f"Driver inválido: {', '.join(invalidos) or options['driver']}")
+
+        volumen = benchmarks.ESCALAS[options['escala']]
+        productos = options['productos'] if options['productos'] is not None else volumen
+        usuarios = options['usuarios'] if options['usuarios'] is not None else volumen
+        ventas = options['ventas'] if options['ventas'] is not None else volumen
+        if usuarios < 1:
+            raise CommandError("Se necesita al menos un usuario para autenticar los requests")
+
+        # Base propia del benchmark, creada y migrada como la de tests
+        connection.settings_dict['TEST']['NAME'] = options['db']
+        setup_test_environment(debug=False)
+        db_name = connection.creation.create_test_db(verbosity=0, keepdb=options['keepdb'])
+        try:
+            resultados = self._correr(options, drivers, productos, usuarios, ventas, db_name)
+            respuestas = benchmarks.medir_respuestas() if options['respuestas'] else None
+        finally:
+            if not options['keepdb']:
+                connection.creation.destroy_test_db(db_name, verbosity=0)
+            teardown_test_environment()
+
+        self._reportar(resultados, options['verbosity'])
+        if respuestas:
+            self._reportar_respuestas(respuestas)
+        meta = {
+            "escala": options['escala'],
+            "productos": productos,
+            "usuarios": usuarios,
+            "ventas": ventas,
+            "requests": options['requests'],
+            "concurrencia": options['concurrencia'],
+            "workers": options['workers'],
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        if respuestas:
+            meta["respuestas"] = respuestas
+        if options['guardar_baseline']:
+            benchmarks.guardar_baseline(options['guardar_baseline'], resultados, meta)
+            self.stdout.write(f"Baseline guardado en {options['guardar_baseline']}")
+        if options['baseline']:
+            regresiones = benchmarks.comparar(
+                resultados, options['baseline'], options['max_regresion'], options['min_delta_ms']
+            )
+            if regresiones:
+                raise CommandError("Regresiones de rendimiento:\n" + "\n".join(regresiones))
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto al baseline"))
+
+    def _correr(self, options, drivers, productos, usuarios, ventas, db_name):
+        from users.models import Usuario
+
+        if options['keepdb'] and Usuario.objects.exists():
+            self.stdout.write("Reutilizando datos sembrados")
+            datos = self._datos_existentes()
+        else:
+            inicio = time.perf_counter()
+            datos = benchmarks.sembrar(productos, usuarios, ventas)
+            self.stdout.write(f"Datos sembrados en {time.perf_counter() - inicio:.1f}s")
+
+        lista = benchmarks.escenarios(datos)
+        if options['escenarios']:
+            nombres = {n.strip() for n in options['escenarios'].split(',')}
+            lista = [e for e in lista if e.nombre in nombres]
+            if not lista:
+                raise CommandError("Ningún escenario coincide con --escenarios")
+        token = benchmarks.crear_token(datos['usuario_ids'][0])
+
+        resultados = []
+        if 'client' in drivers:
+            resultados += benchmarks.correr_client(lista, token, options['requests'], options['warmup'])
+        for driver in ('server', 'asgi'):
+            if driver not in drivers:
+                continue
+            try:
+                servidor = benchmarks.ServidorLocal(db_name, workers=options['workers'], asgi=driver == 'asgi')
+                with servidor:
+                    resultados += benchmarks.correr_servidor(
+                        lista, token, options['requests'], servidor.puerto,
+                        concurrencia=options['concurrencia'], warmup=options['warmup'], driver=driver,
+                    )
+            except RuntimeError as e:
+                raise CommandError(str(e))
+        return resultados
+
+    def _datos_existentes(self):
+        from products.models import Categoria, Producto
+        from users.models import Usuario
+
+        usuarios = list(Usuario.objects.order_by('id').values_list('id', 'correo'))
+        return {
+            "categoria_ids": list(Categoria.objects.values_list('id', flat=True)),
+            "producto_ids": list(Producto.objects.values_list('id', flat=True)),
+            "usuario_ids": [u[0] for u in usuarios],
+            "correos": [u[1] for u in usuarios],
+        }
+
+    def _reportar(self, resultados, verbosity):
+        encabezado = f"{'driver':<8}{'escenario':<26}{'req':>6}{'err':>5}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}"
+        self.stdout.write(encabezado)
+        self.stdout.write("-" * len(encabezado))
+        for r in resultados:
+            self.stdout.write(
+                f"{r['driver']:<8}{r['escenario']:<26}{r['requests']:>6}{r['errores']:>5}"
+                f"{r['throughput_rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+            )
+        if verbosity > 1:
+            self.stdout.write(json.dumps(resultados, indent=2))
+
+    def _reportar_respuestas(self, respuestas):
+        self.stdout.write("")
+        columnas = [c for c in respuestas[0] if c != "encoder"]
+        self.stdout.write(f"{'encoder':<10}" + "".join(f"{c:>12}" for c in columnas))
+        for fila in respuestas:
+            self.stdout.write(f"{fila['encoder']:<10}" + "".join(f"{fila[c]:>12}" for c in columnas))
+
+    def _reportar_conexiones(self, filas):
+        self.stdout.write(f"Conexiones a {connection.vendor} ({connection.settings_dict['NAME']})")
+        self.stdout.write(f"{'modo':<14}{'req':>6}{'p50':>10}{'p95':>10}")
+        for fila in filas:
+            self.stdout.write(f"{fila['modo']:<14}{fila['requests']:>6}{fila['p50_ms']:>10}{fila['p95_ms']:>10}")
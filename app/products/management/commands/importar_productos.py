@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ValidationError
+from products.services import importacion
+
+
+class Command(BaseCommand):
+    help = "Crea o actualiza productos en lote desde un archivo CSV o NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo .csv, .ndjson o .jsonl")
+        parser.add_argument('--formato', choices=importacion.FORMATOS)
+        parser.add_argument('--batch-size', type=int, default=importacion.IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        try:
+            formato = options['formato'] or importacion.detectar_formato(ruta)
+            with open(ruta, 'rb') as archivo:
+                resumen = importacion.importar_archivo(archivo, formato, options['batch_size'])
+        except (OSError, ValidationError) as e:
+            raise CommandError(str(e))
+
+        for error in resumen['errores']:
+            self.stderr.write(f"Fila {error['fila']}: {error['error']}")
+        if resumen['total_errores'] > len(resumen['errores']):
+            self.stderr.write(f"... y {resumen['total_errores'] - len(resumen['errores'])} errores más")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Filas procesadas: {resumen['procesadas']}, importadas: {resumen['importadas']}, "
+            f"con errores: {resumen['total_errores']}"
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from products.services import catalogo
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el modelo de lectura del catálogo (ProductoCatalogo) a partir de los productos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=catalogo.SYNC_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        total = catalogo.reconstruir(chunk_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Catálogo sincronizado: {total} productos"))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_producto_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_src',
+            field=models.CharField(blank=True, max_length=500, null=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_srcset',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
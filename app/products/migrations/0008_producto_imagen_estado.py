@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:34
+
+from django.db import migrations, models
+
+
+def marcar_imagenes_existentes(apps, schema_editor):
+    # Las imágenes subidas antes de la cola en segundo plano ya están listas
+    Producto = apps.get_model('products', 'Producto')
+    Producto.objects.exclude(imagen__isnull=True).exclude(imagen='').update(imagen_estado='lista')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_producto_imagen_src'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_estado',
+            field=models.CharField(choices=[('sin_imagen', 'Sin imagen'), ('pendiente', 'Pendiente'), ('lista', 'Lista'), ('error', 'Error')], default='sin_imagen', max_length=20),
+        ),
+        migrations.RunPython(marcar_imagenes_existentes, migrations.RunPython.noop),
+    ]
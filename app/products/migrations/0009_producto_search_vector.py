@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:36
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    # El índice GIN y el llenado inicial solo aplican a PostgreSQL;
+    # en sqlite la búsqueda usa el índice en memoria de services.search
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS producto_search_gin_idx "
+        "ON products_producto USING gin (search_vector)"
+    )
+    config = getattr(settings, 'SEARCH_CONFIG', 'spanish')
+    schema_editor.execute(
+        """
+        UPDATE products_producto p SET search_vector =
+            setweight(to_tsvector(%s::regconfig, coalesce(p.nombre, '')), 'A') ||
+            setweight(to_tsvector(%s::regconfig, coalesce(c.nombre, '') || ' ' || coalesce(m.nombre, '')), 'B') ||
+            setweight(to_tsvector(%s::regconfig, coalesce(p.descripcion, '')), 'C')
+        FROM products_categoria c, products_marca m
+        WHERE c.id = p.categoria_id AND m.id = p.marca_id
+        """,
+        [config, config, config],
+    )
+
+
+def eliminar_indice_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS producto_search_gin_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_producto_imagen_estado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(crear_indice_busqueda, eliminar_indice_busqueda),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_producto_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['categoria', '-created_at', '-id'], name='producto_cat_stock_idx'),
+        ),
+    ]
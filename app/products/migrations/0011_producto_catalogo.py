@@ -0,0 +1,135 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Columnas y formato de products.services.serializers.producto_from_row al
+# crear el catálogo. Se copian acá para que la migración no dependa del código
+# actual de la app, que puede cambiar después.
+_COLUMNAS = (
+    'id', 'nombre', 'descripcion', 'precio', 'stock', 'imagen_src', 'imagen_srcset', 'imagen_estado',
+    'created_at', 'updated_at', 'categoria_id', 'categoria__nombre', 'marca_id', 'marca__nombre',
+    'garantia_id', 'garantia__cobertura',
+)
+
+
+def _isoformat(valor):
+    return valor.isoformat() if valor else None
+
+
+def serializar(row):
+    return {
+        'id': row['id'],
+        'nombre': row['nombre'],
+        'descripcion': row['descripcion'],
+        'precio': str(row['precio']),
+        'stock': row['stock'],
+        'imagen_url': row['imagen_src'],
+        'imagen_srcset': row['imagen_srcset'],
+        'imagen_estado': row['imagen_estado'],
+        'created_at': _isoformat(row['created_at']),
+        'updated_at': _isoformat(row['updated_at']),
+        'categoria': {'id': row['categoria_id'], 'nombre': row['categoria__nombre']},
+        'marca': {'id': row['marca_id'], 'nombre': row['marca__nombre']},
+        'garantia': {
+            'id': row['garantia_id'],
+            'cobertura': row['garantia__cobertura'],
+        } if row['garantia_id'] else None,
+    }
+
+
+def poblar_catalogo(apps, schema_editor):
+    # Mismo contenido que services.catalogo.reconstruir, con los modelos históricos
+    Producto = apps.get_model('products', 'Producto')
+    ProductoCatalogo = apps.get_model('products', 'ProductoCatalogo')
+    ahora = timezone.now()
+    filas = []
+    for row in Producto.objects.order_by('id').values(*_COLUMNAS).iterator(chunk_size=1000):
+        filas.append(ProductoCatalogo(
+            producto_id=row['id'],
+            categoria_id=row['categoria_id'],
+            marca_id=row['marca_id'],
+            precio=row['precio'],
+            stock=row['stock'],
+            created_at=row['created_at'],
+            actualizado_at=ahora,
+            datos=serializar(row),
+        ))
+        if len(filas) >= 1000:
+            ProductoCatalogo.objects.bulk_create(filas)
+            filas = []
+    ProductoCatalogo.objects.bulk_create(filas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_producto_cat_stock_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoCatalogo',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='catalogo', serialize=False, to='products.producto')),
+                ('categoria_id', models.BigIntegerField()),
+                ('marca_id', models.BigIntegerField()),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('stock', models.IntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('actualizado_at', models.DateTimeField()),
+                ('datos', models.JSONField()),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_created_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_cat_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_marca_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_precio_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_en_stock_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_cat_stock_idx',
+        ),
+        migrations.AddIndex(
+            model_name='productocatalogo',
+            index=models.Index(fields=['-created_at', '-producto'], name='catalogo_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productocatalogo',
+            index=models.Index(fields=['categoria_id', '-created_at', '-producto'], name='catalogo_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productocatalogo',
+            index=models.Index(fields=['marca_id', '-created_at', '-producto'], name='catalogo_marca_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productocatalogo',
+            index=models.Index(fields=['precio', 'producto'], name='catalogo_precio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productocatalogo',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['-created_at', '-producto'], name='catalogo_en_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productocatalogo',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['categoria_id', '-created_at', '-producto'], name='catalogo_cat_stock_idx'),
+        ),
+        migrations.RunPython(poblar_catalogo, migrations.RunPython.noop),
+    ]
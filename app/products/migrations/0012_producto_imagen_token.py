@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_producto_catalogo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_token',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True),
+        ),
+    ]
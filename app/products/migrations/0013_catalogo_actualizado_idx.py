@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_producto_imagen_token'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productocatalogo',
+            index=models.Index(fields=['actualizado_at'], name='catalogo_actualizado_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from cloudinary.models import CloudinaryField
+from .services.imagenes import build_imagen_urls
 # Create your models here.
 
 class Categoria(models.Model):
@@ -30,6 +32,18 @@ class Garantia(models.Model):
         return f"Garantía de {self.duracion_meses} meses para {self.producto.nombre}"
     
 class Producto(models.Model):
+    # Estado de la imagen: la subida a Cloudinary se hace en segundo plano
+    IMAGEN_SIN_IMAGEN = 'sin_imagen'
+    IMAGEN_PENDIENTE = 'pendiente'
+    IMAGEN_LISTA = 'lista'
+    IMAGEN_ERROR = 'error'
+    IMAGEN_ESTADOS = [
+        (IMAGEN_SIN_IMAGEN, 'Sin imagen'),
+        (IMAGEN_PENDIENTE, 'Pendiente'),
+        (IMAGEN_LISTA, 'Lista'),
+        (IMAGEN_ERROR, 'Error'),
+    ]
+
     nombre = models.CharField(max_length=200)
     descripcion = models.TextField()
     precio = models.DecimalField(max_digits=10, decimal_places=2)
@@ -50,6 +64,17 @@ class Producto(models.Model):
         }
     )
 
+    imagen_estado = models.CharField(max_length=20, choices=IMAGEN_ESTADOS, default=IMAGEN_SIN_IMAGEN)
+    # Token de la última subida encolada; una subida con otro token quedó obsoleta
+    imagen_token = models.CharField(max_length=32, blank=True, null=True, editable=False)
+
+    # URLs de entrega precalculadas al subir la imagen (ver services.imagenes)
+    imagen_src = models.CharField(max_length=500, blank=True, null=True)
+    imagen_srcset = models.JSONField(blank=True, null=True)
+
+    # Vector de búsqueda (solo PostgreSQL, índice GIN). Lo mantiene services.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
     categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='productos')
     marca = models.ForeignKey(Marca, on_delete=models.CASCADE, related_name='productos')
     garantia = models.ForeignKey(Garantia, on_delete=models.CASCADE, related_name='productos', blank=True, null=True)
@@ -57,9 +82,67 @@ class Producto(models.Model):
     def __str__(self):
         return self.nombre
 
+    def save(self, *args, **kwargs):
+        # La subida a Cloudinary ocurre dentro de super().save(); después de eso
+        # self.imagen ya es un CloudinaryResource y se pueden calcular las URLs.
+        super().save(*args, **kwargs)
+        imagen = self._meta.get_field('imagen').to_python(self.imagen)
+        src, srcset = build_imagen_urls(imagen)
+        if src != self.imagen_src or srcset != self.imagen_srcset:
+            self.imagen_src = src
+            self.imagen_srcset = srcset
+            # Con save (no update) post_save vuelve a sincronizar cache, búsqueda y
+            # ProductoCatalogo con las URLs nuevas; updated_at también cambia (auto_now)
+            super().save(update_fields=['imagen_src', 'imagen_srcset', 'updated_at'])
+
     @property
     def imagen_url(self):
         """Retorna la URL completa de la imagen"""
+        if self.imagen_src:
+            return self.imagen_src
         if self.imagen:
             return self.imagen.url
         return None
+
+
+class ProductoCatalogo(models.Model):
+    """
+    Modelo de lectura del catálogo: una fila por producto con las columnas de
+    filtro y orden del listado y el producto ya serializado (con categoría,
+    marca y garantía). Lo mantiene services.catalogo; no se edita directamente.
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True, related_name='catalogo')
+    categoria_id = models.BigIntegerField()
+    marca_id = models.BigIntegerField()
+    precio = models.DecimalField(max_digits=10, decimal_places=2)
+    stock = models.IntegerField()
+    created_at = models.DateTimeField()
+    # Momento de la última sincronización: cambia también cuando cambia la
+    # categoría, marca o garantía del producto (versión para los ETag)
+    actualizado_at = models.DateTimeField()
+    datos = models.JSONField()
+
+    class Meta:
+        # Índices para la paginación por cursor (created_at, producto) y sus filtros
+        indexes = [
+            models.Index(fields=['-created_at', '-producto'], name='catalogo_created_idx'),
+            models.Index(fields=['categoria_id', '-created_at', '-producto'], name='catalogo_cat_created_idx'),
+            models.Index(fields=['marca_id', '-created_at', '-producto'], name='catalogo_marca_created_idx'),
+            models.Index(fields=['precio', 'producto'], name='catalogo_precio_idx'),
+            models.Index(
+                fields=['-created_at', '-producto'],
+                name='catalogo_en_stock_idx',
+                condition=models.Q(stock__gt=0),
+            ),
+            # Listado de una categoría con en_stock=true (el filtro más usado en la tienda)
+            models.Index(
+                fields=['categoria_id', '-created_at', '-producto'],
+                name='catalogo_cat_stock_idx',
+                condition=models.Q(stock__gt=0),
+            ),
+            # MAX(actualizado_at) y COUNT del ETag del listado (services.producto.version_productos)
+            models.Index(fields=['actualizado_at'], name='catalogo_actualizado_idx'),
+        ]
+
+    def __str__(self):
+        return f"ProductoCatalogo {self.producto_id}"
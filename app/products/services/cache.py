@@ -0,0 +1,99 @@
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from app.replicas import leer_del_primario
+
+# Prefijo de las llaves del detalle de producto en el cache
+PRODUCTO_KEY_PREFIX = "producto"
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _producto_key(producto_id):
+    return f"{PRODUCTO_KEY_PREFIX}:{producto_id}"
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def get_producto(producto_id, loader):
+    """
+    Lee el detalle serializado de un producto desde el cache.
+    Si no existe, lo construye con loader(producto_id) y lo guarda.
+    """
+    key = _producto_key(producto_id)
+    data = cache.get(key)
+    if data is not None:
+        _count("hits")
+        return data
+
+    _count("misses")
+    # Una réplica atrasada dejaría el producto viejo en cache durante todo el TTL
+    with leer_del_primario():
+        data = loader(producto_id)
+    cache.set(key, data, settings.PRODUCTO_CACHE_TTL)
+    return data
+
+
+async def aget_producto(producto_id, loader):
+    """
+    Versión async de get_producto; loader debe ser una función async.
+    """
+    key = _producto_key(producto_id)
+    data = await cache.aget(key)
+    if data is not None:
+        _count("hits")
+        return data
+
+    _count("misses")
+    with leer_del_primario():
+        data = await loader(producto_id)
+    await cache.aset(key, data, settings.PRODUCTO_CACHE_TTL)
+    return data
+
+
+def invalidate_productos(producto_ids):
+    """
+    Elimina del cache el detalle de los productos indicados.
+    Se borra de inmediato y otra vez al confirmar la transacción, para que
+    una lectura concurrente no vuelva a guardar datos anteriores al commit.
+    """
+    keys = [_producto_key(producto_id) for producto_id in producto_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+    _count("invalidations", len(keys))
+
+
+def descartar_si_cambio(producto_id, version):
+    """
+    Elimina la entrada del producto si su versión no es la indicada (la de la
+    base). Con un cache por worker, la invalidación de otro worker no llega acá.
+    """
+    key = _producto_key(producto_id)
+    data = cache.get(key)
+    if data is not None and data["version"] != version:
+        cache.delete(key)
+
+
+def get_stats():
+    """
+    Retorna los contadores de aciertos/fallos de este worker.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / total, 4) if total else None
+    stats["ttl"] = settings.PRODUCTO_CACHE_TTL
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
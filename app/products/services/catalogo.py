@@ -0,0 +1,82 @@
+from django.utils import timezone
+from ..models import Producto, ProductoCatalogo
+from .serializers import producto_from_row, producto_values
+
+# Modelo de lectura del catálogo (ProductoCatalogo).
+#
+# Cada producto tiene una fila plana con las columnas que filtran y ordenan el
+# listado y el producto ya serializado en `datos`. El listado, la exportación y
+# el detalle leen solo esa tabla, sin joins; las escrituras siguen usando
+# Producto, Categoria, Marca y Garantia.
+#
+# Se actualiza en la misma transacción que la escritura:
+# - señales de Producto, Categoria, Marca y Garantia (products.signals)
+# - llamadas explícitas donde se escribe con update() o bulk_create, que no
+#   disparan señales (checkout, inventario, importación, backfill)
+# Si se modifican productos por SQL, `manage.py sincronizar_catalogo` reconstruye
+# la tabla completa (se puede programar como refresco periódico).
+
+SYNC_CHUNK_SIZE = 1000
+
+_CAMPOS = ["categoria_id", "marca_id", "precio", "stock", "created_at", "actualizado_at", "datos"]
+
+
+def _fila(row, ahora):
+    return ProductoCatalogo(
+        producto_id=row["id"],
+        categoria_id=row["categoria_id"],
+        marca_id=row["marca_id"],
+        precio=row["precio"],
+        stock=row["stock"],
+        created_at=row["created_at"],
+        actualizado_at=ahora,
+        datos=producto_from_row(row),
+    )
+
+
+def _guardar(filas):
+    ProductoCatalogo.objects.bulk_create(
+        filas, update_conflicts=True, unique_fields=["producto"], update_fields=_CAMPOS,
+    )
+
+
+def sincronizar(producto_ids):
+    """
+    Reconstruye las filas de los productos indicados a partir de los modelos
+    normalizados (borra las de productos que ya no existen). Retorna la
+    cantidad de filas guardadas.
+    """
+    producto_ids = sorted(set(producto_ids))
+    ahora = timezone.now()
+    total = 0
+    for inicio in range(0, len(producto_ids), SYNC_CHUNK_SIZE):
+        lote = producto_ids[inicio:inicio + SYNC_CHUNK_SIZE]
+        filas = [_fila(row, ahora) for row in producto_values(Producto.objects.filter(id__in=lote))]
+        if filas:
+            _guardar(filas)
+        faltantes = set(lote) - {fila.producto_id for fila in filas}
+        if faltantes:
+            ProductoCatalogo.objects.filter(producto_id__in=faltantes).delete()
+        total += len(filas)
+    return total
+
+
+def reconstruir(chunk_size=SYNC_CHUNK_SIZE):
+    """
+    Reconstruye todo el catálogo por lotes y borra las filas huérfanas.
+    Retorna la cantidad de filas guardadas.
+    """
+    ahora = timezone.now()
+    total = 0
+    filas = []
+    for row in producto_values(Producto.objects.order_by("id")).iterator(chunk_size=chunk_size):
+        filas.append(_fila(row, ahora))
+        if len(filas) >= chunk_size:
+            _guardar(filas)
+            total += len(filas)
+            filas = []
+    if filas:
+        _guardar(filas)
+        total += len(filas)
+    ProductoCatalogo.objects.exclude(producto_id__in=Producto.objects.values("id")).delete()
+    return total
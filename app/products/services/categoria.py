@@ -1,14 +1,34 @@
 from django.db import transaction
+from django.db.models import Count, Max
 from django.core.exceptions import ValidationError
 from ..models import Categoria
+from .serializers import categoria_values, serialize_categoria
 
 
-def get_all_categorias():
+def get_all_categorias(fields=None):
     """
     Obtiene todas las categorías.
     """
-    qs = Categoria.objects.all().values("id", "nombre", "descripcion", "created_at", "updated_at")
-    return list(qs)
+    return list(categoria_values(Categoria.objects.all(), fields))
+
+async def aget_all_categorias(fields=None):
+    """
+    Versión async de get_all_categorias.
+    """
+    return [row async for row in categoria_values(Categoria.objects.all(), fields)]
+
+def version_categorias():
+    """
+    Estado del listado para ETag/Last-Modified: (MAX(updated_at), COUNT).
+    """
+    version = Categoria.objects.aggregate(ultimo=Max('updated_at'), total=Count('id'))
+    return version['ultimo'], version['total']
+
+def version_categoria(categoria_id):
+    """
+    Estado de una categoría para ETag/Last-Modified, o None si no existe.
+    """
+    return Categoria.objects.filter(pk=categoria_id).values_list('updated_at').first()
 
 def get_categoria_by_id(categoria_id):
     """
@@ -16,13 +36,7 @@ def get_categoria_by_id(categoria_id):
     """
     try:
         categoria = Categoria.objects.get(pk=categoria_id)
-        return {
-            "id": categoria.id,
-            "nombre": categoria.nombre,
-            "descripcion": categoria.descripcion,
-            "created_at": categoria.created_at,
-            "updated_at": categoria.updated_at,
-        }
+        return serialize_categoria(categoria)
     except Categoria.DoesNotExist:
         raise ValidationError(f"Categoría con id {categoria_id} no encontrada")
 
@@ -38,13 +52,7 @@ def create_categoria(nombre, descripcion=None):
             nombre=nombre.strip(),
             descripcion=descripcion
         )
-        return {
-            "id": categoria.id,
-            "nombre": categoria.nombre,
-            "descripcion": categoria.descripcion,
-            "created_at": categoria.created_at,
-            "updated_at": categoria.updated_at,
-        }
+        return serialize_categoria(categoria)
 
 def update_categoria(categoria_id, nombre=None, descripcion=None):
     """
@@ -64,13 +72,7 @@ def update_categoria(categoria_id, nombre=None, descripcion=None):
             
             categoria.save()
             
-            return {
-                "id": categoria.id,
-                "nombre": categoria.nombre,
-                "descripcion": categoria.descripcion,
-                "created_at": categoria.created_at,
-                "updated_at": categoria.updated_at,
-            }
+            return serialize_categoria(categoria)
     except Categoria.DoesNotExist:
         raise ValidationError(f"Categoría con id {categoria_id} no encontrada")
 
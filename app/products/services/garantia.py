@@ -1,23 +1,39 @@
 from django.db import transaction
+from django.db.models import Count, Max, Subquery
 from django.core.exceptions import ValidationError
 from ..models import Garantia, Marca
+from .serializers import garantia_from_row, garantia_values, serialize_garantia
 
-def get_all_garantias():
+def get_all_garantias(fields=None):
     """
     Obtiene todas las garantías con información de la marca.
     """
-    garantias = Garantia.objects.select_related('Marca').all()
-    result = []
-    for garantia in garantias:
-        result.append({
-            "id": garantia.id,
-            "cobertura": garantia.cobertura,
-            "marca": {
-                "id": garantia.Marca.id,
-                "nombre": garantia.Marca.nombre,
-            } if garantia.Marca else None,
-        })
-    return result
+    rows = garantia_values(Garantia.objects.all(), fields)
+    return [garantia_from_row(row, fields) for row in rows]
+
+async def aget_all_garantias(fields=None):
+    """
+    Versión async de get_all_garantias.
+    """
+    rows = garantia_values(Garantia.objects.all(), fields)
+    return [garantia_from_row(row, fields) async for row in rows]
+
+def version_garantias():
+    """
+    Estado del listado para ETag/Last-Modified: MAX(updated_at), COUNT y la
+    última modificación de marcas (el listado incluye su nombre).
+    """
+    ultima_marca = Subquery(Marca.objects.order_by('-updated_at').values('updated_at')[:1])
+    version = Garantia.objects.aggregate(
+        ultimo=Max('updated_at'), total=Count('id'), marcas=Max(ultima_marca)
+    )
+    return version['ultimo'], version['total'], version['marcas']
+
+def version_garantia(garantia_id):
+    """
+    Estado de una garantía para ETag/Last-Modified, o None si no existe.
+    """
+    return Garantia.objects.filter(pk=garantia_id).values_list('updated_at', 'Marca__updated_at').first()
 
 def get_garantia_by_id(garantia_id):
     """
@@ -25,14 +41,7 @@ def get_garantia_by_id(garantia_id):
     """
     try:
         garantia = Garantia.objects.select_related('Marca').get(pk=garantia_id)
-        return {
-            "id": garantia.id,
-            "cobertura": garantia.cobertura,
-            "marca": {
-                "id": garantia.Marca.id,
-                "nombre": garantia.Marca.nombre,
-            } if garantia.Marca else None,
-        }
+        return serialize_garantia(garantia)
     except Garantia.DoesNotExist:
         raise ValidationError(f"Garantía con id {garantia_id} no encontrada")
 
@@ -56,14 +65,7 @@ def create_garantia(cobertura, marca_id):
             cobertura=cobertura,
             Marca=marca
         )
-        return {
-            "id": garantia.id,
-            "cobertura": garantia.cobertura,
-            "marca": {
-                "id": garantia.Marca.id,
-                "nombre": garantia.Marca.nombre,
-            },
-        }
+        return serialize_garantia(garantia)
 
 def update_garantia(garantia_id, cobertura=None, marca_id=None):
     """
@@ -0,0 +1,135 @@
+import io
+import uuid
+import cloudinary.uploader
+from cloudinary import CloudinaryResource
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# URLs de entrega de las imágenes de productos.
+#
+# Las URLs se calculan una sola vez cuando la imagen se sube o cambia y se
+# guardan en Producto.imagen_src / Producto.imagen_srcset, así los listados no
+# llaman al SDK de Cloudinary por cada fila.
+
+# Anchos (px) de las variantes responsivas
+IMAGEN_ANCHOS = (320, 640, 800)
+
+# Transformación aplicada a cada variante
+_VARIANTE_OPCIONES = {
+    'crop': 'limit',
+    'quality': 'auto',
+    'fetch_format': 'auto',
+}
+
+
+def build_imagen_urls(imagen):
+    """
+    Retorna (src, srcset) para un CloudinaryResource.
+    srcset es un dict {ancho: url}; ambos son None si no hay imagen.
+    """
+    if not imagen or not getattr(imagen, 'public_id', None):
+        return None, None
+    src = imagen.url
+    srcset = {
+        str(ancho): imagen.build_url(width=ancho, **_VARIANTE_OPCIONES)
+        for ancho in IMAGEN_ANCHOS
+    }
+    return src, srcset
+
+
+# ============= SUBIDA EN SEGUNDO PLANO =============
+
+def leer_imagen(imagen):
+    """
+    Lee en memoria el archivo recibido en el request.
+    El archivo temporal del request se elimina al responder, por eso el
+    trabajo en segundo plano recibe (contenido, nombre) y no el archivo.
+    """
+    if hasattr(imagen, 'seek'):
+        imagen.seek(0)
+    return imagen.read(), imagen.name
+
+
+def _opciones_subida():
+    # Las mismas opciones que usaría CloudinaryField al subir en save()
+    from ..models import Producto
+    field = Producto._meta.get_field('imagen')
+    options = {"type": field.type, "resource_type": field.resource_type}
+    options.update(field.options)
+    return options
+
+
+def nuevo_token_imagen():
+    """
+    Token que identifica una subida encolada (ver Producto.imagen_token).
+    """
+    return uuid.uuid4().hex
+
+
+def subir_imagen_producto(producto_id, contenido, nombre, token):
+    """
+    Sube la imagen de un producto y la adjunta cuando termina.
+    Se ejecuta desde la cola (app.tasks), fuera del request y de su transacción.
+
+    La imagen solo se adjunta si token sigue siendo el imagen_token del
+    producto; si se encoló otra subida después (o ya terminó), esta quedó
+    obsoleta y se elimina de Cloudinary. La imagen anterior se lee con la fila
+    bloqueada y se elimina al confirmar, así dos actualizaciones seguidas no
+    dejan imágenes huérfanas.
+    """
+    from ..models import Producto
+
+    uploader = import_string(settings.PRODUCTO_IMAGEN_UPLOADER)
+    archivo = io.BytesIO(contenido)
+    archivo.name = nombre
+
+    try:
+        recurso = uploader(archivo, **_opciones_subida())
+    except Exception:
+        with transaction.atomic():
+            producto = Producto.objects.select_for_update().filter(pk=producto_id, imagen_token=token).first()
+            if producto is not None:
+                producto.imagen_estado = Producto.IMAGEN_ERROR
+                producto.imagen_token = None
+                producto.save(update_fields=['imagen_estado', 'imagen_token', 'updated_at'])
+        raise
+
+    with transaction.atomic():
+        producto = Producto.objects.select_for_update().filter(pk=producto_id).first()
+        if producto is None or producto.imagen_token != token:
+            # El producto se eliminó o se pidió otra imagen mientras se subía esta
+            transaction.on_commit(lambda: destruir_imagen(recurso.public_id))
+            return
+
+        public_id_anterior = producto.imagen.public_id if producto.imagen else None
+        producto.imagen = recurso
+        producto.imagen_estado = Producto.IMAGEN_LISTA
+        producto.imagen_token = None
+        producto.save(update_fields=['imagen', 'imagen_estado', 'imagen_token', 'updated_at'])
+
+        if public_id_anterior and public_id_anterior != recurso.public_id:
+            transaction.on_commit(lambda: destruir_imagen(public_id_anterior))
+
+
+def destruir_imagen(public_id):
+    """
+    Elimina una imagen de Cloudinary.
+    """
+    cloudinary.uploader.destroy(public_id)
+
+
+def upload_offline(archivo, **options):
+    """
+    Uploader sin red para desarrollo y tests (PRODUCTO_IMAGEN_UPLOADER).
+    No guarda el archivo; solo arma el recurso que devolvería Cloudinary.
+    """
+    nombre, _, formato = archivo.name.rpartition('.')
+    public_id = f"{options.get('folder', 'productos')}/{nombre or formato}"
+    return CloudinaryResource(
+        public_id=public_id,
+        format=formato if nombre else None,
+        version='1',
+        type=options.get('type', 'upload'),
+        resource_type=options.get('resource_type', 'image'),
+    )
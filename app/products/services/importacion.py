@@ -0,0 +1,266 @@
+import codecs
+import csv
+import json
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from ..models import Producto, Categoria, Marca, Garantia
+from . import cache as producto_cache
+from . import catalogo
+from .search import indexar_productos
+
+# Importación masiva de productos desde CSV o NDJSON.
+#
+# El archivo se lee fila a fila y se procesa por lotes: cada lote valida sus
+# filas, resuelve categorías/marcas/garantías con una consulta por modelo
+# (in_bulk) y se guarda con un solo bulk_create. Las filas con "id" actualizan
+# el producto existente (upsert, un id inexistente es un error de la fila); las
+# demás crean productos nuevos.
+
+FORMATOS = ("csv", "ndjson")
+IMPORT_CHUNK_SIZE = 2000
+# Máximo de errores detallados en el resultado (el total siempre se informa)
+MAX_ERRORES = 1000
+
+COLUMNAS_REQUERIDAS = ("nombre", "descripcion", "precio", "stock", "categoria_id", "marca_id")
+COLUMNAS = ("id",) + COLUMNAS_REQUERIDAS + ("garantia_id",)
+
+# Campos que se sobrescriben cuando la fila trae el id de un producto existente
+_UPDATE_FIELDS = [
+    "nombre", "descripcion", "precio", "stock", "categoria", "marca", "garantia", "updated_at",
+]
+
+_PRECIO_MAX = Decimal("99999999.99")
+_CENTAVOS = Decimal("0.01")
+_NOMBRE_MAX = Producto._meta.get_field("nombre").max_length
+
+
+def detectar_formato(nombre_archivo=None, content_type=None):
+    """
+    Deduce el formato a partir de la extensión o del Content-Type.
+    """
+    nombre_archivo = (nombre_archivo or "").lower()
+    content_type = (content_type or "").lower()
+    if nombre_archivo.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    if nombre_archivo.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    raise ValidationError(f"No se pudo determinar el formato del archivo (use {', '.join(FORMATOS)})")
+
+
+def leer_filas(archivo, formato):
+    """
+    Recorre un archivo binario y produce (numero_de_fila, dict) sin cargarlo
+    completo en memoria. Las líneas NDJSON inválidas producen (fila, None).
+    """
+    if formato not in FORMATOS:
+        raise ValidationError(f"Formato inválido: {formato} (use {', '.join(FORMATOS)})")
+
+    texto = codecs.iterdecode(archivo, "utf-8-sig")
+    if formato == "csv":
+        reader = csv.DictReader(texto)
+        faltantes = [c for c in COLUMNAS_REQUERIDAS if c not in (reader.fieldnames or [])]
+        if faltantes:
+            raise ValidationError(f"Faltan columnas en el CSV: {', '.join(faltantes)}")
+        # La fila 1 es el encabezado
+        return ((reader.line_num, row) for row in reader)
+    return _leer_ndjson(texto)
+
+
+def _leer_ndjson(lineas):
+    for numero, linea in enumerate(lineas, start=1):
+        if not linea.strip():
+            continue
+        try:
+            row = json.loads(linea)
+        except ValueError:
+            row = None
+        yield numero, row if isinstance(row, dict) else None
+
+
+# ============= VALIDACIÓN =============
+
+def _texto(valor):
+    return str(valor).strip() if valor is not None else ""
+
+
+def _entero(valor, campo, opcional=False):
+    valor = _texto(valor)
+    if not valor:
+        if opcional:
+            return None
+        raise ValueError(f"{campo} es obligatorio")
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValueError(f"{campo} debe ser un entero")
+
+
+def _validar_fila(row):
+    """
+    Convierte una fila cruda en los valores del producto. Lanza ValueError con
+    el motivo si la fila es inválida.
+    """
+    if row is None:
+        raise ValueError("Fila con formato inválido")
+
+    nombre = _texto(row.get("nombre"))
+    descripcion = _texto(row.get("descripcion"))
+    if not nombre:
+        raise ValueError("El nombre del producto es obligatorio")
+    if len(nombre) > _NOMBRE_MAX:
+        raise ValueError(f"El nombre no puede superar {_NOMBRE_MAX} caracteres")
+    if not descripcion:
+        raise ValueError("La descripción del producto es obligatoria")
+
+    try:
+        precio = Decimal(_texto(row.get("precio"))).quantize(_CENTAVOS, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError("precio debe ser un número")
+    if not precio.is_finite() or precio <= 0 or precio > _PRECIO_MAX:
+        raise ValueError("El precio debe ser mayor a 0")
+
+    stock = _entero(row.get("stock"), "stock")
+    if stock < 0:
+        raise ValueError("El stock no puede ser negativo")
+
+    return {
+        "id": _entero(row.get("id"), "id", opcional=True),
+        "nombre": nombre,
+        "descripcion": descripcion,
+        "precio": precio,
+        "stock": stock,
+        "categoria_id": _entero(row.get("categoria_id"), "categoria_id"),
+        "marca_id": _entero(row.get("marca_id"), "marca_id"),
+        "garantia_id": _entero(row.get("garantia_id"), "garantia_id", opcional=True),
+    }
+
+
+class _Referencias:
+    """
+    Ids de categorías, marcas y garantías ya confirmados en la base de datos,
+    para no volver a consultarlos en cada lote.
+    """
+
+    def __init__(self):
+        self._existentes = {Categoria: set(), Marca: set(), Garantia: set()}
+
+    def resolver(self, model, ids):
+        existentes = self._existentes[model]
+        nuevos = set(ids) - existentes - {None}
+        if nuevos:
+            existentes.update(model.objects.only("id").in_bulk(nuevos))
+        return existentes
+
+
+# ============= IMPORTACIÓN =============
+
+def _guardar_lote(filas):
+    """
+    Inserta/actualiza un lote de (numero_de_fila, valores) ya validados y sin
+    ids repetidos. Retorna (ids guardados, [(numero_de_fila, id)] de las filas
+    cuyo id no existe).
+    """
+    pedidos = [valores["id"] for _, valores in filas if valores["id"] is not None]
+    ahora = timezone.now()
+    with transaction.atomic():
+        # Las filas con id solo actualizan productos existentes: insertar un id
+        # explícito no avanza la secuencia de PostgreSQL y los productos creados
+        # después chocarían con él. El bloqueo evita que se borren antes del upsert.
+        existentes = set(
+            Producto.objects.select_for_update().filter(id__in=pedidos).values_list("id", flat=True)
+        ) if pedidos else set()
+        faltantes = [
+            (numero, valores["id"]) for numero, valores in filas
+            if valores["id"] is not None and valores["id"] not in existentes
+        ]
+        productos = [
+            Producto(**valores, created_at=ahora, updated_at=ahora)
+            for _, valores in filas
+            if valores["id"] is None or valores["id"] in existentes
+        ]
+        if not productos:
+            return [], faltantes
+        Producto.objects.bulk_create(
+            productos,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=_UPDATE_FIELDS,
+        )
+        ids = [p.pk for p in productos if p.pk is not None]
+        # bulk_create no dispara señales: el catálogo se actualiza en la misma transacción
+        catalogo.sincronizar(ids)
+    return ids, faltantes
+
+
+def importar_productos(filas, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Importa productos a partir de un iterable de (numero_de_fila, dict).
+    Retorna un resumen con la cantidad de filas procesadas, importadas y los
+    errores por fila.
+    """
+    if chunk_size <= 0:
+        raise ValidationError("El tamaño de lote debe ser mayor a 0")
+
+    referencias = _Referencias()
+    resumen = {"procesadas": 0, "importadas": 0, "total_errores": 0, "errores": []}
+
+    def error(numero, mensaje):
+        resumen["total_errores"] += 1
+        if len(resumen["errores"]) < MAX_ERRORES:
+            resumen["errores"].append({"fila": numero, "error": mensaje})
+
+    filas = iter(filas)
+    while True:
+        lote = list(islice(filas, chunk_size))
+        if not lote:
+            break
+        resumen["procesadas"] += len(lote)
+
+        validas = []
+        for numero, row in lote:
+            try:
+                validas.append((numero, _validar_fila(row)))
+            except ValueError as e:
+                error(numero, str(e))
+
+        # Una consulta por modelo para todo el lote
+        categorias = referencias.resolver(Categoria, (v["categoria_id"] for _, v in validas))
+        marcas = referencias.resolver(Marca, (v["marca_id"] for _, v in validas))
+        garantias = referencias.resolver(Garantia, (v["garantia_id"] for _, v in validas))
+
+        # Si un id se repite en el lote gana la última fila
+        ultima_fila = {valores["id"]: numero for numero, valores in validas if valores["id"] is not None}
+
+        a_guardar = []
+        for numero, valores in validas:
+            if valores["id"] is not None and ultima_fila[valores["id"]] != numero:
+                error(numero, f"id {valores['id']} repetido en el lote, se usa la fila {ultima_fila[valores['id']]}")
+            elif valores["categoria_id"] not in categorias:
+                error(numero, f"Categoría con id {valores['categoria_id']} no encontrada")
+            elif valores["marca_id"] not in marcas:
+                error(numero, f"Marca con id {valores['marca_id']} no encontrada")
+            elif valores["garantia_id"] is not None and valores["garantia_id"] not in garantias:
+                error(numero, f"Garantía con id {valores['garantia_id']} no encontrada")
+            else:
+                a_guardar.append((numero, valores))
+
+        if a_guardar:
+            ids, faltantes = _guardar_lote(a_guardar)
+            for numero, producto_id in faltantes:
+                error(numero, f"Producto con id {producto_id} no encontrado (omita id para crear uno nuevo)")
+            resumen["importadas"] += len(ids)
+            # bulk_create no dispara señales: cache y búsqueda se actualizan aquí
+            producto_cache.invalidate_productos(ids)
+            indexar_productos(ids)
+
+    return resumen
+
+
+def importar_archivo(archivo, formato, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Importa productos desde un archivo binario (subido o abierto en disco).
+    """
+    return importar_productos(leer_filas(archivo, formato), chunk_size)
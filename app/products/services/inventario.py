@@ -0,0 +1,179 @@
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from ..models import Producto
+from . import cache as producto_cache
+from . import catalogo
+
+# Actualización masiva de stock y precio (sincronización con el ERP).
+#
+# Cada lote se aplica con un único UPDATE ... CASE sobre las filas bloqueadas.
+# La versión de un producto es su updated_at: si el item trae "version" y no
+# coincide con la actual, el item se rechaza como conflicto. Reenviar el mismo
+# lote no vuelve a escribir: los items que ya tienen esos valores quedan
+# como "sin_cambios".
+
+BULK_UPDATE_CHUNK_SIZE = 500
+MAX_BULK_ITEMS = 10000
+
+ESTADO_ACTUALIZADO = "actualizado"
+ESTADO_SIN_CAMBIOS = "sin_cambios"
+ESTADO_CONFLICTO = "conflicto"
+ESTADO_NO_ENCONTRADO = "no_encontrado"
+ESTADO_ERROR = "error"
+
+_PRECIO = DecimalField(max_digits=10, decimal_places=2)
+_CENTAVOS = Decimal("0.01")
+_PRECIO_MAX = Decimal("99999999.99")
+
+
+def _version(updated_at):
+    return updated_at.isoformat() if updated_at else None
+
+
+def _normalizar_item(item):
+    """
+    Valida un item {id, stock?, precio?, version?}. Lanza ValueError con el motivo.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Cada item debe ser un objeto")
+    try:
+        producto_id = int(item.get("id"))
+    except (TypeError, ValueError):
+        raise ValueError("id debe ser un entero")
+
+    stock = item.get("stock")
+    precio = item.get("precio")
+    if stock is None and precio is None:
+        raise ValueError("Debe especificar stock y/o precio")
+
+    if stock is not None:
+        try:
+            stock = int(stock)
+        except (TypeError, ValueError):
+            raise ValueError("stock debe ser un entero")
+        if stock < 0:
+            raise ValueError("El stock no puede ser negativo")
+
+    if precio is not None:
+        try:
+            precio = Decimal(str(precio)).quantize(_CENTAVOS)
+        except InvalidOperation:
+            raise ValueError("precio debe ser un número")
+        if not precio.is_finite() or precio <= 0:
+            raise ValueError("El precio debe ser mayor a 0")
+        if precio > _PRECIO_MAX:
+            raise ValueError(f"El precio no puede superar {_PRECIO_MAX}")
+
+    version = item.get("version")
+    if version is not None:
+        version = parse_datetime(str(version))
+        if version is None:
+            raise ValueError("version inválida (use el updated_at del producto)")
+
+    return {"id": producto_id, "stock": stock, "precio": precio, "version": version}
+
+
+def _aplicar_lote(items, resultados):
+    """
+    Aplica un lote de (posicion, item) ya validados. Guarda el resultado de cada
+    item en su posición y retorna los ids modificados.
+    """
+    cambios = {}
+    with transaction.atomic():
+        actuales = {
+            row["id"]: row
+            for row in Producto.objects.select_for_update()
+            .filter(id__in=[item["id"] for _, item in items])
+            .order_by("id")
+            .values("id", "stock", "precio", "updated_at")
+        }
+
+        pendientes = []
+        for posicion, item in items:
+            actual = actuales.get(item["id"])
+            if actual is None:
+                resultados[posicion] = {"id": item["id"], "estado": ESTADO_NO_ENCONTRADO}
+                continue
+
+            nuevo = {
+                campo: item[campo]
+                for campo in ("stock", "precio")
+                if item[campo] is not None and item[campo] != actual[campo]
+            }
+            resultado = {"id": item["id"], "version": _version(actual["updated_at"])}
+            if not nuevo:
+                resultado["estado"] = ESTADO_SIN_CAMBIOS
+            elif item["version"] is not None and item["version"] != actual["updated_at"]:
+                resultado["estado"] = ESTADO_CONFLICTO
+            else:
+                resultado["estado"] = ESTADO_ACTUALIZADO
+                cambios[item["id"]] = nuevo
+                pendientes.append(resultado)
+            resultados[posicion] = resultado
+
+        if cambios:
+            ahora = timezone.now()
+            stock_cases = [When(id=pid, then=Value(c["stock"])) for pid, c in cambios.items() if "stock" in c]
+            precio_cases = [
+                When(id=pid, then=Value(c["precio"], output_field=_PRECIO))
+                for pid, c in cambios.items() if "precio" in c
+            ]
+            valores = {"updated_at": ahora}
+            if stock_cases:
+                valores["stock"] = Case(*stock_cases, default=F("stock"), output_field=IntegerField())
+            if precio_cases:
+                valores["precio"] = Case(*precio_cases, default=F("precio"), output_field=_PRECIO)
+            Producto.objects.filter(id__in=list(cambios)).update(**valores)
+            # update() no dispara señales: el catálogo se actualiza en la misma transacción
+            catalogo.sincronizar(cambios)
+
+            for resultado in pendientes:
+                resultado["version"] = _version(ahora)
+
+    return list(cambios)
+
+
+def bulk_update_inventario(items, chunk_size=BULK_UPDATE_CHUNK_SIZE):
+    """
+    Actualiza stock y/o precio de muchos productos.
+    items: [{"id": 1, "stock": 10, "precio": "99.90", "version": "<updated_at>"}, ...]
+    Retorna {"resultados": [...]} más la cantidad de items por estado
+    (ej: {"actualizado": 3, "sin_cambios": 1}).
+    """
+    if not isinstance(items, list) or not items:
+        raise ValidationError("Debe enviar una lista de items")
+    if len(items) > MAX_BULK_ITEMS:
+        raise ValidationError(f"Máximo {MAX_BULK_ITEMS} items por solicitud")
+
+    # Los resultados se devuelven en el mismo orden que los items
+    resultados = [None] * len(items)
+    validos = []
+    vistos = set()
+    for posicion, item in enumerate(items):
+        try:
+            normalizado = _normalizar_item(item)
+        except ValueError as e:
+            item_id = item.get("id") if isinstance(item, dict) else None
+            resultados[posicion] = {"id": item_id, "estado": ESTADO_ERROR, "error": str(e)}
+            continue
+        if normalizado["id"] in vistos:
+            resultados[posicion] = {"id": normalizado["id"], "estado": ESTADO_ERROR, "error": "id repetido en la solicitud"}
+            continue
+        vistos.add(normalizado["id"])
+        validos.append((posicion, normalizado))
+
+    modificados = []
+    for inicio in range(0, len(validos), chunk_size):
+        modificados += _aplicar_lote(validos[inicio:inicio + chunk_size], resultados)
+
+    # update() no dispara señales: una sola invalidación para todo el request
+    producto_cache.invalidate_productos(modificados)
+
+    totales = {}
+    for resultado in resultados:
+        totales[resultado["estado"]] = totales.get(resultado["estado"], 0) + 1
+    return {"resultados": resultados, **totales}
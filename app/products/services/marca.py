@@ -1,13 +1,33 @@
 from django.db import transaction
+from django.db.models import Count, Max
 from django.core.exceptions import ValidationError
 from ..models import Marca
+from .serializers import marca_values, serialize_marca
 
-def get_all_marcas():
+def get_all_marcas(fields=None):
     """
     Obtiene todas las marcas.
     """
-    qs = Marca.objects.all().values("id", "nombre","created_at", "updated_at")
-    return list(qs)
+    return list(marca_values(Marca.objects.all(), fields))
+
+async def aget_all_marcas(fields=None):
+    """
+    Versión async de get_all_marcas.
+    """
+    return [row async for row in marca_values(Marca.objects.all(), fields)]
+
+def version_marcas():
+    """
+    Estado del listado para ETag/Last-Modified: (MAX(updated_at), COUNT).
+    """
+    version = Marca.objects.aggregate(ultimo=Max('updated_at'), total=Count('id'))
+    return version['ultimo'], version['total']
+
+def version_marca(marca_id):
+    """
+    Estado de una marca para ETag/Last-Modified, o None si no existe.
+    """
+    return Marca.objects.filter(pk=marca_id).values_list('updated_at').first()
 
 def get_marca_by_id(marca_id):
     """
@@ -15,12 +35,7 @@ def get_marca_by_id(marca_id):
     """
     try:
         marca = Marca.objects.get(pk=marca_id)
-        return {
-            "id": marca.id,
-            "nombre": marca.nombre,
-            "created_at": marca.created_at,
-            "updated_at": marca.updated_at,
-        }
+        return serialize_marca(marca)
     except Marca.DoesNotExist:
         raise ValidationError(f"Marca con id {marca_id} no encontrada")
 
@@ -35,12 +50,7 @@ def create_marca(nombre):
         marca = Marca.objects.create(
             nombre=nombre.strip(),
         )
-        return {
-            "id": marca.id,
-            "nombre": marca.nombre,
-            "created_at": marca.created_at,
-            "updated_at": marca.updated_at,
-        }
+        return serialize_marca(marca)
 
 def update_marca(marca_id, nombre=None):
     """
@@ -57,12 +67,7 @@ def update_marca(marca_id, nombre=None):
             
             marca.save()
             
-            return {
-                "id": marca.id,
-                "nombre": marca.nombre,
-                "created_at": marca.created_at,
-                "updated_at": marca.updated_at,
-            }
+            return serialize_marca(marca)
     except Marca.DoesNotExist:
         raise ValidationError(f"Marca con id {marca_id} no encontrada")
 
@@ -1,69 +1,192 @@
 from django.db import transaction
+from django.db.models import Count, Max, Q
 from django.core.exceptions import ValidationError
-from ..models import Producto, Categoria, Marca, Garantia
-import cloudinary.uploader
+from django.utils.dateparse import parse_datetime
+from ..models import Producto, ProductoCatalogo, Categoria, Marca, Garantia
+from . import cache as producto_cache
+from .serializers import pick_fields, serialize_producto
+from .imagenes import destruir_imagen, leer_imagen, nuevo_token_imagen, subir_imagen_producto
+from app.tasks import enqueue_on_commit
+import base64
+import json
+import logging
 
-def get_all_productos():
+logger = logging.getLogger(__name__)
+
+# Tamaño de página por defecto y máximo para el listado paginado
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Filas por consulta al exportar con streaming
+STREAM_CHUNK_SIZE = 2000
+
+# Las lecturas (listado, exportación, detalle) usan ProductoCatalogo, que ya
+# tiene el producto serializado; las escrituras usan Producto (ver services.catalogo).
+
+def get_all_productos(fields=None):
     """
     Obtiene todos los productos con información de categoría, marca y garantía.
     """
-    productos = Producto.objects.select_related('categoria', 'marca', 'garantia').all()
-    result = []
-    for producto in productos:
-        result.append({
-            "id": producto.id,
-            "nombre": producto.nombre,
-            "descripcion": producto.descripcion,
-            "precio": str(producto.precio),
-            "stock": producto.stock,
-            "imagen_url": producto.imagen_url,  # Corregido: imagen_url
-            "created_at": producto.created_at.isoformat() if producto.created_at else None,
-            "updated_at": producto.updated_at.isoformat() if producto.updated_at else None,
-            "categoria": {
-                "id": producto.categoria.id,
-                "nombre": producto.categoria.nombre,
-            },
-            "marca": {
-                "id": producto.marca.id,
-                "nombre": producto.marca.nombre,
-            },
-            "garantia": {
-                "id": producto.garantia.id,
-                "cobertura": producto.garantia.cobertura,
-            } if producto.garantia else None,
-        })
-    return result
+    return [pick_fields(datos, fields) for datos in ProductoCatalogo.objects.values_list('datos', flat=True)]
+
+def _encode_cursor(created_at, producto_id):
+    """
+    Codifica la posición (created_at, id) de un producto como cursor opaco.
+    """
+    raw = json.dumps([created_at.isoformat(), producto_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    """
+    Decodifica un cursor generado por _encode_cursor.
+    """
+    try:
+        created_at, producto_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError(cursor)
+        return created_at, int(producto_id)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValidationError("Cursor inválido")
+
+def _filtered_productos(categoria_id=None, marca_id=None, precio_min=None, precio_max=None, en_stock=None):
+    """
+    Construye el queryset del catálogo aplicando los filtros del listado.
+    """
+    if precio_min is not None and precio_max is not None and precio_min > precio_max:
+        raise ValidationError("precio_min no puede ser mayor a precio_max")
+
+    qs = ProductoCatalogo.objects.all()
+
+    if categoria_id is not None:
+        qs = qs.filter(categoria_id=categoria_id)
+    if marca_id is not None:
+        qs = qs.filter(marca_id=marca_id)
+    if precio_min is not None:
+        qs = qs.filter(precio__gte=precio_min)
+    if precio_max is not None:
+        qs = qs.filter(precio__lte=precio_max)
+    if en_stock is True:
+        qs = qs.filter(stock__gt=0)
+    elif en_stock is False:
+        qs = qs.filter(stock__lte=0)
+    return qs.order_by('-created_at', '-producto')
+
+def _limite(limit):
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    if limit <= 0:
+        raise ValidationError("El límite debe ser mayor a 0")
+    return min(limit, MAX_PAGE_SIZE)
+
+def consulta_pagina(cursor=None, limit=DEFAULT_PAGE_SIZE, **filtros):
+    """
+    Consulta de una página del listado (sin ejecutar), con un registro extra
+    para saber si existe una página siguiente.
+    Filtros: categoria_id, marca_id, precio_min, precio_max, en_stock.
+    """
+    limit = _limite(limit)
+    qs = _filtered_productos(**filtros)
+
+    if cursor:
+        created_at, producto_id = _decode_cursor(cursor)
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, producto_id__lt=producto_id))
+
+    return qs.values('producto_id', 'created_at', 'datos')[:limit + 1]
+
+def _page(rows, limit, fields):
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "productos": [pick_fields(row["datos"], fields) for row in rows],
+        "next_cursor": _encode_cursor(rows[-1]["created_at"], rows[-1]["producto_id"]) if has_more else None,
+        "has_more": has_more,
+    }
+
+def get_productos_page(cursor=None, limit=DEFAULT_PAGE_SIZE, fields=None, **filtros):
+    """
+    Obtiene una página de productos ordenada por (created_at, id) descendente.
+    Usa paginación por cursor (keyset), por lo que el costo de cada página no
+    depende de la cantidad de productos anteriores.
+    Filtros: categoria_id, marca_id, precio_min, precio_max, en_stock.
+    """
+    limit = _limite(limit)
+    return _page(list(consulta_pagina(cursor, limit, **filtros)), limit, fields)
+
+async def aget_productos_page(cursor=None, limit=DEFAULT_PAGE_SIZE, fields=None, **filtros):
+    """
+    Versión async de get_productos_page.
+    """
+    limit = _limite(limit)
+    return _page([row async for row in consulta_pagina(cursor, limit, **filtros)], limit, fields)
+
+def iter_productos(chunk_size=STREAM_CHUNK_SIZE, fields=None, **filtros):
+    """
+    Recorre todos los productos por bloques sin cargarlos en memoria.
+    Pensado para exportaciones con StreamingHttpResponse.
+    """
+    rows = _filtered_productos(**filtros).values_list('datos', flat=True)
+    return (pick_fields(datos, fields) for datos in rows.iterator(chunk_size=chunk_size))
+
+def aiter_productos(chunk_size=STREAM_CHUNK_SIZE, fields=None, **filtros):
+    """
+    Versión async de iter_productos, para StreamingHttpResponse bajo ASGI.
+    """
+    rows = _filtered_productos(**filtros).values_list('datos', flat=True)
+
+    async def _iter():
+        async for datos in rows.aiterator(chunk_size=chunk_size):
+            yield pick_fields(datos, fields)
+
+    return _iter()
+
+def version_productos():
+    """
+    Estado del listado para ETag/Last-Modified: (MAX(actualizado_at), COUNT)
+    del catálogo, servido por catalogo_actualizado_idx. Los filtros ya forman
+    parte del ETag a través de la URL.
+    """
+    version = ProductoCatalogo.objects.aggregate(ultimo=Max('actualizado_at'), total=Count('pk'))
+    return version['ultimo'], version['total']
+
+def version_producto(producto_id):
+    """
+    Estado del detalle de un producto para ETag/Last-Modified, o None si no existe.
+    Se lee de la base (no del cache del worker) y descarta la entrada del cache
+    si quedó atrás, para que el cuerpo corresponda al ETag.
+    """
+    row = ProductoCatalogo.objects.filter(pk=producto_id).values_list('actualizado_at').first()
+    if row is None:
+        return None
+    producto_cache.descartar_si_cambio(producto_id, row[0])
+    return row
+
+# En el cache se guarda {"producto": datos, "version": actualizado_at}
+
+def _load_producto(producto_id):
+    row = ProductoCatalogo.objects.filter(pk=producto_id).values_list('datos', 'actualizado_at').first()
+    if row is None:
+        raise ValidationError(f"Producto con id {producto_id} no encontrado")
+    return {"producto": row[0], "version": row[1]}
 
 def get_producto_by_id(producto_id):
     """
     Obtiene un producto por su ID con toda la información relacionada.
+    El resultado se guarda en cache y se invalida por señales (ver products.signals).
     """
-    try:
-        producto = Producto.objects.select_related('categoria', 'marca', 'garantia').get(pk=producto_id)
-        return {
-            "id": producto.id,
-            "nombre": producto.nombre,
-            "descripcion": producto.descripcion,
-            "precio": str(producto.precio),
-            "stock": producto.stock,
-            "imagen_url": producto.imagen_url,  # Corregido: imagen_url
-            "created_at": producto.created_at.isoformat() if producto.created_at else None,
-            "updated_at": producto.updated_at.isoformat() if producto.updated_at else None,
-            "categoria": {
-                "id": producto.categoria.id,
-                "nombre": producto.categoria.nombre,
-            },
-            "marca": {
-                "id": producto.marca.id,
-                "nombre": producto.marca.nombre,
-            },
-            "garantia": {
-                "id": producto.garantia.id,
-                "cobertura": producto.garantia.cobertura,
-            } if producto.garantia else None,
-        }
-    except Producto.DoesNotExist:
+    return producto_cache.get_producto(producto_id, _load_producto)["producto"]
+
+async def _aload_producto(producto_id):
+    row = await ProductoCatalogo.objects.filter(pk=producto_id).values_list('datos', 'actualizado_at').afirst()
+    if row is None:
         raise ValidationError(f"Producto con id {producto_id} no encontrado")
+    return {"producto": row[0], "version": row[1]}
+
+async def aget_producto_by_id(producto_id):
+    """
+    Versión async de get_producto_by_id.
+    """
+    return (await producto_cache.aget_producto(producto_id, _aload_producto))["producto"]
 
 def create_producto(nombre, descripcion, precio, stock, categoria_id, marca_id, garantia_id=None, imagen=None):
     """
@@ -106,6 +229,11 @@ def create_producto(nombre, descripcion, precio, stock, categoria_id, marca_id,
         except Garantia.DoesNotExist:
             raise ValidationError(f"Garantía con id {garantia_id} no encontrada")
     
+    # La imagen se lee antes de abrir la transacción y se sube en segundo plano
+    imagen_pendiente = leer_imagen(imagen) if imagen else None
+
+    token = nuevo_token_imagen() if imagen_pendiente else None
+
     with transaction.atomic():
         producto = Producto.objects.create(
             nombre=nombre.strip(),
@@ -115,82 +243,61 @@ def create_producto(nombre, descripcion, precio, stock, categoria_id, marca_id,
             categoria=categoria,
             marca=marca,
             garantia=garantia,
-            imagen=imagen
+            imagen_estado=Producto.IMAGEN_PENDIENTE if imagen_pendiente else Producto.IMAGEN_SIN_IMAGEN,
+            imagen_token=token,
         )
-        
-        return {
-            "id": producto.id,
-            "nombre": producto.nombre,
-            "descripcion": producto.descripcion,
-            "precio": str(producto.precio),
-            "stock": producto.stock,
-            "imagen_url": producto.imagen_url,
-            "created_at": producto.created_at.isoformat() if producto.created_at else None,
-            "updated_at": producto.updated_at.isoformat() if producto.updated_at else None,
-            "categoria": {
-                "id": producto.categoria.id,
-                "nombre": producto.categoria.nombre,
-            },
-            "marca": {
-                "id": producto.marca.id,
-                "nombre": producto.marca.nombre,
-            },
-            "garantia": {
-                "id": producto.garantia.id,
-                "cobertura": producto.garantia.cobertura,
-            } if producto.garantia else None,
-        }
+        if imagen_pendiente:
+            enqueue_on_commit(subir_imagen_producto, producto.id, *imagen_pendiente, token)
+
+        return serialize_producto(producto)
 
 def update_producto(producto_id, nombre=None, descripcion=None, precio=None, stock=None, 
                     categoria_id=None, marca_id=None, garantia_id=None, imagen=None):
     """
     Actualiza un producto existente con soporte para actualizar imagen en Cloudinary.
     """
-    print(f"[SERVICE update_producto] Iniciando actualización para producto ID: {producto_id}")
-    print(f"[SERVICE update_producto] Parámetros recibidos:")
-    print(f"  - nombre: {nombre}")
-    print(f"  - descripcion: {descripcion}")
-    print(f"  - precio: {precio}")
-    print(f"  - stock: {stock}")
-    print(f"  - categoria_id: {categoria_id}")
-    print(f"  - marca_id: {marca_id}")
-    print(f"  - garantia_id: {garantia_id}")
-    print(f"  - imagen: {imagen}")
-    
+    # La imagen se lee antes de abrir la transacción y se sube en segundo plano
+    imagen_pendiente = leer_imagen(imagen) if imagen is not None else None
+
     try:
         with transaction.atomic():
-            print(f"[SERVICE update_producto] Buscando producto ID: {producto_id}")
-            producto = Producto.objects.select_related('categoria', 'marca', 'garantia').get(pk=producto_id)
-            print(f"[SERVICE update_producto] ✅ Producto encontrado: {producto.nombre}")
-            
+            # Bloqueo de la fila: save() escribe imagen y no debe pisar la que
+            # adjunte una subida en segundo plano entre la lectura y el guardado
+            producto = (
+                Producto.objects.select_related('categoria', 'marca', 'garantia')
+                .select_for_update(of=('self',))
+                .get(pk=producto_id)
+            )
+            cambios = []
+
             if nombre is not None:
                 if not nombre.strip():
                     raise ValidationError("El nombre no puede estar vacío")
-                print(f"[SERVICE update_producto] Actualizando nombre: '{producto.nombre}' -> '{nombre}'")
+                cambios.append("nombre")
                 producto.nombre = nombre.strip()
             
             if descripcion is not None:
                 if not descripcion.strip():
                     raise ValidationError("La descripción no puede estar vacía")
-                print(f"[SERVICE update_producto] Actualizando descripción")
+                cambios.append("descripcion")
                 producto.descripcion = descripcion.strip()
             
             if precio is not None:
                 if precio <= 0:
                     raise ValidationError("El precio debe ser mayor a 0")
-                print(f"[SERVICE update_producto] Actualizando precio: {producto.precio} -> {precio}")
+                cambios.append("precio")
                 producto.precio = precio
             
             if stock is not None:
                 if stock < 0:
                     raise ValidationError("El stock no puede ser negativo")
-                print(f"[SERVICE update_producto] Actualizando stock: {producto.stock} -> {stock}")
+                cambios.append("stock")
                 producto.stock = stock
             
             if categoria_id is not None:
                 try:
                     categoria = Categoria.objects.get(pk=categoria_id)
-                    print(f"[SERVICE update_producto] Actualizando categoría: {producto.categoria.nombre} -> {categoria.nombre}")
+                    cambios.append("categoria")
                     producto.categoria = categoria
                 except Categoria.DoesNotExist:
                     raise ValidationError(f"Categoría con id {categoria_id} no encontrada")
@@ -198,81 +305,52 @@ def update_producto(producto_id, nombre=None, descripcion=None, precio=None, sto
             if marca_id is not None:
                 try:
                     marca = Marca.objects.get(pk=marca_id)
-                    print(f"[SERVICE update_producto] Actualizando marca: {producto.marca.nombre} -> {marca.nombre}")
+                    cambios.append("marca")
                     producto.marca = marca
                 except Marca.DoesNotExist:
                     raise ValidationError(f"Marca con id {marca_id} no encontrada")
             
             if garantia_id is not None:
                 if garantia_id == 0:  # Permitir eliminar garantía enviando 0
-                    print(f"[SERVICE update_producto] Eliminando garantía")
+                    cambios.append("garantia")
                     producto.garantia = None
                 else:
                     try:
                         garantia = Garantia.objects.get(pk=garantia_id)
-                        print(f"[SERVICE update_producto] Actualizando garantía")
+                        cambios.append("garantia")
                         producto.garantia = garantia
                     except Garantia.DoesNotExist:
                         raise ValidationError(f"Garantía con id {garantia_id} no encontrada")
             
-            # Si hay nueva imagen, Cloudinary automáticamente reemplaza la anterior
-            if imagen is not None:
-                print(f"[SERVICE update_producto] Actualizando imagen: {imagen.name if imagen else 'None'}")
-                producto.imagen = imagen
+            # Si hay nueva imagen se sube al confirmar. El token nuevo deja obsoletas
+            # las subidas anteriores que sigan en curso; la imagen anterior la
+            # elimina la subida al terminar (ver imagenes.subir_imagen_producto)
+            if imagen_pendiente is not None:
+                cambios.append("imagen")
+                producto.imagen_estado = Producto.IMAGEN_PENDIENTE
+                producto.imagen_token = nuevo_token_imagen()
+                enqueue_on_commit(subir_imagen_producto, producto.id, *imagen_pendiente, producto.imagen_token)
             
-            print(f"[SERVICE update_producto] Guardando producto...")
             producto.save()
-            print(f"[SERVICE update_producto] ✅ Producto guardado exitosamente")
-            
-            return {
-                "id": producto.id,
-                "nombre": producto.nombre,
-                "descripcion": producto.descripcion,
-                "precio": str(producto.precio),
-                "stock": producto.stock,
-                "imagen_url": producto.imagen_url,
-                "created_at": producto.created_at.isoformat() if producto.created_at else None,
-                "updated_at": producto.updated_at.isoformat() if producto.updated_at else None,
-                "categoria": {
-                    "id": producto.categoria.id,
-                    "nombre": producto.categoria.nombre,
-                },
-                "marca": {
-                    "id": producto.marca.id,
-                    "nombre": producto.marca.nombre,
-                },
-                "garantia": {
-                    "id": producto.garantia.id,
-                    "cobertura": producto.garantia.cobertura,
-                } if producto.garantia else None,
-            }
+            logger.info("Producto actualizado", extra={"producto_id": producto_id, "campos": cambios})
+
+            return serialize_producto(producto)
     except Producto.DoesNotExist:
-        print(f"[SERVICE update_producto] ❌ Producto con id {producto_id} no encontrado")
         raise ValidationError(f"Producto con id {producto_id} no encontrado")
-    except Exception as e:
-        print(f"[SERVICE update_producto] ❌ Error inesperado: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise
 
 def delete_producto(producto_id):
     """
     Elimina un producto por su ID y su imagen de Cloudinary si existe.
+    La imagen se elimina en segundo plano después de confirmar la transacción.
     """
     try:
         with transaction.atomic():
             producto = Producto.objects.get(pk=producto_id)
-            
+
             # Eliminar imagen de Cloudinary si existe
             if producto.imagen:
-                try:
-                    # Obtener el public_id de Cloudinary
-                    public_id = producto.imagen.public_id
-                    cloudinary.uploader.destroy(public_id)
-                except Exception as e:
-                    # Log error pero continuar con la eliminación del producto
-                    print(f"Error al eliminar imagen de Cloudinary: {e}")
-            
+                enqueue_on_commit(destruir_imagen, producto.imagen.public_id)
+
             producto.delete()
             return True
     except Producto.DoesNotExist:
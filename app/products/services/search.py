@@ -0,0 +1,349 @@
+import bisect
+import heapq
+import logging
+import re
+import threading
+import unicodedata
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F
+from ..models import Producto
+from .serializers import producto_columns, producto_from_row
+
+# Búsqueda de productos por nombre, descripción, categoría y marca.
+#
+# - PostgreSQL: columna Producto.search_vector (tsvector con pesos A/B/C) con
+#   índice GIN, consultada con websearch_to_tsquery y ordenada con ts_rank.
+# - Otros motores (sqlite en desarrollo): índice invertido en memoria de cada
+#   worker, construido al arrancar (precalentar_indice, desde wsgi/asgi) o en la
+#   primera búsqueda y actualizado por señales al confirmar la transacción.
+#   Los cambios hechos por otros procesos no se ven hasta reiniciar.
+#
+# Solo se pueden recorrer los primeros MAX_SEARCH_RESULTS resultados: las
+# páginas más profundas cuestan cada vez más y no las usa nadie.
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MAX_SEARCH_RESULTS = 1000
+
+# Índice en memoria: si el término más selectivo de la búsqueda aparece en más
+# productos que esto, solo se rankean sus MAX_CANDIDATOS de mayor peso
+MAX_CANDIDATOS = 5000
+
+# Peso de cada campo en el ranking del índice en memoria (equivalente a A/B/C)
+_PESOS = {
+    "nombre": 1.0,
+    "categoria__nombre": 0.4,
+    "marca__nombre": 0.4,
+    "descripcion": 0.2,
+}
+_INDEX_COLUMNS = ("id",) + tuple(_PESOS)
+# Una coincidencia por prefijo pesa la mitad que una exacta
+_PESO_PREFIJO = 0.5
+
+_TOKEN_RE = re.compile(r"\w+")
+
+_VECTOR_SQL = """
+    UPDATE products_producto p SET search_vector =
+        setweight(to_tsvector(%s::regconfig, coalesce(p.nombre, '')), 'A') ||
+        setweight(to_tsvector(%s::regconfig, coalesce(c.nombre, '') || ' ' || coalesce(m.nombre, '')), 'B') ||
+        setweight(to_tsvector(%s::regconfig, coalesce(p.descripcion, '')), 'C')
+    FROM products_categoria c, products_marca m
+    WHERE c.id = p.categoria_id AND m.id = p.marca_id AND p.id = ANY(%s)
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def _usa_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def tokenize(texto):
+    """
+    Minúsculas, sin acentos, separado en palabras de 2+ caracteres.
+    """
+    if not texto:
+        return []
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    return [t for t in _TOKEN_RE.findall(texto) if len(t) > 1]
+
+
+class _InvertedIndex:
+    """
+    Índice invertido en memoria: término -> {producto_id: peso}, y por
+    producto sus términos con peso (para puntuar sin recorrer los postings).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._docs = {}
+        self._terms = []
+        self._terms_dirty = False
+        # Postings ordenados por peso de los términos con más de MAX_CANDIDATOS productos
+        self._ordenados = {}
+        self.iniciado = False
+        self.built = False
+
+    def _add(self, producto_id, pesos):
+        self._docs[producto_id] = pesos
+        for token, peso in pesos.items():
+            if token not in self._postings:
+                self._postings[token] = {}
+                self._terms_dirty = True
+            self._postings[token][producto_id] = peso
+            self._ordenados.pop(token, None)
+
+    def _remove(self, producto_id):
+        for token in self._docs.pop(producto_id, {}):
+            docs = self._postings.get(token)
+            if docs is not None:
+                docs.pop(producto_id, None)
+                self._ordenados.pop(token, None)
+                if not docs:
+                    del self._postings[token]
+                    self._terms_dirty = True
+
+    @staticmethod
+    def _pesos(row):
+        pesos = {}
+        for columna, peso in _PESOS.items():
+            for token in tokenize(row[columna]):
+                pesos[token] = pesos.get(token, 0.0) + peso
+        return pesos
+
+    def build(self):
+        self.iniciado = True
+        with self._lock:
+            self._postings = {}
+            self._docs = {}
+            self._ordenados = {}
+            for row in Producto.objects.values(*_INDEX_COLUMNS).iterator(chunk_size=2000):
+                self._add(row["id"], self._pesos(row))
+            self._terms_dirty = True
+            self.built = True
+
+    def asegurar(self):
+        """
+        Construye el índice si todavía no existe (si otro hilo lo está
+        construyendo, espera a que termine).
+        """
+        if self.built:
+            return
+        with self._lock:
+            if not self.built:
+                self.build()
+
+    def update(self, rows):
+        with self._lock:
+            for row in rows:
+                pesos = self._pesos(row)
+                # Cambios de stock/precio no tocan el texto: no se rehace nada
+                if self._docs.get(row["id"]) == pesos:
+                    continue
+                self._remove(row["id"])
+                self._add(row["id"], pesos)
+
+    def remove(self, producto_ids):
+        with self._lock:
+            for producto_id in producto_ids:
+                self._remove(producto_id)
+
+    def _prefix_terms(self, prefix):
+        if self._terms_dirty:
+            self._terms = sorted(self._postings)
+            self._terms_dirty = False
+        start = bisect.bisect_left(self._terms, prefix)
+        end = bisect.bisect_left(self._terms, prefix + "\uffff")
+        return self._terms[start:end]
+
+    def _ordenado(self, term):
+        ordenado = self._ordenados.get(term)
+        if ordenado is None:
+            ordenado = sorted(self._postings[term].items(), key=lambda item: (-item[1], -item[0]))
+            self._ordenados[term] = ordenado
+        return ordenado
+
+    def _candidatos(self, terms, token):
+        """
+        Productos de los términos de un token. Si son más de MAX_CANDIDATOS se
+        toman los de mayor peso, recorriendo los postings ya ordenados.
+        """
+        total = sum(len(self._postings[term]) for term in terms)
+        if total <= MAX_CANDIDATOS:
+            candidatos = set()
+            for term in terms:
+                candidatos.update(self._postings[term])
+            return candidatos
+
+        def _clave(term):
+            factor = 1.0 if term == token else _PESO_PREFIJO
+            return ((-peso * factor, -pid) for pid, peso in self._ordenado(term))
+
+        candidatos = set()
+        for _, menos_pid in heapq.merge(*(_clave(term) for term in terms)):
+            candidatos.add(-menos_pid)
+            if len(candidatos) >= MAX_CANDIDATOS:
+                break
+        return candidatos
+
+    def _score(self, producto_id, tokens):
+        pesos = self._docs[producto_id]
+        total = 0.0
+        for i, token in enumerate(tokens):
+            peso = pesos.get(token, 0.0)
+            if i == len(tokens) - 1:
+                for term, peso_term in pesos.items():
+                    if term != token and term.startswith(token):
+                        peso = max(peso, peso_term * _PESO_PREFIJO)
+            if not peso:
+                return None
+            total += peso
+        return total
+
+    def search(self, tokens, top):
+        """
+        Retorna los `top` mejores [(producto_id, score)] entre los productos que
+        contienen todos los términos; el último término se trata como prefijo.
+        Los candidatos salen del término más selectivo y se puntúan con los
+        términos de cada producto.
+        """
+        with self._lock:
+            terminos = []
+            for i, token in enumerate(tokens):
+                if i == len(tokens) - 1:
+                    terms = self._prefix_terms(token)
+                else:
+                    terms = [token] if token in self._postings else []
+                if not terms:
+                    return []
+                terminos.append((sum(len(self._postings[term]) for term in terms), terms, token))
+
+            _, terms, token = min(terminos, key=lambda item: item[0])
+            ranking = []
+            for producto_id in self._candidatos(terms, token):
+                score = self._score(producto_id, tokens)
+                if score is not None:
+                    ranking.append((producto_id, score))
+            return heapq.nsmallest(top, ranking, key=lambda item: (-item[1], -item[0]))
+
+
+_index = _InvertedIndex()
+
+
+# ============= MANTENIMIENTO =============
+
+def precalentar_indice():
+    """
+    Construye el índice en memoria en un hilo al arrancar el worker, para que
+    la primera búsqueda no lo haga dentro del request. Retorna el hilo, o None
+    si no hace falta (PostgreSQL, desactivado o ya construido).
+    """
+    if _usa_postgres() or not settings.SEARCH_INDEX_WARMUP or _index.iniciado:
+        return None
+
+    def _construir():
+        try:
+            _index.asegurar()
+        except Exception:
+            logger.exception("No se pudo construir el índice de búsqueda")
+        finally:
+            connection.close()
+
+    hilo = threading.Thread(target=_construir, name="search-index", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def indexar_productos(producto_ids):
+    """
+    Actualiza el vector de búsqueda (PostgreSQL, en la transacción actual) o el
+    índice en memoria de los productos (al confirmar la transacción, para que
+    un rollback no deje entradas de más).
+    """
+    producto_ids = list(producto_ids)
+    if not producto_ids:
+        return
+    if _usa_postgres():
+        config = settings.SEARCH_CONFIG
+        with connection.cursor() as cursor:
+            cursor.execute(_VECTOR_SQL, [config, config, config, producto_ids])
+        return
+
+    def _actualizar():
+        # Si el índice se está construyendo, update() espera su lock y la
+        # consulta corre después: no se pierden los cambios
+        if _index.iniciado:
+            _index.update(Producto.objects.filter(id__in=producto_ids).values(*_INDEX_COLUMNS))
+
+    transaction.on_commit(_actualizar)
+
+
+def quitar_productos(producto_ids):
+    if _usa_postgres():
+        return
+    producto_ids = list(producto_ids)
+
+    def _quitar():
+        if _index.iniciado:
+            _index.remove(producto_ids)
+
+    transaction.on_commit(_quitar)
+
+
+# ============= BÚSQUEDA =============
+
+def search_productos(q, limit=DEFAULT_SEARCH_LIMIT, page=1, fields=None):
+    """
+    Busca productos y los retorna ordenados por relevancia, paginados.
+    """
+    if not q or not q.strip():
+        raise ValidationError("Debe especificar un texto de búsqueda (q)")
+    if limit is None:
+        limit = DEFAULT_SEARCH_LIMIT
+    if limit <= 0:
+        raise ValidationError("El límite debe ser mayor a 0")
+    limit = min(limit, MAX_SEARCH_LIMIT)
+    if page is None:
+        page = 1
+    if page < 1:
+        raise ValidationError("La página debe ser mayor a 0")
+    offset = (page - 1) * limit
+    if offset + limit > MAX_SEARCH_RESULTS:
+        raise ValidationError(
+            f"Solo se pueden recorrer los primeros {MAX_SEARCH_RESULTS} resultados, refine la búsqueda"
+        )
+    columns = list(dict.fromkeys(producto_columns(fields) + ["id"]))
+
+    if _usa_postgres():
+        query = SearchQuery(q, config=settings.SEARCH_CONFIG, search_type="websearch")
+        qs = (
+            Producto.objects.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-id")
+            .values(*columns)
+        )
+        rows = list(qs[offset:offset + limit + 1])
+    else:
+        tokens = tokenize(q)
+        if not tokens:
+            raise ValidationError("El texto de búsqueda no contiene palabras válidas")
+        _index.asegurar()
+        ranked = _index.search(tokens, offset + limit + 1)[offset:]
+        por_id = {
+            row["id"]: row
+            for row in Producto.objects.filter(id__in=[pid for pid, _ in ranked]).values(*columns)
+        }
+        rows = [por_id[pid] for pid, _ in ranked if pid in por_id]
+
+    has_more = len(rows) > limit and offset + limit < MAX_SEARCH_RESULTS
+    rows = rows[:limit]
+    return {
+        "productos": [producto_from_row(row, fields) for row in rows],
+        "page": page,
+        "has_more": has_more,
+    }
@@ -0,0 +1,193 @@
+from django.core.exceptions import ValidationError
+
+# Serialización de productos, categorías, marcas y garantías.
+#
+# Los listados leen filas con .values() (sin construir instancias del modelo) y
+# las convierten con *_from_row. Para una instancia ya cargada se usa
+# serialize_*, que arma la misma fila a partir de los atributos.
+
+PRODUCTO_FIELDS = (
+    "id", "nombre", "descripcion", "precio", "stock", "imagen_url", "imagen_srcset",
+    "imagen_estado", "created_at", "updated_at", "categoria", "marca", "garantia",
+)
+CATEGORIA_FIELDS = ("id", "nombre", "descripcion", "created_at", "updated_at")
+MARCA_FIELDS = ("id", "nombre", "created_at", "updated_at")
+GARANTIA_FIELDS = ("id", "cobertura", "marca")
+
+# Columnas de .values() que necesita cada campo de salida del producto
+_PRODUCTO_COLUMNS = {
+    "id": ("id",),
+    "nombre": ("nombre",),
+    "descripcion": ("descripcion",),
+    "precio": ("precio",),
+    "stock": ("stock",),
+    "imagen_url": ("imagen_src",),
+    "imagen_srcset": ("imagen_srcset",),
+    "imagen_estado": ("imagen_estado",),
+    "created_at": ("created_at",),
+    "updated_at": ("updated_at",),
+    "categoria": ("categoria_id", "categoria__nombre"),
+    "marca": ("marca_id", "marca__nombre"),
+    "garantia": ("garantia_id", "garantia__cobertura"),
+}
+
+_GARANTIA_COLUMNS = {
+    "id": ("id",),
+    "cobertura": ("cobertura",),
+    "marca": ("Marca_id", "Marca__nombre"),
+}
+
+
+def parse_fields(raw, allowed):
+    """
+    Convierte ?fields=id,nombre,precio en una tupla validada.
+    Retorna None si no se pidió un subconjunto.
+    """
+    if not raw:
+        return None
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    invalid = [f for f in fields if f not in allowed]
+    if invalid:
+        raise ValidationError(f"Campos inválidos: {', '.join(invalid)} (permitidos: {', '.join(allowed)})")
+    return fields or None
+
+
+def pick_fields(data, fields):
+    """
+    Reduce un dict ya serializado a los campos pedidos.
+    """
+    if not fields:
+        return data
+    return {f: data[f] for f in fields}
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+# ============= PRODUCTOS =============
+
+def producto_columns(fields=None):
+    """
+    Columnas de .values() necesarias para los campos indicados.
+    """
+    columns = []
+    for field in fields or PRODUCTO_FIELDS:
+        columns.extend(_PRODUCTO_COLUMNS[field])
+    return columns
+
+
+def producto_from_row(row, fields=None):
+    """
+    Construye el dict de salida de un producto a partir de una fila de .values().
+    """
+    data = {}
+    for field in fields or PRODUCTO_FIELDS:
+        if field == "precio":
+            data["precio"] = str(row["precio"])
+        elif field == "imagen_url":
+            # URL precalculada al subir la imagen, sin pasar por el SDK de Cloudinary
+            data["imagen_url"] = row["imagen_src"]
+        elif field in ("created_at", "updated_at"):
+            data[field] = _isoformat(row[field])
+        elif field == "categoria":
+            data["categoria"] = {
+                "id": row["categoria_id"],
+                "nombre": row["categoria__nombre"],
+            }
+        elif field == "marca":
+            data["marca"] = {
+                "id": row["marca_id"],
+                "nombre": row["marca__nombre"],
+            }
+        elif field == "garantia":
+            data["garantia"] = {
+                "id": row["garantia_id"],
+                "cobertura": row["garantia__cobertura"],
+            } if row["garantia_id"] else None
+        else:
+            data[field] = row[field]
+    return data
+
+
+def producto_values(qs, fields=None):
+    """
+    Aplica .values() con las columnas mínimas para los campos pedidos.
+    """
+    return qs.values(*producto_columns(fields))
+
+
+def serialize_producto(producto, fields=None):
+    """
+    Serializa una instancia de Producto con el mismo formato que producto_from_row.
+    """
+    garantia = producto.garantia
+    row = {
+        "id": producto.id,
+        "nombre": producto.nombre,
+        "descripcion": producto.descripcion,
+        "precio": producto.precio,
+        "stock": producto.stock,
+        "imagen_src": producto.imagen_src,
+        "imagen_srcset": producto.imagen_srcset,
+        "imagen_estado": producto.imagen_estado,
+        "created_at": producto.created_at,
+        "updated_at": producto.updated_at,
+        "categoria_id": producto.categoria_id,
+        "categoria__nombre": producto.categoria.nombre,
+        "marca_id": producto.marca_id,
+        "marca__nombre": producto.marca.nombre,
+        "garantia_id": producto.garantia_id,
+        "garantia__cobertura": garantia.cobertura if garantia else None,
+    }
+    return producto_from_row(row, fields)
+
+
+# ============= CATEGORÍAS Y MARCAS =============
+
+def categoria_values(qs, fields=None):
+    return qs.values(*(fields or CATEGORIA_FIELDS))
+
+
+def serialize_categoria(categoria, fields=None):
+    return {f: getattr(categoria, f) for f in fields or CATEGORIA_FIELDS}
+
+
+def marca_values(qs, fields=None):
+    return qs.values(*(fields or MARCA_FIELDS))
+
+
+def serialize_marca(marca, fields=None):
+    return {f: getattr(marca, f) for f in fields or MARCA_FIELDS}
+
+
+# ============= GARANTÍAS =============
+
+def garantia_values(qs, fields=None):
+    columns = []
+    for field in fields or GARANTIA_FIELDS:
+        columns.extend(_GARANTIA_COLUMNS[field])
+    return qs.values(*columns)
+
+
+def garantia_from_row(row, fields=None):
+    data = {}
+    for field in fields or GARANTIA_FIELDS:
+        if field == "marca":
+            data["marca"] = {
+                "id": row["Marca_id"],
+                "nombre": row["Marca__nombre"],
+            } if row["Marca_id"] else None
+        else:
+            data[field] = row[field]
+    return data
+
+
+def serialize_garantia(garantia, fields=None):
+    row = {
+        "id": garantia.id,
+        "cobertura": garantia.cobertura,
+        "Marca_id": garantia.Marca_id,
+        "Marca__nombre": garantia.Marca.nombre if garantia.Marca_id else None,
+    }
+    return garantia_from_row(row, fields)
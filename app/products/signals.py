@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Categoria, Garantia, Marca, Producto
+from .services import cache as producto_cache
+from .services import catalogo
+from .services import search as producto_search
+
+
+@receiver(post_save, sender=Producto)
+def producto_guardado(sender, instance, **kwargs):
+    catalogo.sincronizar([instance.pk])
+    producto_cache.invalidate_productos([instance.pk])
+    producto_search.indexar_productos([instance.pk])
+
+
+@receiver(post_delete, sender=Producto)
+def producto_eliminado(sender, instance, **kwargs):
+    producto_cache.invalidate_productos([instance.pk])
+    producto_search.quitar_productos([instance.pk])
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_productos_de_categoria(sender, instance, **kwargs):
+    ids = list(Producto.objects.filter(categoria_id=instance.pk).values_list('id', flat=True))
+    catalogo.sincronizar(ids)
+    producto_cache.invalidate_productos(ids)
+    producto_search.indexar_productos(ids)
+
+
+@receiver(post_save, sender=Marca)
+@receiver(post_delete, sender=Marca)
+def invalidar_productos_de_marca(sender, instance, **kwargs):
+    ids = list(Producto.objects.filter(marca_id=instance.pk).values_list('id', flat=True))
+    catalogo.sincronizar(ids)
+    producto_cache.invalidate_productos(ids)
+    producto_search.indexar_productos(ids)
+
+
+@receiver(post_save, sender=Garantia)
+@receiver(post_delete, sender=Garantia)
+def invalidar_productos_de_garantia(sender, instance, **kwargs):
+    ids = list(Producto.objects.filter(garantia_id=instance.pk).values_list('id', flat=True))
+    catalogo.sincronizar(ids)
+    producto_cache.invalidate_productos(ids)
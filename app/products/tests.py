@@ -1,3 +1,1128 @@
-from django.test import TestCase
+import base64
+import gzip
+import importlib
+import io
+import json
+import logging
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from app import benchmarks, explain, logs, metrics
+from app import tasks
+from app.replicas import ReplicaMiddleware, ReplicaRouter
+from users.models import Usuario
+from users.services import cache as usuario_cache
+from users.services import tokens
+from .models import Categoria, Garantia, Marca, Producto, ProductoCatalogo
+from .services import cache as producto_cache
+from .services import catalogo, imagenes, inventario, search, serializers
+from .services import producto as producto_service
 
-# Create your tests here.
\ No newline at end of file
+
+class BenchmarkSuiteTests(TestCase):
+    """
+    Corre la suite de benchmarks con pocos datos para verificar que todos los
+    escenarios siguen respondiendo sin errores.
+    """
+
+    def test_escenarios_responden_sin_errores(self):
+        datos = benchmarks.sembrar(productos=30, usuarios=5, ventas=10)
+        token = benchmarks.crear_token(datos["usuario_ids"][0])
+        lista = [e for e in benchmarks.escenarios(datos) if e.nombre != "login"]
+
+        resultados = benchmarks.correr_client(lista, token, requests=3, warmup=0)
+
+        self.assertEqual(len(resultados), len(lista))
+        for resultado in resultados:
+            self.assertEqual(resultado["errores"], 0, resultado["escenario"])
+            self.assertLessEqual(resultado["p50_ms"], resultado["p95_ms"])
+            self.assertLessEqual(resultado["p95_ms"], resultado["p99_ms"])
+
+    def test_comparar_detecta_regresion(self):
+        base = benchmarks.resumir("client", "x", [0.010] * 10, 0, 0.1)
+        lento = benchmarks.resumir("client", "x", [0.020] * 10, 0, 0.2)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            benchmarks.guardar_baseline(path, [base], {})
+            with open(path) as f:
+                self.assertIn("client:x", json.load(f)["resultados"])
+
+            self.assertEqual(benchmarks.comparar([base], path), [])
+            self.assertEqual(len(benchmarks.comparar([lento], path, max_regresion=0.2)), 2)
+
+    def test_medir_conexiones(self):
+        filas = benchmarks.medir_conexiones(repeticiones=5)
+
+        self.assertEqual([f["modo"] for f in filas][:2], ["sin_reuso", "persistente"])
+        for fila in filas:
+            self.assertLessEqual(fila["p50_ms"], fila["p95_ms"])
+        # Los wrappers del benchmark no tocan la conexión de la app
+        self.assertEqual(Producto.objects.count(), 0)
+
+
+class AsyncViewsTests(TestCase):
+    """
+    Las vistas de lectura async responden lo mismo por WSGI (Client) y por ASGI (AsyncClient).
+    """
+
+    def test_respuestas_iguales_en_wsgi_y_asgi(self):
+        datos = benchmarks.sembrar(productos=20, usuarios=1, ventas=0)
+        headers = {"Authorization": f"Bearer {benchmarks.crear_token(datos['usuario_ids'][0])}"}
+        rutas = [
+            reverse("get_productos") + "?limit=5",
+            reverse("get_producto", args=[datos["producto_ids"][0]]),
+            reverse("get_categorias"),
+            reverse("get_marcas"),
+            reverse("get_garantias"),
+            reverse("get_productos") + "?stream=ndjson",
+        ]
+        for ruta in rutas:
+            sync = self.client.get(ruta, headers=headers)
+            asgi = async_to_sync(self._get_asgi)(ruta, headers)
+            self.assertEqual(asgi[0], 200, ruta)
+            self.assertEqual(asgi[1], b"".join(sync.streaming_content) if sync.streaming else sync.content, ruta)
+
+        self.assertEqual(async_to_sync(self._get_asgi)(reverse("get_productos"), {})[0], 401)
+
+    async def _get_asgi(self, ruta, headers):
+        response = await self.async_client.get(ruta, headers=headers)
+        if response.streaming:
+            return response.status_code, b"".join([parte async for parte in response.streaming_content])
+        return response.status_code, response.content
+
+
+class ListadoProductosTests(TestCase):
+    """
+    Listado paginado por cursor (created_at, id) con filtros del lado del servidor.
+    """
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre="Audio")
+        self.otra_categoria = Categoria.objects.create(nombre="Video")
+        self.marca = Marca.objects.create(nombre="Sonora")
+        self.productos = [
+            Producto.objects.create(
+                nombre=f"Producto {i}", descripcion="-", precio=10 * (i + 1), stock=i % 3,
+                categoria=self.categoria if i % 2 else self.otra_categoria, marca=self.marca,
+            )
+            for i in range(7)
+        ]
+        self.headers = {"Authorization": f"Bearer {tokens.crear_access_token(1)}"}
+
+    def _get(self, **params):
+        return self.client.get(reverse("get_productos"), params, headers=self.headers)
+
+    def _recorrer(self, **params):
+        ids, cursor = [], None
+        while True:
+            pagina = self._get(**params, **({"cursor": cursor} if cursor else {})).json()
+            ids += [p["id"] for p in pagina["productos"]]
+            if not pagina["has_more"]:
+                self.assertIsNone(pagina["next_cursor"])
+                return ids
+            cursor = pagina["next_cursor"]
+
+    def test_paginas_cubren_todo_sin_repetir(self):
+        # Mismo created_at en todos: el id desempata y ninguna fila se pierde entre páginas
+        ProductoCatalogo.objects.update(created_at=ProductoCatalogo.objects.first().created_at)
+        esperado = sorted((p.id for p in self.productos), reverse=True)
+        self.assertEqual(self._recorrer(limit=3), esperado)
+        self.assertEqual(self._recorrer(limit=200), esperado)
+
+    def test_orden_por_fecha_de_creacion(self):
+        ultimo = self.productos[0]
+        ProductoCatalogo.objects.filter(pk=ultimo.id).update(created_at=timezone.now() + timedelta(days=1))
+        self.assertEqual(self._get(limit=1).json()["productos"][0]["id"], ultimo.id)
+
+    def test_filtros(self):
+        def ids(**filtros):
+            return set(self._recorrer(limit=2, **filtros))
+
+        audio = {p.id for p in self.productos if p.categoria_id == self.categoria.id}
+        self.assertEqual(ids(categoria_id=self.categoria.id), audio)
+        self.assertEqual(ids(marca_id=self.marca.id), {p.id for p in self.productos})
+        self.assertEqual(ids(precio_min="20", precio_max="40.00"), {p.id for p in self.productos[1:4]})
+        self.assertEqual(ids(en_stock="true"), {p.id for p in self.productos if p.stock > 0})
+        self.assertEqual(ids(en_stock="false"), {p.id for p in self.productos if p.stock == 0})
+        self.assertEqual(
+            ids(categoria_id=self.categoria.id, en_stock="true"),
+            {p.id for p in self.productos if p.id in audio and p.stock > 0},
+        )
+
+    def test_parametros_invalidos(self):
+        cursor_ajeno = base64.urlsafe_b64encode(b'["no es fecha", 1]').decode()
+        invalidos = [
+            {"cursor": "no-es-un-cursor"}, {"cursor": cursor_ajeno}, {"limit": 0}, {"limit": "diez"},
+            {"precio_min": "50", "precio_max": "10"}, {"precio_min": "barato"}, {"categoria_id": "x"},
+        ]
+        for params in invalidos:
+            response = self._get(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertFalse(response.json()["ok"])
+
+    def test_limite_maximo(self):
+        with mock.patch.object(producto_service, "MAX_PAGE_SIZE", 4):
+            pagina = self._get(limit=1000).json()
+        self.assertEqual(len(pagina["productos"]), 4)
+        self.assertTrue(pagina["has_more"])
+
+
+class StreamingExportTests(TestCase):
+    """
+    Exportación del catálogo en streaming (?stream=json|ndjson).
+    """
+
+    def setUp(self):
+        self.datos = benchmarks.sembrar(productos=25, usuarios=1, ventas=0)
+        self.headers = {"Authorization": f"Bearer {benchmarks.crear_token(self.datos['usuario_ids'][0])}"}
+
+    def _stream(self, **params):
+        response = self.client.get(reverse("get_productos"), params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_json_igual_al_listado(self):
+        response, cuerpo = self._stream(stream="json")
+        self.assertEqual(response["Content-Type"], "application/json")
+        exportado = json.loads(cuerpo)
+        self.assertTrue(exportado["ok"])
+        listado = self.client.get(reverse("get_productos"), {"limit": 200}, headers=self.headers).json()
+        self.assertEqual(exportado["productos"], listado["productos"])
+
+    def test_ndjson_con_filtros_y_campos(self):
+        response, cuerpo = self._stream(stream="ndjson", en_stock="true", fields="id,stock")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        filas = [json.loads(linea) for linea in cuerpo.splitlines()]
+        en_stock = ProductoCatalogo.objects.filter(stock__gt=0).count()
+        self.assertEqual(len(filas), en_stock)
+        for fila in filas:
+            self.assertEqual(set(fila), {"id", "stock"})
+            self.assertGreater(fila["stock"], 0)
+
+    def test_se_envia_por_bloques(self):
+        with mock.patch("app.responses.STREAM_BUFFER_SIZE", 512):
+            response = self.client.get(reverse("get_productos"), {"stream": "json"}, headers=self.headers)
+            bloques = list(response.streaming_content)
+        self.assertGreater(len(bloques), 1)
+        self.assertEqual(len(json.loads(b"".join(bloques))["productos"]), 25)
+
+    def test_vacio_y_formato_invalido(self):
+        _, cuerpo = self._stream(stream="json", categoria_id=999999)
+        self.assertEqual(json.loads(cuerpo), {"ok": True, "productos": []})
+        response = self.client.get(reverse("get_productos"), {"stream": "xml"}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class SerializadoresTests(TestCase):
+    """
+    Serialización desde filas de .values() y desde instancias, y selección
+    de campos (?fields=) en los listados.
+    """
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre="Audio", descripcion="Parlantes")
+        self.marca = Marca.objects.create(nombre="Sonora")
+        self.garantia = Garantia.objects.create(cobertura=12, Marca=self.marca)
+        self.con_garantia = Producto.objects.create(
+            nombre="Parlante", descripcion="-", precio=Decimal("10.5"), stock=2,
+            categoria=self.categoria, marca=self.marca, garantia=self.garantia,
+        )
+        self.sin_garantia = Producto.objects.create(
+            nombre="Cable", descripcion="-", precio=3, stock=0, categoria=self.categoria, marca=self.marca,
+        )
+        self.headers = {"Authorization": f"Bearer {tokens.crear_access_token(1)}"}
+
+    def test_filas_e_instancias_producen_lo_mismo(self):
+        for producto in (self.con_garantia, self.sin_garantia):
+            [row] = serializers.producto_values(Producto.objects.filter(pk=producto.pk))
+            datos = serializers.producto_from_row(row)
+            producto.refresh_from_db()
+            self.assertEqual(datos, serializers.serialize_producto(producto))
+            self.assertEqual(list(datos), list(serializers.PRODUCTO_FIELDS))
+
+        datos = serializers.serialize_producto(self.con_garantia)
+        self.assertEqual(datos["precio"], "10.50")
+        self.assertEqual(datos["created_at"], self.con_garantia.created_at.isoformat())
+        self.assertEqual(datos["garantia"], {"id": self.garantia.id, "cobertura": 12})
+        self.assertIsNone(serializers.serialize_producto(self.sin_garantia)["garantia"])
+
+        [row] = serializers.garantia_values(Garantia.objects.all())
+        self.assertEqual(
+            serializers.garantia_from_row(row), serializers.serialize_garantia(self.garantia),
+        )
+
+    def test_campos_pedidos_solo_leen_sus_columnas(self):
+        self.assertEqual(
+            serializers.producto_columns(("id", "marca", "imagen_url")),
+            ["id", "marca_id", "marca__nombre", "imagen_src"],
+        )
+        [row] = serializers.producto_values(Producto.objects.filter(pk=self.sin_garantia.pk), ("id", "marca"))
+        self.assertEqual(
+            serializers.producto_from_row(row, ("id", "marca")),
+            {"id": self.sin_garantia.id, "marca": {"id": self.marca.id, "nombre": "Sonora"}},
+        )
+
+    def test_parse_fields(self):
+        permitidos = serializers.PRODUCTO_FIELDS
+        self.assertIsNone(serializers.parse_fields("", permitidos))
+        self.assertIsNone(serializers.parse_fields(" , ", permitidos))
+        self.assertEqual(serializers.parse_fields(" id,precio,id ", permitidos), ("id", "precio"))
+        with self.assertRaisesMessage(ValidationError, "Campos inválidos: sku"):
+            serializers.parse_fields("id,sku", permitidos)
+
+    def test_listados_con_campos(self):
+        casos = [
+            ("get_productos", "productos", "id,precio", {"id", "precio"}),
+            ("get_categorias", "categorias", "id,nombre", {"id", "nombre"}),
+            ("get_marcas", "marcas", "nombre", {"nombre"}),
+            ("get_garantias", "garantias", "id,cobertura", {"id", "cobertura"}),
+        ]
+        for nombre, llave, fields, esperado in casos:
+            response = self.client.get(reverse(nombre), {"fields": fields}, headers=self.headers)
+            self.assertEqual(response.status_code, 200, nombre)
+            filas = response.json()[llave]
+            self.assertTrue(filas, nombre)
+            for fila in filas:
+                self.assertEqual(set(fila), esperado, nombre)
+
+            invalido = self.client.get(reverse(nombre), {"fields": "id,inexistente"}, headers=self.headers)
+            self.assertEqual(invalido.status_code, 400, nombre)
+
+        # El ejemplo de la documentación de garantías
+        response = self.client.get(reverse("get_garantias"), {"fields": "id,nombre"}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    """
+    ETag/Last-Modified del catálogo: 304 mientras no cambien los datos.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.datos = benchmarks.sembrar(productos=10, usuarios=1, ventas=0)
+        self.headers = {"Authorization": f"Bearer {benchmarks.crear_token(self.datos['usuario_ids'][0])}"}
+
+    def _get(self, ruta, **headers):
+        return self.client.get(ruta, headers={**self.headers, **headers})
+
+    def test_validadores_iguales_en_todos_los_workers(self):
+        producto_id = self.datos["producto_ids"][0]
+        detalle = reverse("get_producto", args=[producto_id])
+        listado = reverse("get_productos") + "?categoria_id=1"
+        etags = {ruta: self._get(ruta)["ETag"] for ruta in (detalle, listado)}
+
+        # Otro worker (cache local vacío) calcula el mismo ETag
+        cache.clear()
+        for ruta, etag in etags.items():
+            self.assertEqual(self._get(ruta, if_none_match=etag).status_code, 304, ruta)
+
+        # Escritura atendida por otro worker: el catálogo cambia, pero el cache
+        # local de este worker no se invalida (update() sin señales)
+        Producto.objects.filter(pk=producto_id).update(stock=999)
+        catalogo.sincronizar([producto_id])
+        for ruta, etag in etags.items():
+            self.assertEqual(self._get(ruta, if_none_match=etag).status_code, 200, ruta)
+        self.assertEqual(self._get(detalle).json()["producto"]["stock"], 999)
+
+    def test_if_none_match_responde_304_hasta_que_cambian_los_datos(self):
+        ruta = reverse("get_productos") + "?limit=5"
+        etag = self._get(ruta)["ETag"]
+        no_modificado = self._get(ruta, if_none_match=etag)
+        self.assertEqual(no_modificado.status_code, 304)
+        self.assertEqual(no_modificado.content, b"")
+        self.assertEqual(no_modificado["ETag"], etag)
+
+        # Otros parámetros cambian el cuerpo, por lo tanto el ETag
+        self.assertEqual(self._get(ruta + "&fields=id", if_none_match=etag).status_code, 200)
+
+        producto = Producto.objects.get(pk=self.datos["producto_ids"][0])
+        producto.stock += 1
+        producto.save()
+        self.assertEqual(self._get(ruta, if_none_match=etag).status_code, 200)
+
+        etag = self._get(ruta)["ETag"]
+        categoria = Categoria.objects.get(pk=producto.categoria_id)
+        categoria.nombre = "Otra"
+        categoria.save()
+        self.assertEqual(self._get(ruta, if_none_match=etag).status_code, 200)
+
+    def test_detalle_y_listados_tienen_validadores(self):
+        rutas = [
+            reverse("get_producto", args=[self.datos["producto_ids"][0]]),
+            reverse("get_categorias"),
+            reverse("get_categoria", args=[self.datos["categoria_ids"][0]]),
+            reverse("get_marcas"),
+        ]
+        for ruta in rutas:
+            response = self._get(ruta)
+            self.assertEqual(response.status_code, 200, ruta)
+            self.assertIn("Last-Modified", response, ruta)
+            self.assertEqual(self._get(ruta, if_none_match=response["ETag"]).status_code, 304, ruta)
+            self.assertEqual(self._get(ruta, if_modified_since=response["Last-Modified"]).status_code, 304, ruta)
+
+        self.assertNotIn("ETag", self._get(reverse("get_producto", args=[999999])))
+
+
+class CatalogoTests(TestCase):
+    """
+    El listado y el detalle leen ProductoCatalogo (sin joins), que se mantiene
+    al día con las escrituras sobre productos, categorías y marcas.
+    """
+
+    def setUp(self):
+        self.datos = benchmarks.sembrar(productos=10, usuarios=0, ventas=0)
+        self.producto_id = self.datos["producto_ids"][0]
+
+    def test_lecturas_sin_joins(self):
+        with CaptureQueriesContext(connections["default"]) as queries:
+            pagina = producto_service.get_productos_page(limit=5)
+            producto_service._load_producto(self.producto_id)
+        self.assertEqual(len(pagina["productos"]), 5)
+        for query in queries:
+            self.assertNotIn("JOIN", query["sql"])
+
+        # Mismo contenido que serializar el producto desde los modelos normalizados
+        producto = Producto.objects.get(pk=self.producto_id)
+        self.assertEqual(
+            producto_service._load_producto(self.producto_id)["producto"], producto_service.serialize_producto(producto)
+        )
+
+    def test_escrituras_actualizan_el_catalogo(self):
+        producto = Producto.objects.get(pk=self.producto_id)
+        categoria = Categoria.objects.get(pk=producto.categoria_id)
+        categoria.nombre = "Renombrada"
+        categoria.save()
+        self.assertEqual(producto_service._load_producto(self.producto_id)["producto"]["categoria"]["nombre"], "Renombrada")
+
+        # update() masivo del inventario, sin señales
+        inventario.bulk_update_inventario([{"id": self.producto_id, "stock": 77}])
+        fila = ProductoCatalogo.objects.get(pk=self.producto_id)
+        self.assertEqual((fila.stock, fila.datos["stock"]), (77, 77))
+
+        producto.refresh_from_db()
+        producto.delete()
+        self.assertFalse(ProductoCatalogo.objects.filter(pk=self.producto_id).exists())
+
+    def test_migracion_serializa_igual_que_la_app(self):
+        # 0011 tiene su propia copia del serializador; si producto_from_row
+        # cambia, hay que reconstruir el catálogo (sincronizar_catalogo)
+        migracion = importlib.import_module("products.migrations.0011_producto_catalogo")
+        marca = Marca.objects.first()
+        Producto.objects.filter(pk=self.producto_id).update(garantia=Garantia.objects.create(cobertura=6, Marca=marca))
+        for row in Producto.objects.values(*migracion._COLUMNAS):
+            self.assertEqual(migracion.serializar(row), serializers.producto_from_row(row))
+
+    def test_reconstruir(self):
+        ProductoCatalogo.objects.filter(pk=self.producto_id).delete()
+        Producto.objects.filter(pk=self.datos["producto_ids"][1]).update(stock=0)
+        self.assertEqual(catalogo.reconstruir(chunk_size=3), 10)
+        self.assertEqual(ProductoCatalogo.objects.count(), 10)
+        self.assertEqual(ProductoCatalogo.objects.get(pk=self.datos["producto_ids"][1]).stock, 0)
+
+
+class ProductoCacheTests(TestCase):
+    """
+    Cache del detalle de producto: aciertos sin consultas y invalidación al
+    guardar el producto, su marca o su categoría.
+    """
+
+    def setUp(self):
+        cache.clear()
+        producto_cache.reset_stats()
+        self.datos = benchmarks.sembrar(productos=3, usuarios=0, ventas=0)
+        self.producto = Producto.objects.select_related("categoria", "marca").get(pk=self.datos["producto_ids"][0])
+
+    def _detalle(self):
+        return producto_service.get_producto_by_id(self.producto.id)
+
+    def test_acierto_y_fallo(self):
+        self._detalle()
+        with self.assertNumQueries(0):
+            detalle = self._detalle()
+        self.assertEqual(detalle["id"], self.producto.id)
+        stats = producto_cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_ratio"]), (1, 1, 0.5))
+
+    def test_producto_inexistente_no_se_guarda(self):
+        with self.assertRaises(ValidationError):
+            producto_service.get_producto_by_id(999999)
+        with self.assertRaises(ValidationError):
+            producto_service.get_producto_by_id(999999)
+        self.assertEqual(producto_cache.get_stats()["misses"], 2)
+
+    def test_guardar_producto_invalida(self):
+        self._detalle()
+        self.producto.nombre = "Renombrado"
+        self.producto.save()
+        self.assertEqual(self._detalle()["nombre"], "Renombrado")
+
+    def test_guardar_marca_invalida(self):
+        self._detalle()
+        marca = self.producto.marca
+        marca.nombre = "Marca nueva"
+        marca.save()
+        self.assertEqual(self._detalle()["marca"]["nombre"], "Marca nueva")
+
+    def test_guardar_categoria_invalida(self):
+        self._detalle()
+        categoria = self.producto.categoria
+        categoria.nombre = "Categoría nueva"
+        categoria.save()
+        self.assertEqual(self._detalle()["categoria"]["nombre"], "Categoría nueva")
+
+    def test_eliminar_producto_invalida(self):
+        self._detalle()
+        Producto.objects.filter(pk=self.producto.id).delete()
+        with self.assertRaises(ValidationError):
+            self._detalle()
+
+
+class InventarioBulkUpdateTests(TestCase):
+    """
+    Actualización masiva de stock/precio: cada item tiene su propio estado.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.datos = benchmarks.sembrar(productos=3, usuarios=1, ventas=0)
+        self.headers = {"Authorization": f"Bearer {benchmarks.crear_token(self.datos['usuario_ids'][0])}"}
+        self.ids = self.datos["producto_ids"]
+
+    def _bulk(self, items):
+        return self.client.post(
+            reverse("bulk_update_productos"), json.dumps({"items": items}),
+            content_type="application/json", headers=self.headers,
+        )
+
+    def test_errores_por_item_no_rechazan_el_lote(self):
+        response = self._bulk([
+            {"id": self.ids[0], "precio": "NaN"},
+            {"id": self.ids[1], "precio": "Infinity"},
+            {"id": self.ids[2], "stock": 5},
+            {"id": 999999, "stock": 1},
+        ])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            [r["estado"] for r in body["resultados"]], ["error", "error", "actualizado", "no_encontrado"],
+        )
+        self.assertEqual(Producto.objects.get(pk=self.ids[2]).stock, 5)
+
+    def test_conflicto_de_version_y_sin_cambios(self):
+        producto = Producto.objects.get(pk=self.ids[0])
+        version = producto.updated_at.isoformat()
+        otro = Producto.objects.get(pk=self.ids[1])
+
+        # Otro cliente modifica el producto después de leer la versión
+        self.assertEqual(self._bulk([{"id": producto.id, "stock": producto.stock + 1}]).json()["actualizado"], 1)
+
+        body = self._bulk([
+            {"id": producto.id, "stock": producto.stock + 10, "version": version},
+            {"id": otro.id, "stock": otro.stock, "precio": str(otro.precio)},
+        ]).json()
+        self.assertEqual([r["estado"] for r in body["resultados"]], ["conflicto", "sin_cambios"])
+        self.assertEqual(Producto.objects.get(pk=producto.id).stock, producto.stock + 1)
+
+        # Con la versión vigente se aplica
+        vigente = body["resultados"][0]["version"]
+        body = self._bulk([{"id": producto.id, "stock": 0, "version": vigente}]).json()
+        self.assertEqual(body["resultados"][0]["estado"], "actualizado")
+
+
+class ImportacionTests(TestCase):
+    """
+    Importación CSV/NDJSON: errores por fila y upsert de productos existentes.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.datos = benchmarks.sembrar(productos=2, usuarios=1, ventas=0)
+        self.headers = {"Authorization": f"Bearer {benchmarks.crear_token(self.datos['usuario_ids'][0])}"}
+        self.categoria = self.datos["categoria_ids"][0]
+        self.marca = Producto.objects.values_list("marca_id", flat=True).first()
+
+    def _fila(self, **valores):
+        return {
+            "nombre": "Monitor", "descripcion": "27 pulgadas", "precio": "199.90", "stock": "3",
+            "categoria_id": self.categoria, "marca_id": self.marca, **valores,
+        }
+
+    def _importar(self, filas):
+        cuerpo = "".join(json.dumps(fila) + "\n" for fila in filas)
+        return self.client.post(
+            reverse("import_productos"), cuerpo, content_type="application/x-ndjson", headers=self.headers,
+        ).json()
+
+    def test_crea_y_actualiza_existentes(self):
+        existente = self.datos["producto_ids"][0]
+        resumen = self._importar([
+            self._fila(),
+            self._fila(id=existente, nombre="Renombrado", stock="1"),
+        ])
+        self.assertEqual((resumen["procesadas"], resumen["importadas"], resumen["total_errores"]), (2, 2, 0))
+        self.assertEqual(Producto.objects.count(), 3)
+        producto = Producto.objects.get(pk=existente)
+        self.assertEqual((producto.nombre, producto.stock), ("Renombrado", 1))
+        self.assertEqual(ProductoCatalogo.objects.get(pk=existente).datos["nombre"], "Renombrado")
+
+    def test_errores_por_fila(self):
+        existente = self.datos["producto_ids"][0]
+        resumen = self._importar([
+            self._fila(precio="NaN"),
+            self._fila(categoria_id=999999),
+            self._fila(id=999999),
+            self._fila(id=existente, stock="7"),
+            self._fila(id=existente, stock="8"),
+        ])
+        self.assertEqual(resumen["importadas"], 1)
+        self.assertEqual([e["fila"] for e in resumen["errores"]], [1, 2, 4, 3])
+        self.assertIn("no encontrado", resumen["errores"][3]["error"])
+        # Un id inexistente no se inserta; el id repetido usa la última fila
+        self.assertFalse(Producto.objects.filter(pk=999999).exists())
+        self.assertEqual(Producto.objects.count(), 2)
+        self.assertEqual(Producto.objects.get(pk=existente).stock, 8)
+
+
+class SearchTests(TestCase):
+    """
+    Búsqueda con el índice en memoria (sqlite): ranking, prefijos, paginación
+    y actualización del índice al confirmar la transacción.
+    """
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre="Periféricos")
+        self.marca = Marca.objects.create(nombre="Logi")
+        self.teclado = self._crear("Teclado mecánico", "Switches azules")
+        self.mouse = self._crear("Mouse inalámbrico", "Combina con el teclado")
+        self.teclas = self._crear("Teclas de repuesto", "Kit completo")
+        # Las señales actualizan el índice al confirmar, y TestCase no confirma
+        search._index.build()
+        self.headers = {"Authorization": f"Bearer {tokens.crear_access_token(1)}"}
+
+    def _crear(self, nombre, descripcion):
+        return Producto.objects.create(
+            nombre=nombre, descripcion=descripcion, precio=10, stock=1, categoria=self.categoria, marca=self.marca,
+        )
+
+    def _ids(self, q, **kwargs):
+        return [p["id"] for p in search.search_productos(q, **kwargs)["productos"]]
+
+    def test_ranking_nombre_antes_que_descripcion(self):
+        self.assertEqual(self._ids("teclado"), [self.teclado.id, self.mouse.id])
+        # Sin acentos ni mayúsculas
+        self.assertEqual(self._ids("MECANICO"), [self.teclado.id])
+        self.assertEqual(self._ids("teclado azules"), [self.teclado.id])
+
+    def test_prefijo_en_el_ultimo_termino(self):
+        ids = self._ids("tecl")
+        self.assertEqual(set(ids[:2]), {self.teclado.id, self.teclas.id})
+        self.assertEqual(ids[2], self.mouse.id)
+        self.assertEqual(self._ids("tecl mecanico"), [])
+        self.assertEqual(self._ids("mecanico tecl"), [self.teclado.id])
+
+    def test_candidatos_acotados_conservan_los_mejores(self):
+        with mock.patch.object(search, "MAX_CANDIDATOS", 2):
+            self.assertEqual(set(self._ids("tecl")), {self.teclado.id, self.teclas.id})
+
+    def test_paginacion(self):
+        paginas = [
+            self.client.get(reverse("search_productos"), {"q": "tecl", "limit": 1, "page": page}, headers=self.headers).json()
+            for page in (1, 2, 3)
+        ]
+        self.assertEqual([p["has_more"] for p in paginas], [True, True, False])
+        ids = [p["productos"][0]["id"] for p in paginas]
+        self.assertEqual(ids, self._ids("tecl"))
+
+    def test_busquedas_invalidas(self):
+        invalidas = [{}, {"q": "  "}, {"q": "!!"}, {"q": "tecl", "limit": 0}, {"q": "tecl", "page": 0},
+                     {"q": "tecl", "limit": 100, "page": 11}]
+        for params in invalidas:
+            response = self.client.get(reverse("search_productos"), params, headers=self.headers)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertFalse(response.json()["ok"])
+
+    def test_indice_se_actualiza_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self._crear("Fantasma", "Se revierte")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            nuevo = self._crear("Parlante", "Bluetooth")
+        self.assertEqual(self._ids("fantasma"), [])
+        self.assertEqual(self._ids("parlante"), [nuevo.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo.delete()
+        self.assertEqual(self._ids("parlante"), [])
+
+    def test_precalentar_construye_el_indice(self):
+        with mock.patch.object(search, "_index", search._InvertedIndex()):
+            hilo = search.precalentar_indice()
+            hilo.join(timeout=10)
+            self.assertTrue(search._index.built)
+            self.assertIsNone(search.precalentar_indice())
+
+
+@override_settings(TASK_QUEUE_BACKEND="inline", PRODUCTO_IMAGEN_UPLOADER="products.services.imagenes.upload_offline")
+class ImagenSubidaTests(TestCase):
+    """
+    Subida de imágenes en segundo plano: solo se adjunta la última imagen
+    pedida y toda imagen reemplazada u obsoleta se elimina de Cloudinary.
+    """
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre="Audio")
+        self.marca = Marca.objects.create(nombre="Sonora")
+        destruir = mock.patch("products.services.imagenes.destruir_imagen")
+        self.destruir = destruir.start()
+        self.addCleanup(destruir.stop)
+        with self.captureOnCommitCallbacks(execute=True):
+            datos = producto_service.create_producto(
+                "Parlante", "Bluetooth", 50, 3, self.categoria.id, self.marca.id, imagen=self._archivo("original"),
+            )
+        self.producto_id = datos["id"]
+
+    def _archivo(self, nombre):
+        return SimpleUploadedFile(f"{nombre}.png", b"png", content_type="image/png")
+
+    def _producto(self):
+        return Producto.objects.get(pk=self.producto_id)
+
+    def _destruidas(self):
+        return [llamada.args[0] for llamada in self.destruir.call_args_list]
+
+    def _encolar(self, nombre):
+        # Actualiza la imagen y retorna la subida encolada sin ejecutarla
+        with self.captureOnCommitCallbacks() as callbacks:
+            producto_service.update_producto(self.producto_id, imagen=self._archivo(nombre))
+        return callbacks
+
+    def _ejecutar(self, callbacks):
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+
+    def test_crear_adjunta_la_imagen(self):
+        producto = self._producto()
+        self.assertEqual(producto.imagen.public_id, "productos/original")
+        self.assertEqual(producto.imagen_estado, Producto.IMAGEN_LISTA)
+        self.assertIsNone(producto.imagen_token)
+        self.assertTrue(producto.imagen_src)
+        self.assertEqual(self._destruidas(), [])
+
+    def test_actualizar_elimina_la_imagen_anterior(self):
+        self._ejecutar(self._encolar("nueva"))
+        self.assertEqual(self._producto().imagen.public_id, "productos/nueva")
+        self.assertEqual(self._destruidas(), ["productos/original"])
+
+    def test_subidas_concurrentes_solo_adjuntan_la_ultima(self):
+        primera = self._encolar("primera")
+        segunda = self._encolar("segunda")
+        self.assertEqual(self._producto().imagen_estado, Producto.IMAGEN_PENDIENTE)
+
+        # La segunda termina antes que la primera
+        self._ejecutar(segunda)
+        self._ejecutar(primera)
+
+        producto = self._producto()
+        self.assertEqual(producto.imagen.public_id, "productos/segunda")
+        self.assertEqual(producto.imagen_estado, Producto.IMAGEN_LISTA)
+        self.assertCountEqual(self._destruidas(), ["productos/original", "productos/primera"])
+
+    def test_subida_obsoleta_que_termina_primero_no_se_adjunta(self):
+        primera = self._encolar("primera")
+        segunda = self._encolar("segunda")
+
+        self._ejecutar(primera)
+        self.assertEqual(self._producto().imagen.public_id, "productos/original")
+        self._ejecutar(segunda)
+
+        self.assertEqual(self._producto().imagen.public_id, "productos/segunda")
+        self.assertCountEqual(self._destruidas(), ["productos/primera", "productos/original"])
+
+    def test_producto_eliminado_durante_la_subida(self):
+        subida = self._encolar("nueva")
+        Producto.objects.filter(pk=self.producto_id).delete()
+        self._ejecutar(subida)
+        self.assertIn("productos/nueva", self._destruidas())
+
+    def test_error_de_subida_obsoleta_no_marca_error(self):
+        primera = self._encolar("primera")
+        segunda = self._encolar("segunda")
+        with mock.patch("products.services.imagenes.upload_offline", side_effect=RuntimeError("sin red")):
+            with self.assertLogs("app.tasks", "ERROR"):
+                self._ejecutar(primera)
+            self.assertEqual(self._producto().imagen_estado, Producto.IMAGEN_PENDIENTE)
+            with self.assertLogs("app.tasks", "ERROR"):
+                self._ejecutar(segunda)
+        self.assertEqual(self._producto().imagen_estado, Producto.IMAGEN_ERROR)
+
+
+class ImagenUrlsTests(TestCase):
+    """
+    Las URLs de entrega se calculan al guardar la imagen y los listados las
+    leen de la base, sin llamar al SDK de Cloudinary.
+    """
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre="Audio")
+        marca = Marca.objects.create(nombre="Sonora")
+        self.recurso = imagenes.upload_offline(SimpleUploadedFile("parlante.png", b"png"), folder="productos")
+        self.producto = Producto.objects.create(
+            nombre="Parlante", descripcion="-", precio=10, stock=1, categoria=categoria, marca=marca,
+            imagen=self.recurso,
+        )
+        self.headers = {"Authorization": f"Bearer {tokens.crear_access_token(1)}"}
+
+    def test_urls_precalculadas_al_guardar(self):
+        src, srcset = imagenes.build_imagen_urls(self.recurso)
+        self.assertEqual(list(srcset), [str(ancho) for ancho in imagenes.IMAGEN_ANCHOS])
+        for ancho, url in srcset.items():
+            self.assertIn(f"w_{ancho}", url)
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.imagen_src, self.producto.imagen_srcset), (src, srcset))
+        self.assertEqual(imagenes.build_imagen_urls(None), (None, None))
+
+    def test_listado_no_usa_el_sdk(self):
+        with mock.patch("cloudinary.CloudinaryResource.build_url", side_effect=AssertionError("SDK")):
+            listado = self.client.get(reverse("get_productos"), headers=self.headers).json()
+            detalle = self.client.get(reverse("get_producto", args=[self.producto.id]), headers=self.headers).json()
+        self.producto.refresh_from_db()
+        [fila] = listado["productos"]
+        self.assertEqual(fila["imagen_url"], self.producto.imagen_src)
+        self.assertEqual(fila["imagen_srcset"], self.producto.imagen_srcset)
+        self.assertEqual(detalle["producto"]["imagen_url"], self.producto.imagen_src)
+
+    def test_backfill(self):
+        Producto.objects.filter(pk=self.producto.id).update(imagen_src=None, imagen_srcset=None)
+        ProductoCatalogo.objects.filter(pk=self.producto.id).update(datos={})
+        salida = io.StringIO()
+        call_command("backfill_imagen_urls", stdout=salida)
+        self.assertIn("1 productos", salida.getvalue())
+
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.imagen_src, imagenes.build_imagen_urls(self.recurso)[0])
+        self.assertEqual(ProductoCatalogo.objects.get(pk=self.producto.id).datos["imagen_url"], self.producto.imagen_src)
+        # Sin --all solo procesa las filas que faltan
+        call_command("backfill_imagen_urls", stdout=salida)
+        self.assertIn("URLs actualizadas: 0 productos", salida.getvalue())
+
+
+class RespuestasTests(TestCase):
+    """
+    Serialización con orjson/json y compresión negociada de las respuestas.
+    """
+
+    def setUp(self):
+        self.datos = benchmarks.sembrar(productos=60, usuarios=1, ventas=0)
+        self.headers = {"Authorization": f"Bearer {benchmarks.crear_token(self.datos['usuario_ids'][0])}"}
+
+    def test_encoders_producen_el_mismo_json(self):
+        for ruta in (reverse("get_productos"), reverse("get_categorias")):
+            with override_settings(JSON_ENCODER="json"):
+                stdlib = self.client.get(ruta, headers=self.headers)
+            rapido = self.client.get(ruta, headers=self.headers)
+            self.assertEqual(json.loads(stdlib.content), json.loads(rapido.content), ruta)
+
+    def test_gzip_negociado(self):
+        ruta = reverse("get_productos")
+        plano = self.client.get(ruta, headers=self.headers)
+        self.assertNotIn("Content-Encoding", plano)
+
+        comprimido = self.client.get(ruta, headers={**self.headers, "Accept-Encoding": "gzip"})
+        self.assertEqual(comprimido["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", comprimido["Vary"])
+        self.assertEqual(gzip.decompress(comprimido.content), plano.content)
+        self.assertLess(len(comprimido.content), len(plano.content))
+
+        # El ETag queda débil pero If-None-Match sigue respondiendo 304
+        self.assertTrue(comprimido["ETag"].startswith("W/"))
+        no_modificado = self.client.get(
+            ruta, headers={**self.headers, "Accept-Encoding": "gzip", "If-None-Match": comprimido["ETag"]}
+        )
+        self.assertEqual(no_modificado.status_code, 304)
+
+        stream = self.client.get(ruta + "?stream=ndjson", headers={**self.headers, "Accept-Encoding": "gzip"})
+        filas = gzip.decompress(b"".join(stream.streaming_content)).splitlines()
+        self.assertEqual(len(filas), 60)
+
+
+class _ListaHandler(logging.Handler):
+    """Guarda los registros, con el request id que agrega RequestIdFilter."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.addFilter(logs.RequestIdFilter())
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class LogsTests(TestCase):
+    """
+    Logging estructurado: request id por request (también en los trabajos
+    encolados), muestreo por request y escritura en un hilo aparte.
+    """
+
+    def setUp(self):
+        self.handler = _ListaHandler()
+        self.logger = logging.getLogger("products.tests")
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def _en_request(self, funcion, request_id=None):
+        headers = {"X-Request-ID": request_id} if request_id else {}
+        request = RequestFactory().get("/", headers=headers)
+
+        def vista(request):
+            funcion()
+            return HttpResponse()
+
+        return logs.RequestIdMiddleware(vista)(request)
+
+    def test_request_id_en_registros_respuesta_y_trabajos(self):
+        def registrar():
+            self.logger.info("en el request")
+            tasks.enqueue(self.logger.info, "en el trabajo")
+
+        with override_settings(TASK_QUEUE_BACKEND="inline"):
+            response = self._en_request(registrar, request_id="req-123")
+        self.assertEqual(response["X-Request-ID"], "req-123")
+        self.assertEqual([r.request_id for r in self.handler.records], ["req-123", "req-123"])
+
+        # Sin header se genera uno; fuera de un request no hay id
+        response = self._en_request(lambda: self.logger.info("otro"))
+        self.assertEqual(len(response["X-Request-ID"]), 32)
+        self.assertEqual(self.handler.records[-1].request_id, response["X-Request-ID"])
+        self.logger.info("fuera")
+        self.assertIsNone(self.handler.records[-1].request_id)
+        self.assertEqual(self.client.get("/", headers={"X-Request-ID": "abc"})["X-Request-ID"], "abc")
+
+    def test_muestreo_por_request(self):
+        filtro = logs.SamplingFilter(rate=0.5)
+        info = [logging.makeLogRecord({"levelno": logging.INFO}) for _ in range(3)]
+        warning = logging.makeLogRecord({"levelno": logging.WARNING})
+        decisiones = []
+
+        def decidir():
+            por_registro = {filtro.filter(record) for record in info}
+            # Todos los registros de un request se conservan o se descartan juntos
+            self.assertEqual(len(por_registro), 1)
+            decisiones.append(por_registro.pop())
+            self.assertTrue(filtro.filter(warning))
+
+        for i in range(200):
+            self._en_request(decidir, request_id=f"req-{i}")
+        self.assertTrue(60 < sum(decisiones) < 140, sum(decisiones))
+
+        ninguno = logs.SamplingFilter(rate=0)
+        self._en_request(lambda: decisiones.append(ninguno.filter(info[0])))
+        self.assertFalse(decisiones[-1])
+
+    def test_handler_asincrono_escribe_json(self):
+        stream = io.StringIO()
+        handler = logs.AsyncStreamHandler(stream, maxsize=10)
+        handler.setFormatter(logs.JsonFormatter())
+        handler.addFilter(logs.RequestIdFilter())
+        logger = logging.getLogger("products.tests.async")
+        logger.propagate = False
+        logger.addHandler(handler)
+        self.addCleanup(setattr, logger, "propagate", True)
+        self.addCleanup(logger.removeHandler, handler)
+
+        datos = {"estado": "inicial"}
+        self._en_request(lambda: logger.warning("producto %s", datos, extra={"producto_id": 5}), request_id="req-9")
+        # El mensaje se resuelve al encolar, no cuando lo escribe el hilo
+        datos["estado"] = "cambiado"
+        handler.close()
+
+        [linea] = stream.getvalue().splitlines()
+        registro = json.loads(linea)
+        self.assertEqual(registro["msg"], "producto {'estado': 'inicial'}")
+        self.assertEqual((registro["level"], registro["request_id"], registro["producto_id"]), ("WARNING", "req-9", 5))
+
+    def test_cola_llena_descarta(self):
+        handler = logs.AsyncStreamHandler(io.StringIO(), maxsize=1)
+        record = logging.makeLogRecord({"msg": "x"})
+        handler.enqueue(record)
+        handler.enqueue(record)
+        self.assertEqual(handler.dropped, 1)
+
+
+class MetricsTests(TestCase):
+    """
+    Instrumentación por request: header Server-Timing, histogramas en /metrics
+    y detección de N+1.
+    """
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+        self.usuario = Usuario.objects.create(correo="metricas@example.com", password="x")
+        self.headers = {"Authorization": f"Bearer {tokens.crear_access_token(self.usuario.id)}"}
+
+    def test_server_timing_cuenta_las_consultas(self):
+        with CaptureQueriesContext(connections["default"]) as queries:
+            response = self.client.get(reverse("get_categorias"), headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response["Server-Timing"], rf'^app;dur=[\d.]+, db;dur=[\d.]+;desc="{len(queries)} queries"$'
+        )
+
+    def test_endpoint_de_metricas(self):
+        self.client.get(reverse("get_categorias"), headers=self.headers)
+        texto = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('http_request_duration_seconds_count{view="get_categorias",method="GET"} 1', texto)
+        self.assertIn('http_responses_total{view="get_categorias",method="GET",status="200"} 1', texto)
+        self.assertIn('http_response_size_bytes_bucket{view="get_categorias",method="GET",le="+Inf"} 1', texto)
+
+        with override_settings(METRICS_TOKEN="secreto"):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+            autorizado = self.client.get(reverse("metrics"), headers={"Authorization": "Bearer secreto"})
+            self.assertEqual(autorizado.status_code, 200)
+
+    def _request_con_consultas(self, repeticiones):
+        def vista(request):
+            for i in range(repeticiones):
+                # Mismo SQL con otros parámetros, y listas IN de distinto largo
+                Categoria.objects.filter(pk__in=list(range(i + 1))).exists()
+            return HttpResponse()
+
+        return metrics.MetricsMiddleware(vista)(RequestFactory().get("/"))
+
+    @override_settings(DEBUG=True, QUERY_N_PLUS_ONE="raise", QUERY_N_PLUS_ONE_THRESHOLD=3)
+    def test_n_mas_uno_lanza_en_debug(self):
+        self.assertEqual(self._request_con_consultas(2).status_code, 200)
+        with self.assertRaisesMessage(metrics.NPlusOneError, "consulta repetida 3 veces"):
+            self._request_con_consultas(3)
+
+    @override_settings(QUERY_N_PLUS_ONE="warn", QUERY_N_PLUS_ONE_THRESHOLD=3)
+    def test_n_mas_uno_avisa(self):
+        with self.assertLogs("app.metrics", "WARNING") as registros:
+            self.assertEqual(self._request_con_consultas(4).status_code, 200)
+        self.assertIn("Posible N+1", registros.output[0])
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    Simula una réplica con un segundo archivo sqlite. No hay replicación, así
+    que lo que se lee muestra a qué base fue cada consulta.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # La réplica se registra después de super(): el runner solo conoce las
+        # bases de settings y no la trata como base de tests
+        cls._tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(cls._tmp.name, "replica.sqlite3")
+        default = connections.settings["default"]
+        connections.settings["replica"] = {**default, "NAME": path, "OPTIONS": dict(default["OPTIONS"])}
+        cls.databases = cls.databases | {"replica"}
+        # El router no migra las réplicas; acá no hay replicación que copie el esquema
+        with override_settings(DATABASE_REPLICAS=[]):
+            call_command("migrate", database="replica", verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        cls._tmp.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        Categoria.objects.using("replica").all().delete()
+        Categoria.objects.using("replica").create(nombre="en replica")
+        Categoria.objects.create(nombre="en primario")
+
+    def _nombres(self):
+        return list(Categoria.objects.values_list("nombre", flat=True))
+
+    def _en_request(self, func):
+        resultado = []
+        ReplicaMiddleware(lambda request: resultado.append(func()) or HttpResponse())(None)
+        return resultado[0]
+
+    def test_endpoint_lee_de_la_replica(self):
+        headers = {"Authorization": f"Bearer {tokens.crear_access_token(1)}"}
+        response = self.client.get(reverse("get_categorias"), headers=headers)
+        self.assertEqual([c["nombre"] for c in response.json()["categorias"]], ["en replica"])
+
+    def test_read_your_writes(self):
+        def request():
+            antes = self._nombres()
+            Categoria.objects.create(nombre="nueva")
+            return antes, self._nombres()
+
+        antes, despues = self._en_request(request)
+        self.assertEqual(antes, ["en replica"])
+        self.assertEqual(despues, ["en primario", "nueva"])
+        # El siguiente request vuelve a leer de la réplica
+        self.assertEqual(self._en_request(self._nombres), ["en replica"])
+
+    def test_transacciones_y_fuera_de_request_usan_el_primario(self):
+        def request():
+            with transaction.atomic():
+                return self._nombres()
+
+        self.assertEqual(self._en_request(request), ["en primario"])
+        self.assertEqual(self._nombres(), ["en primario"])
+
+    def test_una_replica_por_request(self):
+        router = ReplicaRouter()
+        with override_settings(DATABASE_REPLICAS=[f"replica_{i}" for i in range(20)]):
+            elegidas = self._en_request(lambda: {router.db_for_read(Categoria) for _ in range(10)})
+        self.assertEqual(len(elegidas), 1)
+
+    def test_cache_y_trabajos_leen_del_primario(self):
+        # El usuario solo existe en el primario (no hay replicación)
+        usuario = Usuario.objects.create(correo="ana@example.com", password="x")
+        usuario_cache.clear()
+        self.addCleanup(usuario_cache.clear)
+        self.assertEqual(self._en_request(lambda: usuario_cache.get_usuario(usuario.id)).id, usuario.id)
+
+        leidos = []
+        with override_settings(TASK_QUEUE_BACKEND="inline"):
+            self._en_request(lambda: tasks.enqueue(lambda: leidos.append(self._nombres())))
+        self.assertEqual(leidos, [["en primario"]])
+
+
+class IndexPlanTests(TestCase):
+    """
+    EXPLAIN de las consultas calientes: cada una usa su índice y ninguna
+    recorre la tabla completa.
+    """
+
+    def test_consultas_usan_indices(self):
+        for nombre, (queryset, indice) in explain.consultas().items():
+            with self.subTest(nombre):
+                plan = explain.plan(queryset)
+                self.assertEqual(plan["escaneos"], set(), plan["texto"])
+                self.assertTrue(plan["indices"], plan["texto"])
+                if indice:
+                    self.assertIn(indice, plan["indices"], plan["texto"])
+
+    def test_detecta_escaneo_completo(self):
+        plan = explain.plan(Producto.objects.filter(descripcion="sin índice"))
+        self.assertEqual(plan["escaneos"], {Producto._meta.db_table})
@@ -28,6 +28,10 @@ urlpatterns = [
     # Productos
     path('productos', producto.get_productos, name='get_productos'),                    
     path('productos/create', producto.create_producto, name='create_producto'),
+    path('productos/bulk-update', producto.bulk_update_productos, name='bulk_update_productos'),
+    path('productos/import', producto.import_productos, name='import_productos'),
+    path('productos/search', producto.search_productos, name='search_productos'),
+    path('productos/cache-stats', producto.get_cache_stats, name='producto_cache_stats'),
     path('productos/<int:id>', producto.get_producto, name='get_producto'),             
     path('productos/<int:id>/update', producto.update_producto, name='update_producto'),
     path('productos/<int:id>/delete', producto.delete_producto, name='delete_producto'),
@@ -1,30 +1,37 @@
 from django.shortcuts import render
-from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError
 import json
 from ..services import categoria as categoria_service
+from ..services.serializers import CATEGORIA_FIELDS, parse_fields
 from users.services.jwt import jwt_required
+from app.responses import JsonResponse, condicional
 
 # Create your views here.
 
 # ============= CATEGORÍAS =============
 @csrf_exempt
-@jwt_required
+@jwt_required(stateless=True)
+@condicional(lambda request: categoria_service.version_categorias())
 @require_http_methods(["GET"])
-def get_categorias(request):
+async def get_categorias(request):
     """
     GET /products/categorias/
     Obtiene todas las categorías.
+    Query params: fields (opcional) - campos a incluir, ej: id,nombre
     """
     try:
-        categorias = categoria_service.get_all_categorias()
+        fields = parse_fields(request.GET.get("fields"), CATEGORIA_FIELDS)
+        categorias = await categoria_service.aget_all_categorias(fields)
         return JsonResponse({"ok": True, "categorias": categorias}, status=200)
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"ok": False, "error": str(e)}, status=500)
 
 @csrf_exempt
+@condicional(lambda request, id: categoria_service.version_categoria(id))
 @require_http_methods(["GET"])
 def get_categoria(request, id): 
     """
@@ -1,29 +1,36 @@
-from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError
 import json
 from ..services import garantia as garantia_service
+from ..services.serializers import GARANTIA_FIELDS, parse_fields
 from users.services.jwt import jwt_required
+from app.responses import JsonResponse, condicional
 
 # ============= GARANTÍAS =============
 
 @csrf_exempt
-@jwt_required
+@jwt_required(stateless=True)
+@condicional(lambda request: garantia_service.version_garantias())
 @require_http_methods(["GET"])
-def get_garantias(request):
+async def get_garantias(request):
     """
     GET /products/garantias
     Obtiene todas las garantías (requiere token JWT).
+    Query params: fields (opcional) - campos a incluir, ej: id,cobertura
     """
     try:
-        garantias = garantia_service.get_all_garantias()
+        fields = parse_fields(request.GET.get("fields"), GARANTIA_FIELDS)
+        garantias = await garantia_service.aget_all_garantias(fields)
         return JsonResponse({"ok": True, "garantias": garantias}, status=200)
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"ok": False, "error": str(e)}, status=500)
 
 @csrf_exempt
-@jwt_required
+@jwt_required(stateless=True)
+@condicional(lambda request, id: garantia_service.version_garantia(id))
 @require_http_methods(["GET"])
 def get_garantia(request, id):
     """
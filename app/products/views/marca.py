@@ -1,29 +1,36 @@
-from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError
 import json
 from ..services import marca as marca_service
+from ..services.serializers import MARCA_FIELDS, parse_fields
 from users.services.jwt import jwt_required
+from app.responses import JsonResponse, condicional
 
 # ============= MARCAS =============
 
 @csrf_exempt
-@jwt_required
+@jwt_required(stateless=True)
+@condicional(lambda request: marca_service.version_marcas())
 @require_http_methods(["GET"])
-def get_marcas(request):
+async def get_marcas(request):
     """
     GET /products/marcas
     Obtiene todas las marcas (requiere token JWT).
+    Query params: fields (opcional) - campos a incluir, ej: id,nombre
     """
     try:
-        marcas = marca_service.get_all_marcas()
+        fields = parse_fields(request.GET.get("fields"), MARCA_FIELDS)
+        marcas = await marca_service.aget_all_marcas(fields)
         return JsonResponse({"ok": True, "marcas": marcas}, status=200)
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"ok": False, "error": str(e)}, status=500)
 
 @csrf_exempt
-@jwt_required
+@jwt_required(stateless=True)
+@condicional(lambda request, id: marca_service.version_marca(id))
 @require_http_methods(["GET"])
 def get_marca(request, id):
     """
@@ -1,43 +1,219 @@
-from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError
 import json
+import logging
+from decimal import Decimal, InvalidOperation
 from ..services import producto as producto_service
+from ..services import cache as producto_cache
+from ..services import search as search_service
+from ..services import importacion as importacion_service
+from ..services import inventario as inventario_service
+from ..services.serializers import PRODUCTO_FIELDS, parse_fields, pick_fields
 from users.services.jwt import jwt_required
+from app.responses import JsonResponse, condicional, get_stream_format, is_asgi, streaming_json_response
+
+logger = logging.getLogger(__name__)
 
 # ============= PRODUCTOS =============
 
+def _filtros_productos(params):
+    """
+    Convierte los query params de filtrado del listado a sus tipos.
+    """
+    categoria_id = params.get("categoria_id")
+    marca_id = params.get("marca_id")
+    precio_min = params.get("precio_min")
+    precio_max = params.get("precio_max")
+    en_stock = params.get("en_stock")
+
+    # Convertir tipos si existen
+    if en_stock:
+        en_stock = en_stock.lower() in ("1", "true", "si", "sí")
+    else:
+        en_stock = None
+    return {
+        "categoria_id": int(categoria_id) if categoria_id else None,
+        "marca_id": int(marca_id) if marca_id else None,
+        "precio_min": Decimal(precio_min) if precio_min else None,
+        "precio_max": Decimal(precio_max) if precio_max else None,
+        "en_stock": en_stock,
+    }
+
 @csrf_exempt
-@jwt_required
+@jwt_required(stateless=True)
+@condicional(lambda request: producto_service.version_productos())
 @require_http_methods(["GET"])
-def get_productos(request):
+async def get_productos(request):
     """
     GET /products/productos
-    Obtiene todos los productos (requiere token JWT).
+    Obtiene una página de productos (requiere token JWT).
+
+    Query params (todos opcionales):
+    - cursor: string - valor de next_cursor de la página anterior
+    - limit: integer - productos por página (máximo 200)
+    - categoria_id: integer
+    - marca_id: integer
+    - precio_min: decimal
+    - precio_max: decimal
+    - en_stock: true | false
+    - stream: json | ndjson - exporta todos los productos filtrados en streaming
+    - fields: string - campos a incluir, ej: id,nombre,precio
     """
     try:
-        productos = producto_service.get_all_productos()
-        return JsonResponse({"ok": True, "productos": productos}, status=200)
+        params = request.GET
+        limit = params.get("limit")
+        limit = int(limit) if limit else None
+
+        fields = parse_fields(params.get("fields"), PRODUCTO_FIELDS)
+        filtros = {"fields": fields, **_filtros_productos(params)}
+
+        # Exportación completa en streaming (?stream=json o ?stream=ndjson)
+        formato = get_stream_format(request)
+        if formato:
+            if is_asgi(request):
+                productos = producto_service.aiter_productos(**filtros)
+            else:
+                productos = producto_service.iter_productos(**filtros)
+            return streaming_json_response("productos", productos, formato)
+
+        pagina = await producto_service.aget_productos_page(
+            cursor=params.get("cursor"),
+            limit=limit,
+            **filtros
+        )
+        return JsonResponse({"ok": True, **pagina}, status=200)
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+    except (ValueError, InvalidOperation) as e:
+        return JsonResponse({"ok": False, "error": f"Error en formato de datos: {str(e)}"}, status=400)
     except Exception as e:
         return JsonResponse({"ok": False, "error": str(e)}, status=500)
 
 @csrf_exempt
-@jwt_required
+@jwt_required(stateless=True)
+@condicional(lambda request, id: producto_service.version_producto(id))
 @require_http_methods(["GET"])
-def get_producto(request, id):
+async def get_producto(request, id):
     """
     GET /products/productos/<id>
     Obtiene un producto por su ID.
+    Query params: fields (opcional) - campos a incluir, ej: id,nombre,precio
     """
     try:
-        producto = producto_service.get_producto_by_id(id)
+        fields = parse_fields(request.GET.get("fields"), PRODUCTO_FIELDS)
+        producto = pick_fields(await producto_service.aget_producto_by_id(id), fields)
         return JsonResponse({"ok": True, "producto": producto}, status=200)
     except ValidationError as e:
         return JsonResponse({"ok": False, "error": str(e)}, status=404)
     except Exception as e:
         return JsonResponse({"ok": False, "error": str(e)}, status=500)
 
+@csrf_exempt
+@jwt_required(stateless=True)
+@require_http_methods(["GET"])
+def search_productos(request):
+    """
+    GET /products/productos/search?q=...
+    Busca productos por nombre, descripción, categoría y marca, ordenados por relevancia.
+
+    Query params:
+    - q: string (requerido)
+    - limit: integer (opcional, máximo 100)
+    - page: integer (opcional, desde 1)
+    - fields: string (opcional) - campos a incluir, ej: id,nombre,precio
+    """
+    try:
+        limit = request.GET.get("limit")
+        page = request.GET.get("page")
+        limit = int(limit) if limit else None
+        page = int(page) if page else None
+        fields = parse_fields(request.GET.get("fields"), PRODUCTO_FIELDS)
+
+        resultado = search_service.search_productos(request.GET.get("q"), limit, page, fields)
+        return JsonResponse({"ok": True, **resultado}, status=200)
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+    except ValueError as e:
+        return JsonResponse({"ok": False, "error": f"Error en formato de datos: {str(e)}"}, status=400)
+    except Exception as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=500)
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["POST"])
+def import_productos(request):
+    """
+    POST /products/productos/import
+    Crea o actualiza productos en lote desde un archivo CSV o NDJSON.
+
+    El archivo puede enviarse como multipart/form-data (campo "archivo") o como
+    cuerpo del request con Content-Type text/csv o application/x-ndjson.
+    Columnas: id (opcional, actualiza ese producto; debe existir), nombre, descripcion, precio,
+    stock, categoria_id, marca_id, garantia_id (opcional).
+
+    Query params:
+    - formato: csv | ndjson (opcional, se deduce del archivo)
+    """
+    try:
+        archivo = request.FILES.get("archivo") or request.FILES.get("file")
+        if archivo is not None:
+            nombre, content_type = archivo.name, archivo.content_type
+        else:
+            # El request se lee como stream, sin cargar el cuerpo completo
+            archivo, nombre, content_type = request, None, request.content_type
+
+        formato = request.GET.get("formato") or importacion_service.detectar_formato(nombre, content_type)
+        resumen = importacion_service.importar_archivo(archivo, formato)
+        return JsonResponse({"ok": True, **resumen}, status=200)
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+    except UnicodeDecodeError:
+        return JsonResponse({"ok": False, "error": "El archivo debe estar codificado en UTF-8"}, status=400)
+    except Exception as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=500)
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["POST"])
+def bulk_update_productos(request):
+    """
+    POST /products/productos/bulk-update
+    Actualiza stock y/o precio de muchos productos en una sola solicitud.
+
+    Body: {
+        "items": [{"id": 1, "stock": 10, "precio": "99.90", "version": "<updated_at>"}, ...]
+    }
+    "version" es opcional: si se envía y el producto cambió desde entonces,
+    el item se rechaza con estado "conflicto". Cada item retorna su estado y
+    la versión vigente del producto.
+    """
+    try:
+        payload = json.loads(request.body.decode() or "{}")
+        items = payload.get("items") if isinstance(payload, dict) else payload
+
+        resultado = inventario_service.bulk_update_inventario(items)
+        return JsonResponse({"ok": True, **resultado}, status=200)
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+    except ValueError as e:
+        return JsonResponse({"ok": False, "error": f"Error en formato de datos: {str(e)}"}, status=400)
+    except Exception as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=500)
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["GET"])
+def get_cache_stats(request):
+    """
+    GET /products/productos/cache-stats
+    Contadores de aciertos/fallos del cache de productos en este worker.
+    """
+    try:
+        return JsonResponse({"ok": True, "cache": producto_cache.get_stats()}, status=200)
+    except Exception as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=500)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 @jwt_required  # Mover JWT al final
@@ -116,23 +292,17 @@ def update_producto(request, id):
     - imagen: file - archivo de imagen nueva
     """
     try:
-        # DEBUG: Información del request
-        print("=" * 60)
-        print(f"[UPDATE_PRODUCTO] ID: {id}")
-        print(f"[UPDATE_PRODUCTO] Method: {request.method}")
-        print(f"[UPDATE_PRODUCTO] Content-Type: {request.content_type}")
-        print(f"[UPDATE_PRODUCTO] POST keys: {list(request.POST.keys())}")
-        print(f"[UPDATE_PRODUCTO] POST data: {dict(request.POST)}")
-        print(f"[UPDATE_PRODUCTO] FILES keys: {list(request.FILES.keys())}")
-        print(f"[UPDATE_PRODUCTO] FILES data: {dict(request.FILES)}")
-        
-        # Intentar imprimir todos los posibles nombres de archivo
-        for key in request.FILES.keys():
-            file = request.FILES[key]
-            print(f"[UPDATE_PRODUCTO] Archivo encontrado con key '{key}': {file.name}, {file.size} bytes")
-        
-        print("=" * 60)
-        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "update_producto request",
+                extra={
+                    "producto_id": id,
+                    "content_type": request.content_type,
+                    "post_keys": list(request.POST.keys()),
+                    "files": {key: [f.name, f.size] for key, f in request.FILES.items()},
+                },
+            )
+
         # Obtener datos del form-data
         nombre = request.POST.get("nombre")
         descripcion = request.POST.get("descripcion")
@@ -147,12 +317,8 @@ def update_producto(request, id):
         for possible_key in ['imagen', 'image', 'file', 'photo', 'picture']:
             if possible_key in request.FILES:
                 imagen = request.FILES[possible_key]
-                print(f"[UPDATE_PRODUCTO] ✅ Imagen encontrada con key '{possible_key}': {imagen.name}")
                 break
-        
-        if not imagen:
-            print(f"[UPDATE_PRODUCTO] ⚠️ No se encontró imagen en FILES")
-        
+
         # Convertir tipos si existen
         if precio is not None and precio != '':
             precio = float(precio)
@@ -183,21 +349,15 @@ def update_producto(request, id):
             id, nombre, descripcion, precio, stock, 
             categoria_id, marca_id, garantia_id, imagen
         )
-        
-        print(f"[UPDATE_PRODUCTO] ✅ Producto actualizado exitosamente")
         return JsonResponse({"ok": True, "producto": producto, "message": "Producto actualizado exitosamente"}, status=200)
     except ValidationError as e:
-        print(f"[UPDATE_PRODUCTO] ❌ ValidationError: {str(e)}")
+        logger.info("update_producto rechazado: %s", e, extra={"producto_id": id})
         return JsonResponse({"ok": False, "error": str(e)}, status=400)
     except ValueError as e:
-        print(f"[UPDATE_PRODUCTO] ❌ ValueError: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.info("update_producto con datos inválidos: %s", e, extra={"producto_id": id})
         return JsonResponse({"ok": False, "error": f"Error en formato de datos: {str(e)}"}, status=400)
     except Exception as e:
-        print(f"[UPDATE_PRODUCTO] ❌ Exception: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error al actualizar producto", extra={"producto_id": id})
         return JsonResponse({"ok": False, "error": str(e)}, status=500)
 
 @csrf_exempt
@@ -227,12 +387,11 @@ def test_upload(request):
     Endpoint de prueba para verificar subida de archivos SIN JWT.
     """
     try:
-        print("=" * 60)
-        print("TEST UPLOAD - POST data:", dict(request.POST))
-        print("TEST UPLOAD - FILES data:", dict(request.FILES))
-        print("TEST UPLOAD - Content-Type:", request.content_type)
-        print("=" * 60)
-        
+        logger.debug(
+            "test_upload request",
+            extra={"content_type": request.content_type, "files_keys": list(request.FILES.keys())},
+        )
+
         imagen = request.FILES.get('imagen') or request.FILES.get('image') or request.FILES.get('file')
         
         if not imagen:
@@ -242,11 +401,7 @@ def test_upload(request):
                 "post_keys": list(request.POST.keys()),
                 "files_keys": list(request.FILES.keys())
             }, status=400)
-        
-        print(f"✅ Archivo recibido: {imagen.name}")
-        print(f"   Tamaño: {imagen.size} bytes")
-        print(f"   Tipo: {imagen.content_type}")
-        
+
         return JsonResponse({
             "ok": True,
             "message": "Archivo recibido correctamente",
@@ -309,9 +464,9 @@ def create_producto_base64(request):
                 # Decodificar base64
                 imagen_data = base64.b64decode(imagen_base64)
                 imagen = ContentFile(imagen_data, name=imagen_filename)
-                print(f"✅ Imagen base64 decodificada: {imagen_filename}, {len(imagen_data)} bytes")
+                logger.debug("Imagen base64 decodificada: %s (%d bytes)", imagen_filename, len(imagen_data))
             except Exception as e:
-                print(f"❌ Error al decodificar base64: {e}")
+                logger.info("Imagen base64 inválida: %s", e)
                 return JsonResponse({"ok": False, "error": f"Error al procesar imagen: {str(e)}"}, status=400)
         
         producto = producto_service.create_producto(
@@ -324,5 +479,5 @@ def create_producto_base64(request):
     except ValueError as e:
         return JsonResponse({"ok": False, "error": f"Error en formato de datos: {str(e)}"}, status=400)
     except Exception as e:
-        print(f"Error al crear producto: {e}")
+        logger.exception("Error al crear producto")
         return JsonResponse({"ok": False, "error": str(e)}, status=500)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from sales.services import reportes
+
+
+class Command(BaseCommand):
+    help = "Suma a los resúmenes diarios las ventas pendientes, o los reconstruye para un rango de fechas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help="Recalcula desde las ventas los resúmenes entre --desde y --hasta",
+        )
+        parser.add_argument('--desde', help="Fecha AAAA-MM-DD")
+        parser.add_argument('--hasta', help="Fecha AAAA-MM-DD")
+
+    def handle(self, *args, **options):
+        if not options['rebuild']:
+            total = reportes.resumir_pendientes(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Ventas resumidas: {total}"))
+            return
+
+        desde = parse_date(options['desde'] or '')
+        hasta = parse_date(options['hasta'] or '')
+        if not desde or not hasta:
+            raise CommandError("--rebuild requiere --desde y --hasta con formato AAAA-MM-DD")
+        if desde > hasta:
+            raise CommandError("--desde no puede ser posterior a --hasta")
+
+        total = reportes.reconstruir(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f"Resúmenes reconstruidos: {total} filas ({desde} a {hasta})"))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0001_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('dimension', models.CharField(choices=[('dia', 'Día'), ('producto', 'Producto'), ('categoria', 'Categoría'), ('marca', 'Marca')], max_length=20)),
+                ('clave_id', models.BigIntegerField(default=0)),
+                ('ventas', models.PositiveIntegerField(default=0)),
+                ('unidades', models.PositiveBigIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notaventa',
+            name='resumida',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='notaventa',
+            index=models.Index(condition=models.Q(('resumida', False)), fields=['id'], name='notaventa_pendiente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resumenventadiaria',
+            index=models.Index(fields=['dimension', 'fecha'], name='resumen_dimension_fecha_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumenventadiaria',
+            constraint=models.UniqueConstraint(fields=('fecha', 'dimension', 'clave_id'), name='resumen_venta_unico'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_resumen_venta_diaria'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notaventa',
+            index=models.Index(fields=['usuario', '-created_at'], name='notaventa_usuario_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notaventa',
+            index=models.Index(fields=['created_at'], name='notaventa_created_idx'),
+        ),
+        # El índice de la FK se borra después de crear el compuesto que lo reemplaza
+        migrations.AlterField(
+            model_name='notaventa',
+            name='usuario',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='notas_venta', to='users.usuario'),
+        ),
+    ]
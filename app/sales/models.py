@@ -20,11 +20,24 @@ class NotaVenta(models.Model):
     metodo_pago = models.ForeignKey(MetodoPago, on_delete=models.PROTECT, related_name='notas_venta')
     total = models.DecimalField(max_digits=10, decimal_places=2)    
     # Relacion con usuario
-    usuario = models.ForeignKey(Usuario, on_delete=models.PROTECT, related_name='notas_venta')
+    # Sin índice propio: lo cubre notaventa_usuario_created_idx
+    usuario = models.ForeignKey(Usuario, on_delete=models.PROTECT, related_name='notas_venta', db_index=False)
+
+    # True cuando la venta ya se sumó a ResumenVentaDiaria
+    resumida = models.BooleanField(default=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], name='notaventa_pendiente_idx', condition=models.Q(resumida=False)),
+            # Compras de un usuario, las más recientes primero
+            models.Index(fields=['usuario', '-created_at'], name='notaventa_usuario_created_idx'),
+            # Rangos de fechas (reportes.reconstruir)
+            models.Index(fields=['created_at'], name='notaventa_created_idx'),
+        ]
+
     def __str__(self):
         return f"NotaVenta {self.id}"
 
@@ -40,3 +53,39 @@ class Detalle_Venta(models.Model):
     def __str__(self):
         return f"Detalle_Venta {self.id} de NotaVenta {self.nota_venta.id}"
 
+
+
+class ResumenVentaDiaria(models.Model):
+    """
+    Totales de ventas por día, acumulados de forma incremental.
+    dimension indica la agrupación y clave_id el id del producto, categoría o
+    marca (0 para el total del día).
+    """
+    DIMENSION_DIA = 'dia'
+    DIMENSION_PRODUCTO = 'producto'
+    DIMENSION_CATEGORIA = 'categoria'
+    DIMENSION_MARCA = 'marca'
+    DIMENSIONES = [
+        (DIMENSION_DIA, 'Día'),
+        (DIMENSION_PRODUCTO, 'Producto'),
+        (DIMENSION_CATEGORIA, 'Categoría'),
+        (DIMENSION_MARCA, 'Marca'),
+    ]
+
+    fecha = models.DateField()
+    dimension = models.CharField(max_length=20, choices=DIMENSIONES)
+    clave_id = models.BigIntegerField(default=0)
+    ventas = models.PositiveIntegerField(default=0)
+    unidades = models.PositiveBigIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'dimension', 'clave_id'], name='resumen_venta_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'fecha'], name='resumen_dimension_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"Resumen {self.dimension} {self.clave_id} {self.fecha}"
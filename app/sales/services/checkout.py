@@ -0,0 +1,131 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from app.tasks import enqueue_on_commit
+from products.models import Producto
+from products.services import cache as producto_cache
+from products.services import catalogo
+from ..models import MetodoPago, NotaVenta, Detalle_Venta
+from . import reportes
+
+
+class StockInsuficienteError(ValidationError):
+    """El stock de un producto no alcanza para la cantidad pedida."""
+
+
+def _normalizar_items(items):
+    """
+    Valida los items y suma las cantidades de productos repetidos.
+    Retorna {producto_id: cantidad}.
+    """
+    if not items:
+        raise ValidationError("La venta debe tener al menos un producto")
+
+    cantidades = {}
+    for item in items:
+        try:
+            producto_id = int(item.get("producto_id"))
+            cantidad = int(item.get("cantidad"))
+        except (TypeError, ValueError, AttributeError):
+            raise ValidationError("Cada item debe tener producto_id y cantidad enteros")
+        if cantidad <= 0:
+            raise ValidationError("La cantidad debe ser mayor a 0")
+        cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+    return cantidades
+
+
+def _serialize_nota(nota, detalles):
+    return {
+        "id": nota.id,
+        "estado": nota.estado,
+        "total": str(nota.total),
+        "usuario_id": nota.usuario_id,
+        "metodo_pago_id": nota.metodo_pago_id,
+        "created_at": nota.created_at.isoformat() if nota.created_at else None,
+        "detalles": [
+            {
+                "id": detalle.id,
+                "producto_id": detalle.producto_id,
+                "cantidad": detalle.cantidad,
+                "precio_unitario": str(detalle.precio_unitario),
+            }
+            for detalle in detalles
+        ],
+    }
+
+
+def checkout(usuario_id, metodo_pago_id, items):
+    """
+    Registra una venta: crea la NotaVenta con sus Detalle_Venta y descuenta el stock.
+
+    - Las filas de Producto se bloquean en orden de id para evitar deadlocks
+      entre ventas concurrentes que comparten productos.
+    - El stock se descuenta con UPDATE condicional (stock >= cantidad) usando F(),
+      sin leer y volver a escribir el valor, así nunca queda negativo.
+    - El total se calcula en la base de datos a partir de los detalles.
+    """
+    cantidades = _normalizar_items(items)
+
+    if not metodo_pago_id:
+        raise ValidationError("Debe especificar un método de pago")
+    if not MetodoPago.objects.filter(pk=metodo_pago_id, estado=True).exists():
+        raise ValidationError(f"Método de pago con id {metodo_pago_id} no encontrado o inactivo")
+
+    producto_ids = sorted(cantidades)
+
+    with transaction.atomic():
+        precios = dict(
+            Producto.objects.select_for_update()
+            .filter(id__in=producto_ids)
+            .order_by('id')
+            .values_list('id', 'precio')
+        )
+        faltantes = [pid for pid in producto_ids if pid not in precios]
+        if faltantes:
+            raise ValidationError(f"Productos no encontrados: {', '.join(map(str, faltantes))}")
+
+        ahora = timezone.now()
+        for producto_id in producto_ids:
+            cantidad = cantidades[producto_id]
+            actualizados = Producto.objects.filter(pk=producto_id, stock__gte=cantidad).update(
+                stock=F('stock') - cantidad,
+                updated_at=ahora,
+            )
+            if not actualizados:
+                raise StockInsuficienteError(f"Stock insuficiente para el producto {producto_id}")
+
+        nota = NotaVenta.objects.create(
+            usuario_id=usuario_id,
+            metodo_pago_id=metodo_pago_id,
+            total=0,
+        )
+        detalles = Detalle_Venta.objects.bulk_create([
+            Detalle_Venta(
+                nota_venta=nota,
+                producto_id=producto_id,
+                cantidad=cantidades[producto_id],
+                precio_unitario=precios[producto_id],
+            )
+            for producto_id in producto_ids
+        ])
+
+        subtotal = (
+            Detalle_Venta.objects.filter(nota_venta=OuterRef('pk'))
+            .values('nota_venta')
+            .annotate(total=Sum(F('cantidad') * F('precio_unitario'), output_field=DecimalField(max_digits=10, decimal_places=2)))
+            .values('total')
+        )
+        NotaVenta.objects.filter(pk=nota.pk).update(total=Coalesce(Subquery(subtotal), Value(Decimal('0'))))
+        nota.refresh_from_db(fields=['total'])
+
+        # update() no dispara señales: actualizar el catálogo e invalidar el detalle cacheado (incluye stock)
+        catalogo.sincronizar(producto_ids)
+        producto_cache.invalidate_productos(producto_ids)
+
+        # Sumar la venta a los reportes sin demorar la respuesta
+        enqueue_on_commit(reportes.resumir_nota, nota.id)
+
+    return _serialize_nota(nota, detalles)
@@ -0,0 +1,238 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from products.models import Categoria, Marca, Producto
+from ..models import Detalle_Venta, NotaVenta, ResumenVentaDiaria
+
+# Reportes de ventas a partir de ResumenVentaDiaria.
+#
+# Cada venta se suma una sola vez a los resúmenes (NotaVenta.resumida):
+# - al confirmar el checkout, en segundo plano (resumir_nota)
+# - o con el comando `manage.py resumir_ventas` para las que hayan quedado pendientes.
+# Los reportes solo leen los resúmenes, nunca las tablas de ventas.
+# Las notas anuladas (estado=False) no se suman. Si una venta se anula o se
+# devuelven unidades después de resumida, se corrige con `resumir_ventas --rebuild`.
+
+DIMENSIONES = [d for d, _ in ResumenVentaDiaria.DIMENSIONES]
+
+# Campo de Detalle_Venta que identifica cada dimensión
+_CLAVES = {
+    ResumenVentaDiaria.DIMENSION_PRODUCTO: 'producto_id',
+    ResumenVentaDiaria.DIMENSION_CATEGORIA: 'producto__categoria_id',
+    ResumenVentaDiaria.DIMENSION_MARCA: 'producto__marca_id',
+}
+
+_MODELOS = {
+    ResumenVentaDiaria.DIMENSION_PRODUCTO: Producto,
+    ResumenVentaDiaria.DIMENSION_CATEGORIA: Categoria,
+    ResumenVentaDiaria.DIMENSION_MARCA: Marca,
+}
+
+_SUBTOTAL = F('cantidad') * F('precio_unitario')
+_MONTO = DecimalField(max_digits=14, decimal_places=2)
+_CENTAVOS = Decimal('0.01')
+
+
+# ============= ACUMULACIÓN INCREMENTAL =============
+
+def _incrementos(nota_ids):
+    """
+    Calcula {(fecha, dimension, clave_id): [ventas, unidades, total]} para las notas dadas.
+    """
+    notas = defaultdict(set)
+    unidades = defaultdict(int)
+    totales = defaultdict(Decimal)
+
+    detalles = Detalle_Venta.objects.filter(nota_venta_id__in=nota_ids, nota_venta__estado=True).values(
+        'nota_venta_id', 'nota_venta__created_at', 'cantidad', 'precio_unitario', *_CLAVES.values()
+    )
+    for detalle in detalles:
+        fecha = timezone.localdate(detalle['nota_venta__created_at'])
+        subtotal = detalle['cantidad'] * detalle['precio_unitario']
+        llaves = [(fecha, ResumenVentaDiaria.DIMENSION_DIA, 0)]
+        llaves += [(fecha, dimension, detalle[campo]) for dimension, campo in _CLAVES.items()]
+        for llave in llaves:
+            notas[llave].add(detalle['nota_venta_id'])
+            unidades[llave] += detalle['cantidad']
+            totales[llave] += subtotal
+
+    return {llave: [len(notas[llave]), unidades[llave], totales[llave]] for llave in notas}
+
+
+def _aplicar(incrementos):
+    # Orden fijo para que dos procesos no se bloqueen en orden inverso
+    for (fecha, dimension, clave_id), (ventas, unidades, total) in sorted(incrementos.items()):
+        filtro = ResumenVentaDiaria.objects.filter(fecha=fecha, dimension=dimension, clave_id=clave_id)
+        cambios = {
+            'ventas': F('ventas') + ventas,
+            'unidades': F('unidades') + unidades,
+            'total': F('total') + total,
+        }
+        if filtro.update(**cambios):
+            continue
+        try:
+            with transaction.atomic():
+                ResumenVentaDiaria.objects.create(
+                    fecha=fecha, dimension=dimension, clave_id=clave_id,
+                    ventas=ventas, unidades=unidades, total=total,
+                )
+        except IntegrityError:
+            # Otro proceso creó la fila al mismo tiempo
+            filtro.update(**cambios)
+
+
+def resumir_notas(nota_ids):
+    """
+    Suma a los resúmenes las notas indicadas que aún no estén resumidas.
+    Retorna la cantidad de notas procesadas.
+    """
+    with transaction.atomic():
+        pendientes = list(
+            NotaVenta.objects.select_for_update()
+            .filter(id__in=nota_ids, resumida=False)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        if not pendientes:
+            return 0
+        NotaVenta.objects.filter(id__in=pendientes).update(resumida=True)
+        _aplicar(_incrementos(pendientes))
+        return len(pendientes)
+
+
+def resumir_nota(nota_id):
+    """
+    Trabajo encolado por el checkout al confirmar una venta.
+    """
+    return resumir_notas([nota_id])
+
+
+def notas_pendientes(ultimo_id=0):
+    """
+    Notas aún no resumidas con id mayor a ultimo_id, en orden de id.
+    """
+    return NotaVenta.objects.filter(resumida=False, id__gt=ultimo_id).order_by('id')
+
+
+def resumir_pendientes(batch_size=500):
+    """
+    Procesa todas las notas pendientes, por lotes. Retorna la cantidad procesada.
+    """
+    total = 0
+    ultimo_id = 0
+    while True:
+        ids = list(notas_pendientes(ultimo_id).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += resumir_notas(ids)
+        ultimo_id = ids[-1]
+
+
+def _rango(desde, hasta):
+    # [desde 00:00, hasta + 1 día 00:00) en la zona horaria actual, igual que
+    # created_at__date pero comparando la columna directa (usa notaventa_created_idx)
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    return inicio, fin
+
+
+def notas_del_rango(desde, hasta):
+    """
+    Notas de venta creadas entre las fechas desde y hasta (inclusive).
+    """
+    inicio, fin = _rango(desde, hasta)
+    return NotaVenta.objects.filter(created_at__gte=inicio, created_at__lt=fin)
+
+
+def reconstruir(desde, hasta):
+    """
+    Recalcula desde cero los resúmenes de un rango de fechas a partir de las ventas.
+    Conviene ejecutarlo con poco tráfico: bloquea las notas del rango.
+    """
+    inicio, fin = _rango(desde, hasta)
+    with transaction.atomic():
+        notas = notas_del_rango(desde, hasta).select_for_update()
+        list(notas.values_list('id', flat=True))
+        ResumenVentaDiaria.objects.filter(fecha__gte=desde, fecha__lte=hasta).delete()
+
+        detalles = Detalle_Venta.objects.filter(
+            nota_venta__created_at__gte=inicio, nota_venta__created_at__lt=fin, nota_venta__estado=True
+        ).annotate(fecha=TruncDate('nota_venta__created_at'))
+
+        agregados = {
+            'ventas': Count('nota_venta', distinct=True),
+            'unidades': Sum('cantidad'),
+            'total': Sum(_SUBTOTAL, output_field=_MONTO),
+        }
+        resumenes = [
+            ResumenVentaDiaria(dimension=ResumenVentaDiaria.DIMENSION_DIA, clave_id=0, **row)
+            for row in detalles.values('fecha').annotate(**agregados)
+        ]
+        for dimension, campo in _CLAVES.items():
+            for row in detalles.values('fecha', campo).annotate(**agregados):
+                clave_id = row.pop(campo)
+                resumenes.append(ResumenVentaDiaria(dimension=dimension, clave_id=clave_id, **row))
+
+        ResumenVentaDiaria.objects.bulk_create(resumenes, batch_size=1000)
+        notas.update(resumida=True)
+        return len(resumenes)
+
+
+# ============= REPORTES =============
+
+def _monto(valor):
+    # SUM() en sqlite pierde la escala del DecimalField
+    return str(Decimal(valor or 0).quantize(_CENTAVOS))
+
+
+def reporte_ventas(dimension, desde=None, hasta=None, limit=None):
+    """
+    Ventas por día, o totales del rango por producto, categoría o marca.
+    """
+    if dimension not in DIMENSIONES:
+        raise ValidationError(f"Dimensión inválida: {dimension} (use {', '.join(DIMENSIONES)})")
+    if desde and hasta and desde > hasta:
+        raise ValidationError("La fecha 'desde' no puede ser posterior a 'hasta'")
+
+    qs = ResumenVentaDiaria.objects.filter(dimension=dimension)
+    if desde:
+        qs = qs.filter(fecha__gte=desde)
+    if hasta:
+        qs = qs.filter(fecha__lte=hasta)
+
+    if dimension == ResumenVentaDiaria.DIMENSION_DIA:
+        return [
+            {
+                "fecha": row["fecha"].isoformat(),
+                "ventas": row["ventas"],
+                "unidades": row["unidades"],
+                "total": _monto(row["total"]),
+            }
+            for row in qs.order_by('fecha').values('fecha', 'ventas', 'unidades', 'total')
+        ]
+
+    rows = (
+        qs.values('clave_id')
+        .annotate(ventas=Sum('ventas'), unidades=Sum('unidades'), total=Sum('total'))
+        .order_by('-total', 'clave_id')
+    )
+    if limit:
+        rows = rows[:limit]
+    rows = list(rows)
+
+    nombres = _MODELOS[dimension].objects.in_bulk([row['clave_id'] for row in rows])
+    return [
+        {
+            "id": row["clave_id"],
+            "nombre": nombres[row["clave_id"]].nombre if row["clave_id"] in nombres else None,
+            "ventas": row["ventas"],
+            "unidades": row["unidades"],
+            "total": _monto(row["total"]),
+        }
+        for row in rows
+    ]
@@ -1,3 +1,235 @@
-from django.test import TestCase
+import os
+import threading
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from products.models import Categoria, Marca, Producto
+from users.models import Usuario
+from users.services import tokens
+from .models import Detalle_Venta, MetodoPago, NotaVenta, ResumenVentaDiaria
+from .services import checkout as checkout_service
+from .services import reportes
 
-# Create your tests here.
+
+def _crear_catalogo(stock=10):
+    categoria = Categoria.objects.create(nombre="Electrónica")
+    marca = Marca.objects.create(nombre="Samsung")
+    productos = [
+        Producto.objects.create(
+            nombre=f"Producto {i}",
+            descripcion="Descripción",
+            precio=Decimal("10.50") * (i + 1),
+            stock=stock,
+            categoria=categoria,
+            marca=marca,
+        )
+        for i in range(2)
+    ]
+    return productos
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create(correo="cliente@test.com", password="x")
+        self.metodo = MetodoPago.objects.create(nombre="Efectivo")
+        self.p1, self.p2 = _crear_catalogo(stock=10)
+
+    def test_checkout_crea_nota_detalles_y_descuenta_stock(self):
+        nota = checkout_service.checkout(self.usuario.id, self.metodo.id, [
+            {"producto_id": self.p2.id, "cantidad": 1},
+            {"producto_id": self.p1.id, "cantidad": 2},
+            {"producto_id": self.p1.id, "cantidad": 1},
+        ])
+
+        self.assertEqual(nota["total"], "52.50")
+        self.assertEqual(len(nota["detalles"]), 2)
+        self.assertEqual(NotaVenta.objects.get(pk=nota["id"]).total, Decimal("52.50"))
+        self.p1.refresh_from_db()
+        self.p2.refresh_from_db()
+        self.assertEqual(self.p1.stock, 7)
+        self.assertEqual(self.p2.stock, 9)
+
+    def test_stock_insuficiente_no_deja_cambios(self):
+        with self.assertRaises(checkout_service.StockInsuficienteError):
+            checkout_service.checkout(self.usuario.id, self.metodo.id, [
+                {"producto_id": self.p1.id, "cantidad": 1},
+                {"producto_id": self.p2.id, "cantidad": 11},
+            ])
+
+        self.p1.refresh_from_db()
+        self.assertEqual(self.p1.stock, 10)
+        self.assertFalse(NotaVenta.objects.exists())
+        self.assertFalse(Detalle_Venta.objects.exists())
+
+
+@override_settings(TASK_QUEUE_BACKEND="inline")
+class ReportesVentasTests(TestCase):
+    """
+    Resúmenes diarios de ventas: se suman una vez al confirmar el checkout,
+    se reconstruyen desde las ventas y los reportes solo leen los resúmenes.
+    """
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(correo="cliente@test.com", password="x")
+        self.metodo = MetodoPago.objects.create(nombre="Efectivo")
+        self.p1, self.p2 = _crear_catalogo(stock=20)
+        self.hoy = timezone.localdate()
+
+    def _comprar(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            return checkout_service.checkout(self.usuario.id, self.metodo.id, items)
+
+    def _nota_sin_resumir(self, producto, cantidad):
+        # Venta registrada sin pasar por el checkout (ej. el trabajo se perdió)
+        nota = NotaVenta.objects.create(usuario=self.usuario, metodo_pago=self.metodo, total=0)
+        Detalle_Venta.objects.create(
+            nota_venta=nota, producto=producto, cantidad=cantidad, precio_unitario=producto.precio,
+        )
+        return nota
+
+    def _dia(self):
+        filas = reportes.reporte_ventas("dia")
+        return [(f["fecha"], f["ventas"], f["unidades"], f["total"]) for f in filas]
+
+    def test_checkout_suma_a_los_resumenes(self):
+        self._comprar([{"producto_id": self.p1.id, "cantidad": 2}, {"producto_id": self.p2.id, "cantidad": 1}])
+        self._comprar([{"producto_id": self.p1.id, "cantidad": 1}])
+
+        self.assertEqual(self._dia(), [(self.hoy.isoformat(), 2, 4, "52.50")])
+        por_producto = {f["id"]: (f["ventas"], f["unidades"], f["total"]) for f in reportes.reporte_ventas("producto")}
+        self.assertEqual(por_producto, {self.p1.id: (2, 3, "31.50"), self.p2.id: (1, 1, "21.00")})
+        [categoria] = reportes.reporte_ventas("categoria")
+        self.assertEqual((categoria["nombre"], categoria["ventas"], categoria["total"]), ("Electrónica", 2, "52.50"))
+        [marca] = reportes.reporte_ventas("marca")
+        self.assertEqual((marca["nombre"], marca["unidades"]), ("Samsung", 4))
+        self.assertFalse(NotaVenta.objects.filter(resumida=False).exists())
+
+    def test_cada_nota_se_suma_una_vez(self):
+        nota = self._comprar([{"producto_id": self.p1.id, "cantidad": 2}])
+        self.assertEqual(reportes.resumir_notas([nota["id"]]), 0)
+        self.assertEqual(reportes.resumir_pendientes(), 0)
+        self.assertEqual(self._dia(), [(self.hoy.isoformat(), 1, 2, "21.00")])
+
+    def test_comando_suma_las_pendientes(self):
+        self._nota_sin_resumir(self.p1, 3)
+        self._nota_sin_resumir(self.p2, 1)
+        call_command("resumir_ventas", batch_size=1, stdout=open(os.devnull, "w"))
+        self.assertEqual(self._dia(), [(self.hoy.isoformat(), 2, 4, "52.50")])
+        self.assertFalse(NotaVenta.objects.filter(resumida=False).exists())
+
+    def test_reconstruir_tras_devoluciones_y_anulaciones(self):
+        nota = self._comprar([{"producto_id": self.p1.id, "cantidad": 3}, {"producto_id": self.p2.id, "cantidad": 1}])
+        anulada = self._comprar([{"producto_id": self.p2.id, "cantidad": 2}])
+        self.assertEqual(self._dia(), [(self.hoy.isoformat(), 2, 6, "94.50")])
+
+        # Devolución de una unidad de p1 y anulación de la segunda venta
+        Detalle_Venta.objects.filter(nota_venta_id=nota["id"], producto=self.p1).update(cantidad=2)
+        NotaVenta.objects.filter(pk=anulada["id"]).update(estado=False)
+        fecha = self.hoy.isoformat()
+        call_command("resumir_ventas", rebuild=True, desde=fecha, hasta=fecha, stdout=open(os.devnull, "w"))
+
+        self.assertEqual(self._dia(), [(fecha, 1, 3, "42.00")])
+        por_producto = {f["id"]: (f["ventas"], f["unidades"], f["total"]) for f in reportes.reporte_ventas("producto")}
+        self.assertEqual(por_producto, {self.p1.id: (1, 2, "21.00"), self.p2.id: (1, 1, "21.00")})
+        # Una nota anulada antes de resumirse tampoco se suma
+        nueva = self._nota_sin_resumir(self.p1, 5)
+        NotaVenta.objects.filter(pk=nueva.pk).update(estado=False)
+        reportes.resumir_pendientes()
+        self.assertEqual(self._dia(), [(fecha, 1, 3, "42.00")])
+
+    def test_reconstruir_coincide_con_la_suma_incremental(self):
+        self._comprar([{"producto_id": self.p1.id, "cantidad": 2}, {"producto_id": self.p2.id, "cantidad": 3}])
+        self._comprar([{"producto_id": self.p2.id, "cantidad": 1}])
+        incremental = {
+            dimension: reportes.reporte_ventas(dimension) for dimension in reportes.DIMENSIONES
+        }
+        reportes.reconstruir(self.hoy, self.hoy)
+        for dimension, filas in incremental.items():
+            self.assertEqual(reportes.reporte_ventas(dimension), filas, dimension)
+
+    def test_endpoint_lee_solo_los_resumenes(self):
+        self._comprar([{"producto_id": self.p1.id, "cantidad": 2}])
+        headers = {"Authorization": f"Bearer {tokens.crear_access_token(self.usuario.id)}"}
+        url = reverse("reporte_ventas")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"dimension": "producto", "limit": 1}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["resultados"][0]["id"], self.p1.id)
+        for query in queries:
+            self.assertNotIn(Detalle_Venta._meta.db_table, query["sql"])
+            self.assertNotIn(f'"{NotaVenta._meta.db_table}"', query["sql"])
+
+        hoy = self.hoy.isoformat()
+        response = self.client.get(url, {"desde": hoy, "hasta": hoy}, headers=headers)
+        self.assertEqual(response.json()["resultados"][0]["total"], "21.00")
+        self.assertEqual(self.client.get(url, {"dimension": "anio"}, headers=headers).status_code, 400)
+        self.assertEqual(self.client.get(url, {"desde": "ayer"}, headers=headers).status_code, 400)
+        with self.assertRaises(ValidationError):
+            reportes.reporte_ventas("dia", desde=self.hoy, hasta=self.hoy.replace(year=self.hoy.year - 1))
+        self.assertEqual(ResumenVentaDiaria.objects.filter(dimension="dia").count(), 1)
+
+
+class CheckoutConcurrencyTests(TransactionTestCase):
+    """
+    Muchas ventas concurrentes sobre los mismos productos no deben vender más
+    unidades que el stock disponible.
+    """
+
+    STOCK = 30
+    HILOS = 12
+    VENTAS_POR_HILO = 8
+
+    def test_ventas_concurrentes_no_sobrevenden(self):
+        usuario = Usuario.objects.create(correo="stress@test.com", password="x")
+        metodo = MetodoPago.objects.create(nombre="Tarjeta")
+        p1, p2 = _crear_catalogo(stock=self.STOCK)
+
+        exitos = []
+        rechazos = []
+        errores = []
+        lock = threading.Lock()
+        inicio = threading.Barrier(self.HILOS)
+
+        def comprar(hilo):
+            inicio.wait()
+            try:
+                for venta in range(self.VENTAS_POR_HILO):
+                    # Orden de items distinto en cada hilo: el servicio debe ordenar los bloqueos
+                    items = [{"producto_id": p1.id, "cantidad": 1}, {"producto_id": p2.id, "cantidad": 1}]
+                    if (hilo + venta) % 2:
+                        items.reverse()
+                    try:
+                        nota = checkout_service.checkout(usuario.id, metodo.id, items)
+                        with lock:
+                            exitos.append(nota["id"])
+                    except checkout_service.StockInsuficienteError:
+                        with lock:
+                            rechazos.append(hilo)
+            except Exception as e:
+                with lock:
+                    errores.append(e)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=comprar, args=(i,)) for i in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        self.assertEqual(len(exitos), self.STOCK)
+        self.assertEqual(len(exitos) + len(rechazos), self.HILOS * self.VENTAS_POR_HILO)
+
+        p1.refresh_from_db()
+        p2.refresh_from_db()
+        self.assertEqual(p1.stock, 0)
+        self.assertEqual(p2.stock, 0)
+        self.assertEqual(Detalle_Venta.objects.filter(producto=p1).count(), self.STOCK)
+        self.assertEqual(NotaVenta.objects.count(), self.STOCK)
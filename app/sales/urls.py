@@ -4,5 +4,9 @@ from . import views
 
 
 urlpatterns = [
+    # ============= VENTAS =============
+    path('checkout', views.checkout, name='checkout'),
 
-]
\ No newline at end of file
+    # ============= REPORTES =============
+    path('reportes/ventas', views.reporte_ventas, name='reporte_ventas'),
+]
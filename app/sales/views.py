@@ -1,3 +1,77 @@
-from django.shortcuts import render
+from app.responses import JsonResponse
+from django.views.decorators.http import require_http_methods
+from django.views.decorators.csrf import csrf_exempt
+from django.core.exceptions import ValidationError
+from django.utils.dateparse import parse_date
+import json
+from .services import checkout as checkout_service
+from .services import reportes as reportes_service
+from users.services.jwt import jwt_required
 
-# Create your views here.
+# ============= VENTAS =============
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["POST"])
+def checkout(request):
+    """
+    POST /sales/checkout
+    Registra una venta del usuario autenticado y descuenta el stock.
+    Body: {
+        "metodo_pago_id": 1,
+        "items": [{"producto_id": 1, "cantidad": 2}, ...]
+    }
+    """
+    try:
+        payload = json.loads(request.body.decode() or "{}")
+        metodo_pago_id = payload.get("metodo_pago_id")
+        items = payload.get("items")
+
+        nota_venta = checkout_service.checkout(request.usuario_id, metodo_pago_id, items)
+        return JsonResponse({"ok": True, "nota_venta": nota_venta}, status=201)
+    except checkout_service.StockInsuficienteError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=409)
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=500)
+
+
+# ============= REPORTES =============
+
+def _parse_fecha(valor, nombre):
+    if not valor:
+        return None
+    fecha = parse_date(valor)
+    if fecha is None:
+        raise ValidationError(f"Fecha '{nombre}' inválida, use el formato AAAA-MM-DD")
+    return fecha
+
+@csrf_exempt
+@jwt_required
+@require_http_methods(["GET"])
+def reporte_ventas(request):
+    """
+    GET /sales/reportes/ventas
+    Ventas por día o totales por producto, categoría o marca, leídos de los resúmenes diarios.
+
+    Query params:
+    - dimension: dia | producto | categoria | marca (opcional, por defecto dia)
+    - desde, hasta: fecha AAAA-MM-DD (opcional)
+    - limit: integer (opcional) - solo para producto, categoria y marca
+    """
+    try:
+        dimension = request.GET.get("dimension") or "dia"
+        desde = _parse_fecha(request.GET.get("desde"), "desde")
+        hasta = _parse_fecha(request.GET.get("hasta"), "hasta")
+        limit = request.GET.get("limit")
+        limit = int(limit) if limit else None
+
+        resultados = reportes_service.reporte_ventas(dimension, desde, hasta, limit)
+        return JsonResponse({"ok": True, "dimension": dimension, "resultados": resultados}, status=200)
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+    except ValueError as e:
+        return JsonResponse({"ok": False, "error": f"Error en formato de datos: {str(e)}"}, status=400)
+    except Exception as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=500)
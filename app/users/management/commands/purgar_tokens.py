@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from users.services import tokens
+
+
+class Command(BaseCommand):
+    help = "Borra los refresh tokens y las revocaciones de access tokens ya vencidos."
+
+    def handle(self, *args, **options):
+        refresh, revocados = tokens.purgar()
+        self.stdout.write(self.style.SUCCESS(
+            f"Refresh tokens borrados: {refresh}, revocaciones borradas: {revocados}"
+        ))
@@ -0,0 +1,44 @@
+import csv
+import json
+import os
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from users.services import registro
+
+
+class Command(BaseCommand):
+    help = "Registra usuarios/clientes en lote desde un archivo CSV, JSON (lista) o NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo .csv, .json, .ndjson o .jsonl")
+        parser.add_argument('--batch-size', type=int, default=registro.REGISTRO_CHUNK_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Procesos para hashear contraseñas (por defecto, uno por CPU)",
+        )
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        try:
+            items = self._leer(ruta)
+            resultado = registro.registrar_usuarios(items, options['batch_size'], hash_workers=options['workers'])
+        except (OSError, ValueError, ValidationError) as e:
+            raise CommandError(str(e))
+
+        for numero, item in enumerate(resultado['resultados'], start=1):
+            if item['estado'] != registro.ESTADO_CREADO:
+                self.stderr.write(f"Item {numero} ({item['correo']}): {item['error']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Creados: {resultado.get(registro.ESTADO_CREADO, 0)}, "
+            f"duplicados: {resultado.get(registro.ESTADO_DUPLICADO, 0)}, "
+            f"con errores: {resultado.get(registro.ESTADO_ERROR, 0)}"
+        ))
+
+    def _leer(self, ruta):
+        with open(ruta, encoding='utf-8-sig') as archivo:
+            if ruta.lower().endswith('.csv'):
+                return list(csv.DictReader(archivo))
+            if ruta.lower().endswith('.json'):
+                return json.load(archivo)
+            return [json.loads(linea) for linea in archivo if linea.strip()]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_tokens'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['ci'], name='cliente_ci_idx'),
+        ),
+    ]
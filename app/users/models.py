@@ -23,6 +23,11 @@ class Cliente(models.Model):
     ci = models.CharField(max_length=20)
     telefono = models.CharField(max_length=20, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['ci'], name='cliente_ci_idx'),
+        ]
+
     def __str__(self):
         return f"Cliente: {self.nombres} {self.apellidoPaterno} {self.apellidoMaterno}"
 
@@ -37,4 +42,38 @@ class Administrador(models.Model):
     )
     nombre = models.CharField(max_length=100, blank=True, null=True)
     def __str__(self):
-        return f"Administrador: {self.nombre} <{self.correo}>"
\ No newline at end of file
+        return f"Administrador: {self.nombre} <{self.correo}>"
+
+class RefreshToken(models.Model):
+    """
+    Refresh token opaco: solo se guarda su hash (sha256). Cada uso lo rota por
+    uno nuevo de la misma familia; si se presenta uno ya rotado o revocado se
+    revoca toda la familia (el token pudo haber sido robado).
+    """
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='refresh_tokens')
+    token_hash = models.CharField(max_length=64, unique=True)
+    familia = models.CharField(max_length=32, db_index=True)
+    expires_at = models.DateTimeField()
+    revocado_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='refresh_token_expira_idx'),
+        ]
+
+    def __str__(self):
+        return f"RefreshToken {self.familia} de {self.usuario_id}"
+
+
+class TokenRevocado(models.Model):
+    """
+    jti de access tokens revocados antes de expirar (logout). Cada worker mantiene
+    una copia en memoria; las filas vencidas se pueden borrar (purgar_tokens).
+    """
+    jti = models.CharField(max_length=32, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"TokenRevocado {self.jti}"
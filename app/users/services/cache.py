@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from app.replicas import leer_del_primario
+from ..models import Usuario
+
+# Prefijo de las llaves de usuario en el cache compartido
+USUARIO_KEY_PREFIX = "usuario"
+
+
+class _LRUCache:
+    """
+    Cache LRU acotado con expiración, local a cada worker.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local = _LRUCache(settings.JWT_USER_CACHE_SIZE, settings.JWT_USER_CACHE_TTL)
+
+
+def _usuario_key(user_id):
+    return f"{USUARIO_KEY_PREFIX}:{user_id}"
+
+
+def get_usuario(user_id):
+    """
+    Obtiene el usuario autenticado usando primero el cache local del worker,
+    luego (si JWT_USER_CACHE_SHARED está activo) el cache compartido y por
+    último la base de datos. Lanza Usuario.DoesNotExist si no existe.
+    """
+    usuario = _local.get(user_id)
+    if usuario is not None:
+        return usuario
+
+    if settings.JWT_USER_CACHE_SHARED:
+        usuario = cache.get(_usuario_key(user_id))
+
+    if usuario is None:
+        # Del primario: una réplica atrasada dejaría al usuario viejo en cache
+        with leer_del_primario():
+            usuario = Usuario.objects.get(pk=user_id)
+        if settings.JWT_USER_CACHE_SHARED:
+            cache.set(_usuario_key(user_id), usuario, settings.JWT_USER_CACHE_TTL)
+
+    _local.set(user_id, usuario)
+    return usuario
+
+
+async def aget_usuario(user_id):
+    """
+    Versión async de get_usuario para vistas async.
+    """
+    usuario = _local.get(user_id)
+    if usuario is not None:
+        return usuario
+
+    if settings.JWT_USER_CACHE_SHARED:
+        usuario = await cache.aget(_usuario_key(user_id))
+
+    if usuario is None:
+        with leer_del_primario():
+            usuario = await Usuario.objects.aget(pk=user_id)
+        if settings.JWT_USER_CACHE_SHARED:
+            await cache.aset(_usuario_key(user_id), usuario, settings.JWT_USER_CACHE_TTL)
+
+    _local.set(user_id, usuario)
+    return usuario
+
+
+def invalidate_usuario(user_id):
+    """
+    Elimina al usuario del cache local y del compartido.
+    Los demás workers lo descartan al vencer JWT_USER_CACHE_TTL.
+    """
+    _local.delete(user_id)
+    if settings.JWT_USER_CACHE_SHARED:
+        cache.delete(_usuario_key(user_id))
+
+
+def clear():
+    _local.clear()
@@ -0,0 +1,86 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+# Hashing de contraseñas en un pool de procesos (PASSWORD_HASH_WORKERS).
+#
+# El hasher es CPU puro y con hilos no escala por el GIL. Los procesos se crean
+# con spawn (no heredan conexiones ni hilos del worker web) y configuran Django
+# al arrancar para leer PASSWORD_HASHERS. Este módulo no importa modelos: los
+# procesos lo importan antes de django.setup().
+#
+# Hay un pool por proceso y se crea al primer uso. En los workers web queda
+# acotado por PASSWORD_HASH_WORKERS (cada worker web suma esos procesos); el
+# comando registrar_usuarios pide uno más grande con --workers.
+
+logger = logging.getLogger(__name__)
+
+# Con pocas contraseñas no vale la pena repartirlas entre procesos
+MIN_PASSWORDS_POOL = 4
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+# ============= HASHING =============
+
+def _iniciar_worker(settings_module):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+    django.setup()
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            # Otro tamaño (ej. el comando pidió más procesos): se reemplaza
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            _pool_workers = workers
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_iniciar_worker,
+                initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "app.settings"),),
+            )
+    return _pool
+
+
+def cerrar_pool():
+    """
+    Detiene los procesos del pool de hashing (se vuelve a crear al usarlo).
+    """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def hashear_passwords(passwords, workers=None):
+    """
+    make_password de cada contraseña, en el mismo orden. Usa el pool de
+    procesos si hay más de un worker y suficientes contraseñas.
+    workers: procesos del pool (por defecto PASSWORD_HASH_WORKERS).
+    """
+    passwords = list(passwords)
+    workers = workers or settings.PASSWORD_HASH_WORKERS
+    if workers <= 1 or len(passwords) < MIN_PASSWORDS_POOL:
+        return [make_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    try:
+        return list(_get_pool(workers).map(make_password, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        # Un proceso murió (ej. OOM): se descarta el pool y se hashea acá
+        logger.exception("Pool de hashing roto, se hashea en el proceso actual")
+        cerrar_pool()
+        return [make_password(password) for password in passwords]
@@ -1,48 +1,122 @@
 from functools import wraps
-from django.http import JsonResponse
-from django.conf import settings
+from asgiref.sync import iscoroutinefunction
+from django.utils.functional import SimpleLazyObject
 import jwt
+from app.responses import JsonResponse
 from ..models import Usuario
+from . import cache as usuario_cache
+from . import tokens
 
 # Decorador JWT compatible con multipart/form-data
+#
+# Uso:
+#   @jwt_required                  -> carga el usuario (con cache) en request.usuario
+#   @jwt_required(stateless=True)  -> confía en el token; request.usuario solo se
+#                                     consulta si la vista lo usa (para endpoints de lectura)
+#
+# Funciona igual sobre vistas sync y async (async def). En vistas async con
+# stateless=True, request.usuario solo puede usarse desde código sync; usar
+# request.usuario_id o usuario_cache.aget_usuario().
+#
+# El token se verifica con tokens.verificar (cache de tokens ya validados) y se
+# rechaza si su jti fue revocado (logout). request.token_payload queda disponible.
+
+
+class _TokenError(Exception):
+    def __init__(self, mensaje, status=401):
+        super().__init__(mensaje)
+        self.status = status
+
+
+def _payload(request):
+    """
+    Valida el header Authorization y retorna el payload del token.
+    Lanza _TokenError con el mensaje y status de la respuesta de error.
+    """
+    # Obtener el token del header Authorization
+    auth = request.META.get('HTTP_AUTHORIZATION', '')
+
+    if not auth:
+        raise _TokenError('Se requiere Authorization header')
+
+    parts = auth.split()
+    if len(parts) != 2 or parts[0].lower() != 'bearer':
+        raise _TokenError('Formato inválido de Authorization header (debe ser: Bearer <token>)')
+
+    token = parts[1]
+
+    try:
+        # Decodificar y validar el token (PyJWT, con cache por firma)
+        payload = tokens.verificar(token)
+    except jwt.ExpiredSignatureError:
+        raise _TokenError('Token expirado')
+    except jwt.InvalidTokenError as e:
+        raise _TokenError(f'Token inválido: {str(e)}')
+
+    if payload.get('user_id') is None:
+        raise _TokenError('Token inválido - user_id no encontrado')
+    if tokens.esta_revocado(payload):
+        raise _TokenError('Token revocado')
+    return payload
+
+
+def _error(e):
+    return JsonResponse({'ok': False, 'error': str(e)}, status=e.status)
+
+
+def jwt_required(view_func=None, *, stateless=False):
+    if view_func is None:
+        return lambda func: jwt_required(func, stateless=stateless)
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _wrapped_async(request, *args, **kwargs):
+            try:
+                await tokens.asincronizar_revocados()
+                payload = _payload(request)
+                user_id = payload['user_id']
+                request.token_payload = payload
+                request.usuario_id = user_id
+
+                if stateless:
+                    request.usuario = SimpleLazyObject(lambda: usuario_cache.get_usuario(user_id))
+                else:
+                    try:
+                        request.usuario = await usuario_cache.aget_usuario(user_id)
+                    except Usuario.DoesNotExist:
+                        return JsonResponse({'ok': False, 'error': 'Usuario no encontrado'}, status=401)
+
+                return await view_func(request, *args, **kwargs)
+            except _TokenError as e:
+                return _error(e)
+            except Exception as e:
+                return JsonResponse({'ok': False, 'error': f'Error al validar token: {str(e)}'}, status=500)
+
+        return _wrapped_async
 
-def jwt_required(view_func):
     @wraps(view_func)
     def _wrapped(request, *args, **kwargs):
-        # Obtener el token del header Authorization
-        auth = request.META.get('HTTP_AUTHORIZATION', '')
-        
-        if not auth:
-            return JsonResponse({'ok': False, 'error': 'Se requiere Authorization header'}, status=401)
-        
-        parts = auth.split()
-        if len(parts) != 2 or parts[0].lower() != 'bearer':
-            return JsonResponse({'ok': False, 'error': 'Formato inválido de Authorization header (debe ser: Bearer <token>)'}, status=401)
-        
-        token = parts[1]
-        
         try:
-            # Decodificar y validar el token usando PyJWT
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-            user_id = payload.get('user_id')
-            
-            if user_id is None:
-                return JsonResponse({'ok': False, 'error': 'Token inválido - user_id no encontrado'}, status=401)
-            
+            tokens.sincronizar_revocados()
+            payload = _payload(request)
+            user_id = payload['user_id']
+            request.token_payload = payload
+            request.usuario_id = user_id
+
             # Adjuntar el usuario al request para usarlo en la view
-            try:
-                request.usuario = Usuario.objects.get(pk=user_id)
-            except Usuario.DoesNotExist:
-                return JsonResponse({'ok': False, 'error': 'Usuario no encontrado'}, status=401)
-            
+            if stateless:
+                request.usuario = SimpleLazyObject(lambda: usuario_cache.get_usuario(user_id))
+            else:
+                try:
+                    request.usuario = usuario_cache.get_usuario(user_id)
+                except Usuario.DoesNotExist:
+                    return JsonResponse({'ok': False, 'error': 'Usuario no encontrado'}, status=401)
+
             # Llamar a la vista original
             return view_func(request, *args, **kwargs)
-            
-        except jwt.ExpiredSignatureError:
-            return JsonResponse({'ok': False, 'error': 'Token expirado'}, status=401)
-        except jwt.InvalidTokenError as e:
-            return JsonResponse({'ok': False, 'error': f'Token inválido: {str(e)}'}, status=401)
+        except _TokenError as e:
+            return _error(e)
         except Exception as e:
             return JsonResponse({'ok': False, 'error': f'Error al validar token: {str(e)}'}, status=500)
-    
-    return _wrapped
\ No newline at end of file
+
+    return _wrapped
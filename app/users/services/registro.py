@@ -0,0 +1,168 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from ..models import Cliente, Usuario
+from .hashing import hashear_passwords
+
+# Registro masivo de usuarios y clientes.
+#
+# Los correos se validan y se descartan los repetidos (en la solicitud o ya
+# registrados, con una sola consulta IN). Las contraseñas se hashean en un pool
+# de procesos (ver hashing.py) y cada lote se guarda con un bulk_create de
+# Usuario y otro de Cliente en la misma transacción.
+#
+# Cada contraseña cuesta ~0.5 s de CPU (PBKDF2), así que la API acepta pocos
+# usuarios por solicitud (MAX_BULK_USUARIOS_API); los lotes grandes se cargan
+# con el comando registrar_usuarios.
+
+MAX_BULK_USUARIOS = 10000
+MAX_BULK_USUARIOS_API = 20
+REGISTRO_CHUNK_SIZE = 1000
+
+ESTADO_CREADO = "creado"
+ESTADO_DUPLICADO = "duplicado"
+ESTADO_ERROR = "error"
+
+TIPOS = ("cliente", "usuario")
+
+_CAMPOS_CLIENTE = ("nombres", "apellidoPaterno", "apellidoMaterno", "ci")
+_LONGITUDES = {
+    campo: Cliente._meta.get_field(campo).max_length
+    for campo in _CAMPOS_CLIENTE + ("telefono",)
+}
+_CORREO_MAX = Usuario._meta.get_field("correo").max_length
+
+
+# ============= VALIDACIÓN =============
+
+def _texto(valor):
+    return str(valor).strip() if valor is not None else ""
+
+
+def _normalizar_item(item):
+    """
+    Valida un item {correo, password, tipo?, nombres, apellidoPaterno,
+    apellidoMaterno, ci, telefono?}. Lanza ValueError con el motivo.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Cada item debe ser un objeto")
+
+    correo = _texto(item.get("correo"))
+    password = item.get("password")
+    if not correo or not password:
+        raise ValueError("Correo y contraseña son obligatorios")
+    if not isinstance(password, str):
+        raise ValueError("password debe ser un texto")
+    if len(correo) > _CORREO_MAX:
+        raise ValueError(f"El correo no puede superar {_CORREO_MAX} caracteres")
+    try:
+        validate_email(correo)
+    except ValidationError:
+        raise ValueError(f"Correo inválido: {correo}")
+
+    tipo = item.get("tipo_usuario", "cliente")
+    if tipo not in TIPOS:
+        raise ValueError(f"tipo_usuario inválido: {tipo} (use {', '.join(TIPOS)})")
+
+    datos = {"correo": correo, "password": password, "tipo": tipo}
+    if tipo == "cliente":
+        for campo in _CAMPOS_CLIENTE + ("telefono",):
+            datos[campo] = _texto(item.get(campo)) or None
+        if not all(datos[campo] for campo in _CAMPOS_CLIENTE):
+            raise ValueError("Para crear un cliente se requieren: nombres, apellidoPaterno, apellidoMaterno, ci")
+        for campo, maximo in _LONGITUDES.items():
+            if datos[campo] and len(datos[campo]) > maximo:
+                raise ValueError(f"{campo} no puede superar {maximo} caracteres")
+    return datos
+
+
+# ============= REGISTRO =============
+
+def _guardar_lote(lote, hashes, resultados):
+    """
+    Crea los usuarios (y clientes) de un lote de (posicion, datos) en una
+    transacción. Si otro request registró uno de los correos mientras tanto,
+    el lote completo queda con error.
+    """
+    try:
+        with transaction.atomic():
+            usuarios = Usuario.objects.bulk_create([
+                Usuario(correo=datos["correo"], password=password)
+                for (_, datos), password in zip(lote, hashes)
+            ])
+            Cliente.objects.bulk_create([
+                Cliente(usuario=usuario, **{campo: datos[campo] for campo in _LONGITUDES})
+                for usuario, (_, datos) in zip(usuarios, lote)
+                if datos["tipo"] == "cliente"
+            ])
+    except IntegrityError:
+        for posicion, datos in lote:
+            resultados[posicion] = {
+                "correo": datos["correo"],
+                "estado": ESTADO_ERROR,
+                "error": "Un correo del lote se registró durante la solicitud, reintente",
+            }
+        return
+
+    for usuario, (posicion, datos) in zip(usuarios, lote):
+        resultados[posicion] = {
+            "id": usuario.id,
+            "correo": usuario.correo,
+            "tipo": datos["tipo"],
+            "estado": ESTADO_CREADO,
+        }
+
+
+def registrar_usuarios(items, chunk_size=REGISTRO_CHUNK_SIZE, max_items=MAX_BULK_USUARIOS, hash_workers=None):
+    """
+    Registra muchos usuarios/clientes.
+    items: [{"correo": "...", "password": "...", "tipo_usuario": "cliente" | "usuario",
+             "nombres": "...", "apellidoPaterno": "...", "apellidoMaterno": "...",
+             "ci": "...", "telefono": "..."}, ...]
+    tipo_usuario es "cliente" por defecto. Retorna {"resultados": [...]} (uno
+    por item, en el mismo orden) más la cantidad de items por estado.
+    hash_workers: procesos para hashear (por defecto PASSWORD_HASH_WORKERS).
+    """
+    if not isinstance(items, list) or not items:
+        raise ValidationError("Debe enviar una lista de usuarios")
+    if len(items) > max_items:
+        raise ValidationError(f"Máximo {max_items} usuarios por solicitud")
+    if chunk_size <= 0:
+        raise ValidationError("El tamaño de lote debe ser mayor a 0")
+
+    resultados = [None] * len(items)
+    validos = {}
+    for posicion, item in enumerate(items):
+        try:
+            datos = _normalizar_item(item)
+        except ValueError as e:
+            correo = item.get("correo") if isinstance(item, dict) else None
+            resultados[posicion] = {"correo": correo, "estado": ESTADO_ERROR, "error": str(e)}
+            continue
+        if datos["correo"] in validos:
+            resultados[posicion] = {
+                "correo": datos["correo"], "estado": ESTADO_DUPLICADO, "error": "Correo repetido en la solicitud",
+            }
+            continue
+        validos[datos["correo"]] = (posicion, datos)
+
+    # Una sola consulta para todos los correos ya registrados
+    registrados = set(Usuario.objects.filter(correo__in=list(validos)).values_list("correo", flat=True))
+    nuevos = []
+    for correo, (posicion, datos) in validos.items():
+        if correo in registrados:
+            resultados[posicion] = {
+                "correo": correo, "estado": ESTADO_DUPLICADO, "error": "El correo ya está registrado",
+            }
+        else:
+            nuevos.append((posicion, datos))
+
+    # Se hashea todo antes de abrir transacciones: el hashing es lo más lento
+    hashes = hashear_passwords((datos["password"] for _, datos in nuevos), hash_workers)
+    for inicio in range(0, len(nuevos), chunk_size):
+        _guardar_lote(nuevos[inicio:inicio + chunk_size], hashes[inicio:inicio + chunk_size], resultados)
+
+    totales = {}
+    for resultado in resultados:
+        totales[resultado["estado"]] = totales.get(resultado["estado"], 0) + 1
+    return {"resultados": resultados, **totales}
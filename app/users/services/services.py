@@ -3,11 +3,12 @@ from ..models import *
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.contrib.auth.hashers import make_password , check_password
 from django.db import transaction
+from . import cache as usuario_cache
+from . import tokens
 
 
-import jwt
-from datetime import datetime, timedelta
-from django.conf import settings
+# Filas por consulta al exportar con streaming
+STREAM_CHUNK_SIZE = 2000
 
 # ============= USUARIOS =============
 
@@ -24,6 +25,11 @@ def get_users():
         })
     return usuarios_list
 
+def iter_users(chunk_size=STREAM_CHUNK_SIZE):
+    """Recorre todos los usuarios por bloques sin cargarlos en memoria"""
+    qs = Usuario.objects.order_by("id").values("id", "correo", "created_at", "updated_at")
+    return qs.iterator(chunk_size=chunk_size)
+
 def get_user_by_id(user_id):
     """Obtiene un usuario por ID"""
     try:
@@ -122,12 +128,13 @@ def update_user(user_id, correo=None, password=None):
                 usuario.password = make_password(password)
             
             usuario.save()
-            
-            return {
-                "id": usuario.id,
-                "correo": usuario.correo,
-                "updated_at": usuario.updated_at,
-            }
+
+        usuario_cache.invalidate_usuario(usuario.id)
+        return {
+            "id": usuario.id,
+            "correo": usuario.correo,
+            "updated_at": usuario.updated_at,
+        }
     except Usuario.DoesNotExist:
         raise ValidationError(f"Usuario con id {user_id} no encontrado")
 
@@ -137,7 +144,8 @@ def delete_user(user_id):
         with transaction.atomic():
             usuario = Usuario.objects.get(pk=user_id)
             usuario.delete()
-            return True
+        usuario_cache.invalidate_usuario(user_id)
+        return True
     except Usuario.DoesNotExist:
         raise ValidationError(f"Usuario con id {user_id} no encontrado")
 
@@ -160,6 +168,21 @@ def get_all_clientes():
         })
     return result
 
+def iter_clientes(chunk_size=STREAM_CHUNK_SIZE):
+    """Recorre todos los clientes por bloques sin cargarlos en memoria"""
+    qs = Cliente.objects.select_related('usuario').order_by('pk')
+    for cliente in qs.iterator(chunk_size=chunk_size):
+        yield {
+            "id": cliente.pk,
+            "usuario_id": cliente.usuario.id,
+            "correo": cliente.usuario.correo,
+            "nombres": cliente.nombres,
+            "apellidoPaterno": cliente.apellidoPaterno,
+            "apellidoMaterno": cliente.apellidoMaterno,
+            "ci": cliente.ci,
+            "telefono": cliente.telefono,
+        }
+
 def get_cliente_by_id(cliente_id):
     """Obtiene un cliente por ID"""
     try:
@@ -227,7 +250,8 @@ def delete_cliente(cliente_id):
             cliente = Cliente.objects.get(pk=cliente_id)
             # Al eliminar el usuario, el cliente se elimina por CASCADE
             cliente.usuario.delete()
-            return True
+        usuario_cache.invalidate_usuario(cliente_id)
+        return True
     except Cliente.DoesNotExist:
         raise ValidationError(f"Cliente con id {cliente_id} no encontrado")
 
@@ -293,21 +317,16 @@ def delete_admin(admin_id):
             admin = Administrador.objects.get(pk=admin_id)
             # Al eliminar el usuario, el admin se elimina por CASCADE
             admin.usuario.delete()
-            return True
+        usuario_cache.invalidate_usuario(admin_id)
+        return True
     except Administrador.DoesNotExist:
         raise ValidationError(f"Administrador con id {admin_id} no encontrado")
 
 # ============= AUTENTICACIÓN =============
 
 def create_jwt_token(usuario):
-    """Crea un token JWT para el usuario"""
-    payload = {
-        'user_id': usuario.id,
-        'exp': datetime.utcnow() + timedelta(hours=1),
-        'iat': datetime.utcnow(),
-    }
-    token = jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
-    return token
+    """Crea un token JWT (access token) para el usuario"""
+    return tokens.crear_access_token(usuario.id)
 
 def authenticate_usuario(correo, password):
     """Autentica un usuario y devuelve el usuario con token"""
@@ -316,6 +335,7 @@ def authenticate_usuario(correo, password):
         if check_password(password, usuario.password):
             token = create_jwt_token(usuario)
             usuario.token = token
+            usuario.refresh_token = tokens.crear_refresh_token(usuario.id)
             return usuario
         else:
             return None
@@ -0,0 +1,272 @@
+import hashlib
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+import jwt
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from ..models import RefreshToken, TokenRevocado
+
+# Tokens de acceso y de refresco.
+#
+# - Access token: JWT HS256 con user_id, jti y exp (JWT_ACCESS_TTL segundos).
+# - Refresh token: string aleatorio opaco (JWT_REFRESH_TTL segundos); en la base
+#   solo se guarda su sha256. Cada refresh lo rota por uno nuevo de la misma
+#   familia; presentar uno ya usado revoca la familia completa.
+# - Revocación de access tokens (logout): los jti van a TokenRevocado y cada
+#   worker guarda una copia en memoria que sincroniza cada JWT_REVOCATION_SYNC
+#   segundos, así verificar un token no consulta la base.
+# - Verificación: los payloads ya validados se guardan por firma hasta su exp
+#   (hasta JWT_DECODE_CACHE_SIZE tokens), así un token repetido no vuelve a
+#   calcular el HMAC ni a decodificar el JSON.
+
+
+class TokenInvalido(Exception):
+    pass
+
+
+def _hash(refresh_token):
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+# ============= EMISIÓN =============
+
+def crear_access_token(usuario_id):
+    """
+    Crea un access token JWT para el usuario.
+    """
+    ahora = timezone.now()
+    payload = {
+        'user_id': usuario_id,
+        'jti': uuid.uuid4().hex,
+        'exp': ahora + timedelta(seconds=settings.JWT_ACCESS_TTL),
+        'iat': ahora,
+    }
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+
+
+def crear_refresh_token(usuario_id, familia=None):
+    """
+    Crea y guarda un refresh token. Sin familia, empieza una sesión nueva.
+    """
+    refresh_token = secrets.token_urlsafe(32)
+    RefreshToken.objects.create(
+        usuario_id=usuario_id,
+        token_hash=_hash(refresh_token),
+        familia=familia or uuid.uuid4().hex,
+        expires_at=timezone.now() + timedelta(seconds=settings.JWT_REFRESH_TTL),
+    )
+    return refresh_token
+
+
+def _tokens(usuario_id, refresh_token):
+    return {
+        "token": crear_access_token(usuario_id),
+        "refresh_token": refresh_token,
+        "expires_in": settings.JWT_ACCESS_TTL,
+    }
+
+
+def rotar_refresh_token(refresh_token):
+    """
+    Canjea un refresh token por un access token y un refresh token nuevos.
+    Lanza TokenInvalido si no existe, expiró o ya fue usado (en ese caso
+    revoca toda la familia).
+    """
+    ahora = timezone.now()
+    reutilizado = False
+    with transaction.atomic():
+        actual = (
+            RefreshToken.objects.select_for_update()
+            .filter(token_hash=_hash(refresh_token or ""))
+            .first()
+        )
+        if actual is None:
+            raise TokenInvalido("Refresh token inválido")
+        if actual.revocado_at is not None:
+            RefreshToken.objects.filter(familia=actual.familia, revocado_at__isnull=True).update(revocado_at=ahora)
+            reutilizado = True
+        elif actual.expires_at <= ahora:
+            raise TokenInvalido("Refresh token expirado")
+        else:
+            actual.revocado_at = ahora
+            actual.save(update_fields=['revocado_at'])
+            nuevo = crear_refresh_token(actual.usuario_id, actual.familia)
+
+    # Fuera del atomic: la revocación de la familia tiene que quedar guardada
+    if reutilizado:
+        raise TokenInvalido("Refresh token ya utilizado: se cerró la sesión")
+    return _tokens(actual.usuario_id, nuevo)
+
+
+# ============= REVOCACIÓN =============
+
+class _Revocados:
+    """
+    Copia en memoria de los jti revocados que aún no expiran.
+    """
+
+    def __init__(self):
+        self._jtis = {}
+        self._sincronizado = None
+        self._desde = None
+        self._lock = threading.Lock()
+
+    def contiene(self, jti):
+        return jti in self._jtis
+
+    def pendiente(self):
+        return self._sincronizado is None or time.monotonic() - self._sincronizado >= settings.JWT_REVOCATION_SYNC
+
+    def consulta(self):
+        # Se relee una ventana anterior a la última sincronización para no perder
+        # filas que se confirmaron mientras se leía
+        qs = TokenRevocado.objects.filter(expires_at__gt=timezone.now())
+        if self._desde is not None:
+            qs = qs.filter(created_at__gte=self._desde - timedelta(seconds=settings.JWT_REVOCATION_SYNC))
+        return qs.values_list('jti', 'expires_at'), timezone.now()
+
+    def cargar(self, filas, leido_en):
+        ahora = time.time()
+        with self._lock:
+            for jti, expires_at in filas:
+                self._jtis[jti] = expires_at.timestamp()
+            for jti in [jti for jti, exp in self._jtis.items() if exp <= ahora]:
+                del self._jtis[jti]
+            self._desde = leido_en
+            self._sincronizado = time.monotonic()
+
+    def agregar(self, jti, exp):
+        with self._lock:
+            self._jtis[jti] = exp
+
+    def clear(self):
+        with self._lock:
+            self._jtis.clear()
+            self._sincronizado = None
+            self._desde = None
+
+
+_revocados = _Revocados()
+
+
+def sincronizar_revocados():
+    """
+    Trae de la base los jti revocados nuevos si pasó JWT_REVOCATION_SYNC.
+    """
+    if _revocados.pendiente():
+        qs, leido_en = _revocados.consulta()
+        _revocados.cargar(list(qs), leido_en)
+
+
+async def asincronizar_revocados():
+    """
+    Versión async de sincronizar_revocados.
+    """
+    if _revocados.pendiente():
+        qs, leido_en = _revocados.consulta()
+        _revocados.cargar([fila async for fila in qs], leido_en)
+
+
+def esta_revocado(payload):
+    jti = payload.get('jti')
+    return jti is not None and _revocados.contiene(jti)
+
+
+def revocar_access_token(payload):
+    """
+    Revoca un access token (por su jti) hasta que expire.
+    """
+    jti = payload.get('jti')
+    if jti is None:
+        return
+    expires_at = datetime.fromtimestamp(payload['exp'], tz=dt_timezone.utc)
+    TokenRevocado.objects.get_or_create(jti=jti, defaults={'expires_at': expires_at})
+    _revocados.agregar(jti, payload['exp'])
+
+
+def revocar_refresh_token(refresh_token, usuario_id):
+    """
+    Revoca la familia del refresh token indicado (cierra esa sesión).
+    """
+    actual = RefreshToken.objects.filter(token_hash=_hash(refresh_token), usuario_id=usuario_id).first()
+    if actual is None:
+        return 0
+    return RefreshToken.objects.filter(familia=actual.familia, revocado_at__isnull=True).update(
+        revocado_at=timezone.now()
+    )
+
+
+def purgar():
+    """
+    Borra refresh tokens y revocaciones vencidos. Retorna (refresh, revocados) borrados.
+    """
+    ahora = timezone.now()
+    refresh, _ = RefreshToken.objects.filter(expires_at__lte=ahora).delete()
+    revocados, _ = TokenRevocado.objects.filter(expires_at__lte=ahora).delete()
+    return refresh, revocados
+
+
+# ============= VERIFICACIÓN =============
+
+class _Verificados:
+    """
+    Payloads de tokens ya verificados, por firma, hasta su exp. Se guarda
+    también el resto del token para no aceptar la firma con otro payload.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, firma, firmado):
+        with self._lock:
+            item = self._data.get(firma)
+            if item is None:
+                return None
+            contenido, payload, exp = item
+            if contenido != firmado or exp <= time.time():
+                del self._data[firma]
+                return None
+            self._data.move_to_end(firma)
+            return payload
+
+    def set(self, firma, firmado, payload):
+        with self._lock:
+            self._data[firma] = (firmado, payload, payload.get('exp', 0))
+            self._data.move_to_end(firma)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_verificados = _Verificados(settings.JWT_DECODE_CACHE_SIZE)
+
+
+def verificar(token):
+    """
+    Decodifica y valida un access token. Lanza las excepciones de PyJWT
+    (ExpiredSignatureError, InvalidTokenError) igual que jwt.decode.
+    """
+    firmado, _, firma = token.rpartition('.')
+    payload = _verificados.get(firma, firmado)
+    if payload is not None:
+        return payload
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+    # Sin exp no se cachea: no habría cuándo descartarlo
+    if 'exp' in payload:
+        _verificados.set(firma, firmado, payload)
+    return payload
+
+
+def clear():
+    _verificados.clear()
+    _revocados.clear()
@@ -1,3 +1,324 @@
-from django.test import TestCase
+import json
+import time
+from unittest import mock
+from django.core.cache import cache
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from app import throttle
+from .models import Cliente, RefreshToken, Usuario
+from .services import cache as usuario_cache
+from .services import hashing, registro, tokens
+from .services import services as user_services
 
-# Create your tests here.
+
+@override_settings(THROTTLE_RATES={"login_ip": "4/min", "login_correo": "2/min", "write": "1000/min"})
+class LoginThrottleTests(TestCase):
+    """
+    El login se limita por IP y por correo antes de consultar la base de datos.
+    """
+
+    def setUp(self):
+        throttle.reset()
+        self.addCleanup(throttle.reset)
+        Usuario.objects.create(correo="ana@example.com", password=make_password("secreto"))
+
+    def _login(self, correo, password="incorrecta", ip="10.0.0.1"):
+        body = json.dumps({"correo": correo, "password": password})
+        return self.client.post(reverse("auth"), body, content_type="application/json", REMOTE_ADDR=ip)
+
+    def test_limite_por_correo(self):
+        self.assertEqual(self._login("ana@example.com").status_code, 401)
+        self.assertEqual(self._login("ana@example.com").status_code, 401)
+
+        # Sin fichas: 429 sin tocar la base ni el hasher, aunque cambie la IP o las mayúsculas
+        with CaptureQueriesContext(connection) as queries:
+            response = self._login("ANA@example.com", "secreto", ip="10.0.0.2")
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        self.assertEqual(len(queries), 0)
+
+        self.assertEqual(self._login("otro@example.com").status_code, 401)
+
+    def test_limite_por_ip(self):
+        codigos = [self._login(f"u{i}@example.com").status_code for i in range(5)]
+        self.assertEqual(codigos, [401, 401, 401, 401, 429])
+        self.assertEqual(self._login("ana@example.com", "secreto", ip="10.0.0.9").status_code, 200)
+
+    def test_desactivado(self):
+        with override_settings(THROTTLE_ENABLED=False):
+            codigos = {self._login("ana@example.com").status_code for _ in range(5)}
+        self.assertEqual(codigos, {401})
+
+    def test_429_de_escritura_lleva_headers_cors(self):
+        headers = {"Origin": "https://tienda.example.com"}
+        with override_settings(THROTTLE_RATES={"write": "1/min"}):
+            self.client.post(reverse("create_user"), "{}", content_type="application/json", headers=headers)
+            response = self.client.post(reverse("create_user"), "{}", content_type="application/json", headers=headers)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        self.assertIn("Access-Control-Allow-Origin", response)
+
+
+class RefreshTokenTests(TestCase):
+    """
+    Refresh tokens con rotación, detección de reutilización y logout.
+    """
+
+    def setUp(self):
+        throttle.reset()
+        tokens.clear()
+        self.addCleanup(tokens.clear)
+        Usuario.objects.create(correo="ana@example.com", password=make_password("secreto"))
+        body = json.dumps({"correo": "ana@example.com", "password": "secreto"})
+        self.sesion = self.client.post(reverse("auth"), body, content_type="application/json").json()["usuario"]
+
+    def _refresh(self, refresh_token):
+        body = json.dumps({"refresh_token": refresh_token})
+        return self.client.post(reverse("auth_refresh"), body, content_type="application/json")
+
+    def _get(self, token):
+        return self.client.get(reverse("get_categorias"), headers={"Authorization": f"Bearer {token}"})
+
+    def test_rotacion_y_reutilizacion(self):
+        nuevos = self._refresh(self.sesion["refresh_token"]).json()
+        self.assertTrue(nuevos["ok"])
+        self.assertNotEqual(nuevos["refresh_token"], self.sesion["refresh_token"])
+        self.assertEqual(self._get(nuevos["token"]).status_code, 200)
+
+        # Reusar el refresh token rotado revoca la familia: el último emitido tampoco sirve
+        self.assertEqual(self._refresh(self.sesion["refresh_token"]).status_code, 401)
+        self.assertEqual(self._refresh(nuevos["refresh_token"]).status_code, 401)
+        self.assertFalse(RefreshToken.objects.filter(revocado_at__isnull=True).exists())
+
+    def test_logout_revoca_el_access_token(self):
+        token = self.sesion["token"]
+        self.assertEqual(self._get(token).status_code, 200)
+
+        response = self.client.post(
+            reverse("auth_logout"),
+            json.dumps({"refresh_token": self.sesion["refresh_token"]}),
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        self.assertTrue(response.json()["ok"])
+        self.assertEqual(self._get(token).json()["error"], "Token revocado")
+        self.assertEqual(self._refresh(self.sesion["refresh_token"]).status_code, 401)
+
+        # Otro worker (memoria vacía) lo lee de la base
+        tokens.clear()
+        self.assertEqual(self._get(token).status_code, 401)
+
+    def test_token_cacheado_no_acepta_otro_payload(self):
+        token = self.sesion["token"]
+        self.assertEqual(self._get(token).status_code, 200)
+        header, _, firma = token.split(".")
+        otro = tokens.crear_access_token(999).split(".")[1]
+        self.assertEqual(self._get(f"{header}.{otro}.{firma}").status_code, 401)
+
+
+class UsuarioCacheTests(TestCase):
+    """
+    Cache del usuario autenticado (jwt_required): se invalida al actualizar o
+    eliminar el usuario.
+    """
+
+    def setUp(self):
+        usuario_cache.clear()
+        cache.clear()
+        self.addCleanup(usuario_cache.clear)
+        self.usuario = Usuario.objects.create(correo="ana@example.com", password=make_password("secreto"))
+        self.headers = {"Authorization": f"Bearer {tokens.crear_access_token(self.usuario.id)}"}
+
+    def test_acierto_sin_consultas(self):
+        usuario_cache.get_usuario(self.usuario.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(usuario_cache.get_usuario(self.usuario.id).correo, "ana@example.com")
+
+    @override_settings(JWT_USER_CACHE_SHARED=True)
+    def test_cache_compartido(self):
+        usuario_cache.get_usuario(self.usuario.id)
+        # Otro worker: sin cache local, lo lee del compartido
+        usuario_cache.clear()
+        with self.assertNumQueries(0):
+            usuario_cache.get_usuario(self.usuario.id)
+        user_services.update_user(self.usuario.id, correo="ana.nueva@example.com")
+        usuario_cache.clear()
+        self.assertEqual(usuario_cache.get_usuario(self.usuario.id).correo, "ana.nueva@example.com")
+
+    def test_actualizar_invalida(self):
+        usuario_cache.get_usuario(self.usuario.id)
+        user_services.update_user(self.usuario.id, correo="ana.nueva@example.com")
+        self.assertEqual(usuario_cache.get_usuario(self.usuario.id).correo, "ana.nueva@example.com")
+
+    def test_eliminar_invalida(self):
+        url = reverse("get_user", args=[self.usuario.id])
+        self.assertEqual(self.client.get(url, headers=self.headers).status_code, 200)
+        user_services.delete_user(self.usuario.id)
+        response = self.client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["error"], "Usuario no encontrado")
+
+
+class JwtUsuarioCacheTests(TestCase):
+    """
+    jwt_required no consulta el usuario en cada request: lo toma del cache
+    LRU del worker, y en modo stateless solo si la vista lo usa.
+    """
+
+    def setUp(self):
+        usuario_cache.clear()
+        self.addCleanup(usuario_cache.clear)
+        self.usuario = Usuario.objects.create(correo="ana@example.com", password="x")
+        self.headers = {"Authorization": f"Bearer {tokens.crear_access_token(self.usuario.id)}"}
+
+    def _consultas_de_usuario(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        tabla = f'"{Usuario._meta.db_table}"'
+        return len([q for q in queries if f"FROM {tabla}" in q["sql"]])
+
+    def test_el_usuario_se_consulta_una_vez(self):
+        # get_user consulta además el usuario pedido en la vista
+        url = reverse("get_user", args=[self.usuario.id])
+        self.assertEqual(self._consultas_de_usuario(url), 2)
+        self.assertEqual(self._consultas_de_usuario(url), 1)
+
+    def test_stateless_no_consulta_el_usuario(self):
+        self.assertEqual(self._consultas_de_usuario(reverse("get_categorias")), 0)
+
+    def test_lru_acotado_y_con_expiracion(self):
+        lru = usuario_cache._LRUCache(maxsize=2, ttl=30)
+        lru.set(1, "a")
+        lru.set(2, "b")
+        lru.get(1)
+        lru.set(3, "c")
+        # Se descarta el menos usado recientemente
+        self.assertEqual((lru.get(1), lru.get(2), lru.get(3)), ("a", None, "c"))
+
+        with mock.patch("users.services.cache.time.monotonic", return_value=time.monotonic() + 31):
+            self.assertIsNone(lru.get(1))
+
+    def test_usuario_inexistente(self):
+        headers = {"Authorization": f"Bearer {tokens.crear_access_token(999999)}"}
+        response = self.client.get(reverse("get_user", args=[self.usuario.id]), headers=headers)
+        self.assertEqual(response.status_code, 401)
+        self.assertIsNone(usuario_cache._local.get(999999))
+
+
+class ExportacionStreamingTests(TestCase):
+    """
+    Exportación de usuarios y clientes en streaming (?stream=json|ndjson).
+    """
+
+    def setUp(self):
+        self.usuarios = [Usuario.objects.create(correo=f"u{i}@example.com", password="x") for i in range(5)]
+        Cliente.objects.create(
+            usuario=self.usuarios[1], nombres="Luis", apellidoPaterno="Pérez", apellidoMaterno="Rojas", ci="123",
+        )
+        self.headers = {"Authorization": f"Bearer {tokens.crear_access_token(self.usuarios[0].id)}"}
+
+    def _get(self, nombre, **params):
+        response = self.client.get(reverse(nombre), params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_usuarios_json_igual_al_listado(self):
+        exportado = json.loads(self._get("get_users", stream="json"))
+        listado = self.client.get(reverse("get_users"), headers=self.headers).json()
+        self.assertEqual(exportado, listado)
+        self.assertEqual([u["id"] for u in exportado["users"]], [u.id for u in self.usuarios])
+
+    def test_clientes_ndjson(self):
+        filas = [json.loads(linea) for linea in self._get("get_clientes", stream="NDJSON").splitlines()]
+        self.assertEqual(len(filas), 1)
+        self.assertEqual((filas[0]["correo"], filas[0]["nombres"]), ("u1@example.com", "Luis"))
+
+    def test_formato_invalido(self):
+        response = self.client.get(reverse("get_users"), {"stream": "csv"}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"], PASSWORD_HASH_WORKERS=1)
+class RegistroMasivoTests(TestCase):
+    """
+    Registro masivo: correos repetidos o ya registrados se descartan con una
+    sola consulta y los usuarios/clientes se insertan con bulk_create.
+    """
+
+    def setUp(self):
+        throttle.reset()
+        Usuario.objects.create(correo="ana@example.com", password=make_password("secreto"))
+        self.headers = {"Authorization": f"Bearer {tokens.crear_access_token(1)}"}
+
+    def _cliente(self, correo, **extra):
+        return {
+            "correo": correo, "password": "secreto", "nombres": "Luis", "apellidoPaterno": "Pérez",
+            "apellidoMaterno": "Rojas", "ci": "123", **extra,
+        }
+
+    def _registrar(self, usuarios):
+        return self.client.post(
+            reverse("bulk_create_users"), json.dumps({"usuarios": usuarios}),
+            content_type="application/json", headers=self.headers,
+        )
+
+    def test_estados_por_item(self):
+        response = self._registrar([
+            self._cliente("luis@example.com"),
+            {"correo": "base@example.com", "password": "otra", "tipo_usuario": "usuario"},
+            self._cliente("ana@example.com"),
+            self._cliente("luis@example.com"),
+            self._cliente("sin-arroba"),
+            {"correo": "x@example.com", "password": "secreto"},
+        ]).json()
+
+        self.assertEqual(
+            [r["estado"] for r in response["resultados"]],
+            ["creado", "creado", "duplicado", "duplicado", "error", "error"],
+        )
+        self.assertEqual((response["creado"], response["duplicado"], response["error"]), (2, 2, 2))
+        luis = Usuario.objects.get(correo="luis@example.com")
+        self.assertEqual(response["resultados"][0]["id"], luis.id)
+        self.assertTrue(check_password("secreto", luis.password))
+        self.assertEqual(list(Cliente.objects.values_list("usuario__correo", flat=True)), ["luis@example.com"])
+
+    def test_limite_de_la_api(self):
+        usuarios = [self._cliente(f"u{i}@example.com") for i in range(registro.MAX_BULK_USUARIOS_API + 1)]
+        response = self._registrar(usuarios)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Usuario.objects.filter(correo="u0@example.com").exists())
+        # Los lotes grandes van por el servicio (comando registrar_usuarios)
+        resultado = registro.registrar_usuarios(usuarios)
+        self.assertEqual(resultado["creado"], len(usuarios))
+
+    def test_consultas_no_crecen_con_los_items(self):
+        usuarios = [self._cliente(f"u{i}@example.com") for i in range(50)]
+        with CaptureQueriesContext(connection) as queries:
+            resultado = registro.registrar_usuarios(usuarios, chunk_size=20)
+        self.assertEqual(resultado["creado"], 50)
+        # SELECT de correos + 2 INSERT por lote (más los savepoints)
+        inserts = [q for q in queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 6)
+        self.assertEqual(len([q for q in queries if q["sql"].startswith("SELECT")]), 1)
+
+
+class HashingPoolTests(SimpleTestCase):
+    """
+    Los procesos del pool leen PASSWORD_HASHERS de settings (no ven override_settings).
+    """
+
+    def test_pool_de_procesos(self):
+        self.addCleanup(hashing.cerrar_pool)
+        passwords = [f"clave{i}" for i in range(hashing.MIN_PASSWORDS_POOL)]
+        with override_settings(PASSWORD_HASH_WORKERS=2):
+            hashes = hashing.hashear_passwords(passwords)
+            # Si el pool se hubiera roto, se descarta (y se hashea en el proceso actual)
+            self.assertIsNotNone(hashing._pool)
+        self.assertEqual(len(hashes), len(passwords))
+        for password, hashed in zip(passwords, hashes):
+            self.assertTrue(check_password(password, hashed))
@@ -5,11 +5,14 @@ from . import views
 urlpatterns = [
     # ============= AUTENTICACIÓN =============
     path('auth', views.login, name='auth'),
+    path('auth/refresh', views.refresh_token, name='auth_refresh'),
+    path('auth/logout', views.logout, name='auth_logout'),
     
     # ============= USUARIOS =============
     path('', views.get_users, name='get_users'),  
     path('<int:id>/', views.get_user, name='get_user'), 
     path('create/', views.create_user, name='create_user'),  
+    path('bulk-create/', views.bulk_create_users, name='bulk_create_users'),
     path('<int:id>/update/', views.update_user, name='update_user'),  
     path('<int:id>/delete/', views.delete_user, name='delete_user'),  
     
@@ -1,9 +1,14 @@
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse
 from .services import services as user_services
+from .services import registro as registro_service
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError
 from users.services.jwt import jwt_required
+from app.responses import JsonResponse, get_stream_format, streaming_json_response
+from app.throttle import correo_login, ip_cliente, throttle
+from django.conf import settings
+from .services import tokens as token_service
 
 import json
 
@@ -15,10 +20,15 @@ def hello(request):
 @csrf_exempt
 @require_http_methods(["GET"])
 def get_users(request):
-    """GET /users/ - Obtiene todos los usuarios"""
+    """GET /users/ - Obtiene todos los usuarios (?stream=json|ndjson para exportar en streaming)"""
     try:
+        formato = get_stream_format(request)
+        if formato:
+            return streaming_json_response("users", user_services.iter_users(), formato)
         users = user_services.get_users()
         return JsonResponse({"ok": True, "users": users}, status=200)
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"ok": False, "error": str(e)}, status=500)
 
@@ -79,6 +89,38 @@ def create_user(request):
     except Exception as e:
         return JsonResponse({"ok": False, "error": str(e)}, status=500)
 
+@jwt_required
+@csrf_exempt
+@require_http_methods(["POST"])
+def bulk_create_users(request):
+    """
+    POST /users/bulk-create - Registra muchos usuarios/clientes en una sola solicitud
+    Body: {
+        "usuarios": [{
+            "correo": "...",
+            "password": "...",
+            "tipo_usuario": "cliente" | "usuario" (opcional, por defecto "cliente"),
+            "nombres": "...", "apellidoPaterno": "...", "apellidoMaterno": "...",
+            "ci": "...", "telefono": "..." (opcional)
+        }, ...]
+    }
+    Cada item retorna su estado: "creado" (con id), "duplicado" o "error".
+    Máximo registro.MAX_BULK_USUARIOS_API usuarios por solicitud; para lotes
+    mayores use el comando registrar_usuarios.
+    """
+    try:
+        payload = json.loads(request.body.decode() or "{}")
+        usuarios = payload.get("usuarios") if isinstance(payload, dict) else payload
+
+        resultado = registro_service.registrar_usuarios(usuarios, max_items=registro_service.MAX_BULK_USUARIOS_API)
+        return JsonResponse({"ok": True, **resultado}, status=200)
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+    except ValueError as e:
+        return JsonResponse({"ok": False, "error": f"Error en formato de datos: {str(e)}"}, status=400)
+    except Exception as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=500)
+
 @jwt_required
 @csrf_exempt
 @require_http_methods(["PUT"])
@@ -121,10 +163,15 @@ def delete_user(request, id):
 @csrf_exempt
 @require_http_methods(["GET"])
 def get_clientes(request):
-    """GET /users/clientes - Obtiene todos los clientes"""
+    """GET /users/clientes - Obtiene todos los clientes (?stream=json|ndjson para exportar en streaming)"""
     try:
+        formato = get_stream_format(request)
+        if formato:
+            return streaming_json_response("clientes", user_services.iter_clientes(), formato)
         clientes = user_services.get_all_clientes()
         return JsonResponse({"ok": True, "clientes": clientes}, status=200)
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"ok": False, "error": str(e)}, status=500)
 
@@ -308,6 +355,8 @@ def delete_admin(request, id):
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@throttle("login_ip", ip_cliente)
+@throttle("login_correo", correo_login)
 def login(request):
     """
     POST /users/auth - Autentica un usuario
@@ -336,6 +385,8 @@ def login(request):
         token = getattr(usuario, "token", None)
         if token:
             user_data["token"] = token
+            user_data["refresh_token"] = usuario.refresh_token
+            user_data["expires_in"] = settings.JWT_ACCESS_TTL
 
         # Si el usuario tiene un objeto Cliente relacionado
         if hasattr(usuario, "cliente"):
@@ -365,4 +416,48 @@ def login(request):
     except Exception as e:
         return JsonResponse({"ok": False, "error": str(e)}, status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+@throttle("login_ip", ip_cliente)
+def refresh_token(request):
+    """
+    POST /users/auth/refresh - Canjea un refresh token por tokens nuevos
+    Body: {
+        "refresh_token": "..."
+    }
+    El refresh token usado deja de servir; si se vuelve a presentar se cierra la sesión.
+    """
+    try:
+        payload = json.loads(request.body.decode() or "{}")
+        refresh = payload.get("refresh_token")
+        if not refresh:
+            return JsonResponse({"ok": False, "error": "refresh_token es requerido"}, status=400)
+        return JsonResponse({"ok": True, **token_service.rotar_refresh_token(refresh)})
+    except token_service.TokenInvalido as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=401)
+    except ValueError as e:
+        return JsonResponse({"ok": False, "error": f"Error en formato de datos: {str(e)}"}, status=400)
+    except Exception as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=500)
 
+@csrf_exempt
+@jwt_required(stateless=True)
+@require_http_methods(["POST"])
+def logout(request):
+    """
+    POST /users/auth/logout - Revoca el access token actual (requiere token JWT)
+    Body (opcional): {
+        "refresh_token": "..."   -> también cierra esa sesión
+    }
+    """
+    try:
+        payload = json.loads(request.body.decode() or "{}")
+        token_service.revocar_access_token(request.token_payload)
+        refresh = payload.get("refresh_token")
+        if refresh:
+            token_service.revocar_refresh_token(refresh, request.usuario_id)
+        return JsonResponse({"ok": True, "msg": "sesión cerrada"})
+    except ValueError as e:
+        return JsonResponse({"ok": False, "error": f"Error en formato de datos: {str(e)}"}, status=400)
+    except Exception as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=500)